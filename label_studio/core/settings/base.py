@@ -482,6 +482,7 @@ SUPPORTED_EXTENSIONS = set(
         '.jpg',
         '.jpeg',
         '.json',
+        '.jsonl',
         '.m4a',
         '.mp3',
         '.ogg',
@@ -511,12 +512,49 @@ os.makedirs(EXPORT_DIR, exist_ok=True)
 # dir for delayed export
 DELAYED_EXPORT_DIR = 'export'
 os.makedirs(os.path.join(BASE_DATA_DIR, MEDIA_ROOT, DELAYED_EXPORT_DIR), exist_ok=True)
+# Exports are streamed to the storage in chunks of this size, bytes written are saved once per interval in seconds
+EXPORT_WRITE_BUFFER_SIZE = int(get_env('EXPORT_WRITE_BUFFER_SIZE', 1024 * 1024))
+EXPORT_PROGRESS_INTERVAL = float(get_env('EXPORT_PROGRESS_INTERVAL', 5.0))
+# Exports are serialized in shards of this number of tasks by a pool of processes,
+# the last exported shard is checkpointed and an export job restarted up to EXPORT_JOB_RETRIES times resumes from it
+EXPORT_SHARD_SIZE = int(get_env('EXPORT_SHARD_SIZE', 10000))
+EXPORT_SHARD_WORKERS = int(get_env('EXPORT_SHARD_WORKERS', 1))
+EXPORT_JOB_RETRIES = int(get_env('EXPORT_JOB_RETRIES', 1))
+# Parquet exports are written in row groups of this number of tasks
+EXPORT_PARQUET_ROW_GROUP_SIZE = int(get_env('EXPORT_PARQUET_ROW_GROUP_SIZE', 10000))
+# Files of the export API are cached by the project data version and export options,
+# least recently used files are evicted over the size limit in bytes or after the max age in seconds.
+# The data version is built from row counts and updated_at stamps, bulk queryset.update() writes
+# (e.g. data manager actions) don't change it, so the cache is off by default
+EXPORT_CACHE_ENABLED = get_bool_env('EXPORT_CACHE_ENABLED', False)
+EXPORT_CACHE_DIR = get_env('EXPORT_CACHE_DIR', os.path.join(EXPORT_DIR, 'cache'))
+EXPORT_CACHE_MAX_SIZE = int(get_env('EXPORT_CACHE_MAX_SIZE', 1024 * 1024 * 1024))
+EXPORT_CACHE_MAX_AGE = int(get_env('EXPORT_CACHE_MAX_AGE', 24 * 60 * 60))
+# Resources of COCO and YOLO exports with images are downloaded by this number of threads
+# (0 leaves downloads to the converter) and kept in a content-addressed cache, evicted like the export cache
+EXPORT_RESOURCES_WORKERS = int(get_env('EXPORT_RESOURCES_WORKERS', 8))
+EXPORT_RESOURCES_TIMEOUT = float(get_env('EXPORT_RESOURCES_TIMEOUT', 60.0))
+EXPORT_RESOURCES_CACHE_DIR = get_env('EXPORT_RESOURCES_CACHE_DIR', os.path.join(EXPORT_DIR, 'resources'))
+EXPORT_RESOURCES_CACHE_MAX_SIZE = int(get_env('EXPORT_RESOURCES_CACHE_MAX_SIZE', 10 * 1024 * 1024 * 1024))
+EXPORT_RESOURCES_CACHE_MAX_AGE = int(get_env('EXPORT_RESOURCES_CACHE_MAX_AGE', 7 * 24 * 60 * 60))
 
 # file / task size limits
 DATA_UPLOAD_MAX_MEMORY_SIZE = int(get_env('DATA_UPLOAD_MAX_MEMORY_SIZE', 250 * 1024 * 1024))
 DATA_UPLOAD_MAX_NUMBER_FILES = int(get_env('DATA_UPLOAD_MAX_NUMBER_FILES', 100))
 TASKS_MAX_NUMBER = 1000000
 TASKS_MAX_FILE_SIZE = DATA_UPLOAD_MAX_MEMORY_SIZE
+# Imported files are parsed incrementally, CSV and TSV files in chunks of this number of rows,
+# and parsed tasks are validated and saved in batches of IMPORT_BATCH_SIZE tasks
+IMPORT_CSV_CHUNK_SIZE = int(get_env('IMPORT_CSV_CHUNK_SIZE', 10000))
+IMPORT_BATCH_SIZE = int(get_env('IMPORT_BATCH_SIZE', 5000))
+# Async imports commit every batch in its own transaction and report progress in ProjectImport.task_count,
+# tasks of committed batches are deleted if the import fails
+IMPORT_ASYNC_COMMIT_IN_BATCHES = get_bool_env('IMPORT_ASYNC_COMMIT_IN_BATCHES', True)
+# Imported tasks, annotations and predictions are inserted with COPY FROM STDIN instead of INSERT on PostgreSQL
+BULK_INSERT_USE_COPY = get_bool_env('BULK_INSERT_USE_COPY', False)
+# Annotation and draft writes append label counter deltas instead of rewriting the project summary row,
+# deltas are folded into the summary when it's read
+PROJECT_SUMMARY_DELTAS = get_bool_env('PROJECT_SUMMARY_DELTAS', False)
 
 TASK_LOCK_TTL = int(get_env('TASK_LOCK_TTL', default=86400))
 
@@ -681,7 +719,30 @@ BATCH_JOB_RETRY_TIMEOUT = int(get_env('BATCH_JOB_RETRY_TIMEOUT', 60))
 FUTURE_SAVE_TASK_TO_STORAGE = get_bool_env('FUTURE_SAVE_TASK_TO_STORAGE', default=False)
 FUTURE_SAVE_TASK_TO_STORAGE_JSON_EXT = get_bool_env('FUTURE_SAVE_TASK_TO_STORAGE_JSON_EXT', default=True)
 STORAGE_IN_PROGRESS_TIMER = float(get_env('STORAGE_IN_PROGRESS_TIMER', 5.0))
+# Storage sync progress is saved at most once per STORAGE_IN_PROGRESS_TIMER seconds or this number of items,
+# with STORAGE_PROGRESS_REDIS it's also published to Redis for the UI
+STORAGE_PROGRESS_UPDATE_ITEMS = int(get_env('STORAGE_PROGRESS_UPDATE_ITEMS', 10000))
+STORAGE_PROGRESS_REDIS = get_bool_env('STORAGE_PROGRESS_REDIS', False)
 STORAGE_EXPORT_CHUNK_SIZE = int(get_env('STORAGE_EXPORT_CHUNK_SIZE', 100))
+# Default number of parallel uploads during export storage sync, it can be changed per storage.
+# Use 8 threads, unless we know we only have a single core
+STORAGE_EXPORT_WORKERS = int(get_env('STORAGE_EXPORT_WORKERS', min(8, (os.cpu_count() or 2) * 4)))
+# Failed uploads of export storage objects are retried with exponential backoff starting from the delay
+STORAGE_EXPORT_RETRIES = int(get_env('STORAGE_EXPORT_RETRIES', 3))
+STORAGE_EXPORT_RETRY_DELAY = float(get_env('STORAGE_EXPORT_RETRY_DELAY', 1.0))
+# Log annotation changes and export them to target storages in background instead of the request path
+STORAGE_EXPORT_CHANGE_LOG = get_bool_env('STORAGE_EXPORT_CHANGE_LOG', False)
+# Changes younger than this number of seconds are exported but the change log cursor isn't moved over them yet,
+# because a change with a lower id can still be committed; it must be longer than the longest annotation transaction
+STORAGE_EXPORT_CHANGE_LOG_GRACE = int(get_env('STORAGE_EXPORT_CHANGE_LOG_GRACE', 60))
+# Number of storage objects written to DB in one transaction during import storage sync
+STORAGE_IMPORT_BATCH_SIZE = int(get_env('STORAGE_IMPORT_BATCH_SIZE', 500))
+# Number of threads downloading storage objects ahead of the DB writes during import storage sync,
+# at most 2 * STORAGE_IMPORT_PREFETCH_WORKERS objects are fetched ahead; 0 or 1 disables prefetching
+STORAGE_IMPORT_PREFETCH_WORKERS = int(get_env('STORAGE_IMPORT_PREFETCH_WORKERS', 8))
+# Presigned URLs are cached until this number of seconds before their expiration (presign_ttl),
+# set to a negative value to disable the cache
+STORAGE_PRESIGNED_URL_CACHE_MARGIN = int(get_env('STORAGE_PRESIGNED_URL_CACHE_MARGIN', 30))
 
 USE_NGINX_FOR_EXPORT_DOWNLOADS = get_bool_env('USE_NGINX_FOR_EXPORT_DOWNLOADS', False)
 
@@ -768,6 +829,19 @@ DATA_MANAGER_FILTER_ALLOWLIST = list(
     set(get_env_list('DATA_MANAGER_FILTER_ALLOWLIST') + ['updated_by__active_organization'])
 )
 
+# Read annotators, completed_at and predictions_score in data manager from the materialized TaskAggregate table
+# instead of aggregating annotations and predictions at query time. Enable it only after the background
+# backfill started by the tasks 0055 migration is finished, until then existing tasks have no aggregates
+DATA_MANAGER_TASK_AGGREGATES = get_bool_env('DATA_MANAGER_TASK_AGGREGATES', False)
+
+# Cache total counts of filtered data manager views for this number of seconds (0 disables the cache).
+# Invalidation must reach every server process and rq worker, so enable it only with a shared cache backend
+# (e.g. redis) in CACHES: the default per-process memory cache would serve stale totals
+DATA_MANAGER_COUNTS_CACHE_TTL = int(get_env('DATA_MANAGER_COUNTS_CACHE_TTL', 0))
+# With ?approximate_count=1 views estimated to have more tasks than this threshold return approximate counts
+DATA_MANAGER_APPROXIMATE_COUNT_THRESHOLD = int(get_env('DATA_MANAGER_APPROXIMATE_COUNT_THRESHOLD', 100000))
+DATA_MANAGER_APPROXIMATE_COUNT_SAMPLE_SIZE = int(get_env('DATA_MANAGER_APPROXIMATE_COUNT_SAMPLE_SIZE', 10000))
+
 if ENABLE_CSP := get_bool_env('ENABLE_CSP', True):
     CSP_DEFAULT_SRC = (
         "'self'",
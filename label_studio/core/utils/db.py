@@ -1,7 +1,11 @@
+import datetime
+import io
+import json
 import logging
-from typing import Optional, TypeVar
+from typing import List, Optional, TypeVar
 
-from django.db import models
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, models
 from django.db.models import Model, QuerySet, Subquery
 
 logger = logging.getLogger(__name__)
@@ -30,3 +34,88 @@ def fast_first_or_create(model, **model_params) -> Optional[ModelType]:
     if instance := fast_first(model.objects.filter(**model_params)):
         return instance
     return model.objects.create(**model_params)
+
+
+def copy_insert_enabled(using=DEFAULT_DB_ALIAS) -> bool:
+    """Whether bulk inserts can use COPY FROM STDIN, see BulkInsertManagerMixin"""
+    return settings.BULK_INSERT_USE_COPY and connections[using].vendor == 'postgresql'
+
+
+def copy_insert(model, objs: List[ModelType], batch_size=None, using=DEFAULT_DB_ALIAS) -> List[ModelType]:
+    """Insert model instances with PostgreSQL COPY FROM STDIN, like bulk_create() does with INSERT.
+
+    Ids of instances without them are reserved from the table sequence before copying,
+    so instances have their ids after the insert as with bulk_create(). Signals are not sent.
+    """
+    if not objs:
+        return objs
+    connection = connections[using]
+    opts = model._meta
+    qn = connection.ops.quote_name
+    fields = opts.concrete_fields
+    for obj in objs:
+        # take ids of related objects saved after they were assigned
+        obj._prepare_related_fields_for_save(operation_name='copy_insert')
+    new_objs = [obj for obj in objs if obj.pk is None]
+    batch_size = batch_size or len(objs)
+
+    with connection.cursor() as cursor:
+        if new_objs:
+            cursor.execute(
+                'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+                [qn(opts.db_table), opts.pk.column, len(new_objs)],
+            )
+            for obj, (pk,) in zip(new_objs, cursor.fetchall()):
+                obj.pk = pk
+
+        sql = f'COPY {qn(opts.db_table)} ({", ".join(qn(field.column) for field in fields)}) FROM STDIN'
+        for start in range(0, len(objs), batch_size):
+            buffer = io.StringIO()
+            for obj in objs[start : start + batch_size]:
+                buffer.write('\t'.join(copy_value(field, obj, connection) for field in fields))
+                buffer.write('\n')
+            buffer.seek(0)
+            raw_cursor = cursor.cursor
+            if hasattr(raw_cursor, 'copy_expert'):
+                # psycopg2
+                raw_cursor.copy_expert(sql, buffer)
+            else:
+                with raw_cursor.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+
+    for obj in objs:
+        obj._state.adding = False
+        obj._state.db = using
+    return objs
+
+
+def copy_value(field, obj, connection) -> str:
+    """Value of a model instance field in the COPY text format"""
+    value = field.pre_save(obj, add=True)
+    if hasattr(value, 'resolve_expression'):
+        raise ValueError(f'{field} is an expression, it can be inserted with bulk_create() only')
+    if isinstance(field, models.JSONField):
+        # JSONField prepares values as driver adapters, COPY needs the JSON text
+        value = None if value is None else json.dumps(value, cls=field.encoder)
+    else:
+        value = field.get_db_prep_save(value, connection)
+
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('\r', '\\r').replace('\t', '\\t')
+
+
+class BulkInsertManagerMixin:
+    """Manager mixin for bulk inserts of many rows, which use COPY on PostgreSQL if BULK_INSERT_USE_COPY is set"""
+
+    def bulk_insert(self, objs, batch_size=None):
+        if objs and copy_insert_enabled(self.db):
+            return self.copy_insert(objs, batch_size=batch_size)
+        return self.bulk_create(objs, batch_size=batch_size)
+
+    def copy_insert(self, objs, batch_size=None):
+        return copy_insert(self.model, objs, batch_size=batch_size, using=self.db)
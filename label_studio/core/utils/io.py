@@ -1,5 +1,6 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
+import codecs
 import glob
 import importlib
 import io
@@ -9,6 +10,7 @@ import os
 import shutil
 import socket
 from contextlib import contextmanager
+from json import JSONDecodeError, JSONDecoder
 from tempfile import mkdtemp, mkstemp
 
 import requests
@@ -175,6 +177,60 @@ class SerializableGenerator(list):
         return itertools.chain(self._head, *self[:1])
 
 
+def iter_json_array(file, chunk_size=1024 * 1024):
+    """Yield items of a JSON array from a binary file one by one, without loading the whole file"""
+    decoder = JSONDecoder()
+    decode = codecs.getincrementaldecoder('utf-8')().decode
+    buffer, pos, eof = '', 0, False
+
+    def read():
+        nonlocal buffer, pos, eof
+        data = file.read(chunk_size)
+        eof = not data
+        buffer = buffer[pos:] + decode(data, final=eof)
+        pos = 0
+
+    def next_char():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if eof:
+                raise ValueError('Unexpected end of JSON array')
+            read()
+
+    if next_char() != '[':
+        raise ValueError('JSON array is expected')
+    pos += 1
+    if next_char() == ']':
+        return
+
+    while True:
+        next_char()
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except JSONDecodeError:
+            if eof:
+                raise
+            read()
+            continue
+        if end == len(buffer) and not eof:
+            # a number may continue in the next chunk
+            read()
+            continue
+        pos = end
+        yield item
+
+        separator = next_char()
+        pos += 1
+        if separator == ']':
+            return
+        if separator != ',':
+            raise ValueError(f'Unexpected "{separator}" in JSON array')
+
+
 def validate_upload_url(url, block_local_urls=True):
     """Utility function for defending against SSRF attacks. Raises
         - InvalidUploadUrlError if the url is not HTTP[S], or if block_local_urls is enabled
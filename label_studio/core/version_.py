@@ -0,0 +1,4 @@
+info = {"message": "[user-013] fix: don't skip change log entries committed out of id order", "commit": "5e153afb7ea80501311c36ff4ba414681103a38d", "date": "2026/10/17 10:54:30", "branch": "", "version": "5e153af"}
+
+# This file is automatically generated by version.py
+# Do not include it to git!
@@ -26,7 +26,9 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from tasks.models import Task
 
+from .cache import cache_export, get_cache_key, get_cached_export
 from .models import ConvertedFormat, DataExport, Export
+from .native_formats import is_native_format
 from .serializers import (
     ExportConvertSerializer,
     ExportCreateSerializer,
@@ -261,21 +263,68 @@ class ExportAPI(generics.RetrieveAPIView):
             query = query.filter(annotations__isnull=False).distinct()
 
         task_ids = query.values_list('id', flat=True)
+        hostname = request.build_absolute_uri('/')
+
+        cache_key = None
+        if settings.EXPORT_CACHE_ENABLED:
+            cache_key = get_cache_key(
+                project,
+                export_type,
+                filter_options={'ids': sorted(set(tasks_ids)), 'only_finished': only_finished},
+                serialization_options={
+                    'download_resources': download_resources,
+                    'interpolate_key_frames': interpolate_key_frames,
+                    'hostname': hostname if download_resources else None,
+                },
+            )
+            cached = get_cached_export(cache_key)
+            if cached is not None:
+                path, content_type, filename = cached
+                logger.debug(f'Return cached export {filename} of project {project.id}')
+                r = FileResponse(open(path, 'rb'), as_attachment=True, content_type=content_type, filename=filename)
+                r['filename'] = filename
+                return r
+
+        if is_native_format(export_type):
+            # native formats are streamed from the database without collecting all tasks in memory
+            logger.debug(f'Stream tasks to {export_type} export file')
+            export_file, content_type, filename = DataExport.generate_native_export_file(
+                project,
+                list(task_ids),
+                export_type,
+                serialization_options={
+                    'drafts': {'only_id': False},
+                    'interpolate_key_frames': interpolate_key_frames,
+                },
+            )
+        else:
 
-        logger.debug('Serialize tasks for export')
-        tasks = []
-        for _task_ids in batch(task_ids, 1000):
-            tasks += ExportDataSerializer(
-                self.get_task_queryset(query.filter(id__in=_task_ids)),
-                many=True,
-                expand=['drafts'],
-                context={'interpolate_key_frames': interpolate_key_frames},
-            ).data
-        logger.debug('Prepare export files')
-
-        export_file, content_type, filename = DataExport.generate_export_file(
-            project, tasks, export_type, download_resources, request.GET, hostname=request.build_absolute_uri('/')
-        )
+            def iter_tasks():
+                # tasks are serialized batch by batch while the export file is written
+                for _task_ids in batch(task_ids, 1000):
+                    yield from ExportDataSerializer(
+                        self.get_task_queryset(query.filter(id__in=_task_ids)),
+                        many=True,
+                        expand=['drafts'],
+                        context={'interpolate_key_frames': interpolate_key_frames},
+                    ).data
+
+            logger.debug('Serialize tasks and prepare export files')
+            export_file, content_type, filename = DataExport.generate_export_file(
+                project,
+                iter_tasks(),
+                export_type,
+                download_resources,
+                request.GET,
+                hostname=hostname,
+            )
+
+        if cache_key is not None:
+            try:
+                cache_export(cache_key, export_file, content_type, filename)
+            except OSError:
+                logger.warning(f'Failed to cache export {filename} of project {project.id}', exc_info=True)
+            export_file.seek(0)
 
         r = FileResponse(export_file, as_attachment=True, content_type=content_type, filename=filename)
         r['filename'] = filename
@@ -684,7 +733,12 @@ def async_convert(converted_format_id, export_type, project, hostname, download_
         converted_format.save(update_fields=['status'])
 
     snapshot = converted_format.export
-    converted_file = snapshot.convert_file(export_type, download_resources=download_resources, hostname=hostname)
+    converted_file = snapshot.convert_file(
+        export_type,
+        download_resources=download_resources,
+        hostname=hostname,
+        on_progress=converted_format.save_resources_progress,
+    )
     if converted_file is None:
         raise ValidationError('No converted file found, probably there are no annotations in the export snapshot')
     md5 = Export.eval_md5(converted_file)
@@ -0,0 +1,120 @@
+"""This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
+
+Content-addressed cache of export files produced by the export API.
+
+The cache key is a hash of the project data version, the export options and the export format, so a cached file
+is reused only while nothing it was generated from has changed. Files are kept in EXPORT_CACHE_DIR,
+least recently used files are evicted when the cache is larger than EXPORT_CACHE_MAX_SIZE bytes
+and files not used for EXPORT_CACHE_MAX_AGE seconds are evicted always.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+
+from django.conf import settings
+from django.db.models import Count, Max
+from tasks.models import Annotation, AnnotationDraft, Prediction, Task
+
+logger = logging.getLogger(__name__)
+
+
+def get_data_version(project):
+    """Last update stamps and counts of everything exported from the project.
+
+    Counts catch deletions, which don't change the last update stamps.
+    Bulk queryset.update() writes change neither, see EXPORT_CACHE_ENABLED.
+    """
+    version = {'project': project.updated_at.isoformat()}
+    for name, queryset in (
+        ('tasks', Task.objects.filter(project=project)),
+        ('annotations', Annotation.objects.filter(project=project)),
+        ('predictions', Prediction.objects.filter(task__project=project)),
+        ('drafts', AnnotationDraft.objects.filter(task__project=project)),
+    ):
+        stats = queryset.aggregate(count=Count('id'), updated_at=Max('updated_at'))
+        version[name] = [stats['count'], stats['updated_at'].isoformat() if stats['updated_at'] else None]
+    return version
+
+
+def get_cache_key(project, export_type, filter_options, serialization_options):
+    key = {
+        'project': project.id,
+        'version': get_data_version(project),
+        'export_type': export_type,
+        'filter_options': filter_options,
+        'serialization_options': serialization_options,
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def _paths(key):
+    return os.path.join(settings.EXPORT_CACHE_DIR, key), os.path.join(settings.EXPORT_CACHE_DIR, key + '.json')
+
+
+def get_cached_export(key):
+    """Return (path, content_type, filename) of the cached export file or None"""
+    path, meta_path = _paths(key)
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        # the access time of entries is their modification time, it's used for eviction
+        os.utime(path)
+        os.utime(meta_path)
+    except (OSError, ValueError):
+        return None
+    return path, meta['content_type'], meta['filename']
+
+
+def cache_export(key, file, content_type, filename):
+    """Copy an open export file into the cache, return the path of the cached file"""
+    os.makedirs(settings.EXPORT_CACHE_DIR, exist_ok=True)
+    path, meta_path = _paths(key)
+    partial_path = f'{path}.{uuid.uuid4().hex}.partial'
+    try:
+        with open(partial_path, 'wb') as f:
+            shutil.copyfileobj(file, f)
+        os.replace(partial_path, path)
+    except Exception:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    # the meta file is written last, entries without it are never returned
+    with open(meta_path + '.partial', 'w', encoding='utf-8') as f:
+        json.dump({'content_type': content_type, 'filename': filename}, f)
+    os.replace(meta_path + '.partial', meta_path)
+
+    evict_exports()
+    return path
+
+
+def evict_exports():
+    """Delete expired cache entries and the least recently used ones over the size limit"""
+    try:
+        entries = []
+        for name in os.listdir(settings.EXPORT_CACHE_DIR):
+            if name.endswith('.json') or name.endswith('.partial'):
+                continue
+            stat = os.stat(os.path.join(settings.EXPORT_CACHE_DIR, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+    except OSError:
+        logger.warning('Failed to list the export cache', exc_info=True)
+        return
+
+    now = time.time()
+    total_size = sum(size for _, size, _ in entries)
+    # the most recently used entries are kept
+    for used_at, size, name in sorted(entries):
+        if now - used_at <= settings.EXPORT_CACHE_MAX_AGE and total_size <= settings.EXPORT_CACHE_MAX_SIZE:
+            continue
+        for path in _paths(name)[::-1]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                logger.warning(f'Failed to evict {path} from the export cache', exc_info=True)
+        total_size -= size
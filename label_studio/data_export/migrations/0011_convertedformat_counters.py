@@ -0,0 +1,22 @@
+# Generated by Django 5.1.15 on 2026-10-17 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_export", "0010_alter_convertedformat_export_type"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="convertedformat",
+            name="counters",
+            field=models.JSONField(
+                default=dict,
+                help_text="Resource download counts of formats with resources",
+                verbose_name="Conversion meta data",
+            ),
+        ),
+    ]
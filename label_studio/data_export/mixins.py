@@ -2,8 +2,12 @@ import hashlib
 import io
 import json
 import logging
+import multiprocessing
+import os
 import pathlib
 import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from functools import reduce
 
@@ -11,20 +15,23 @@ import django_rq
 from core.redis import redis_connected
 from core.utils.common import batch
 from core.utils.io import (
-    SerializableGenerator,
     get_all_dirs_from_dir,
     get_all_files_from_dir,
     get_temp_dir,
+    iter_json_array,
 )
+from data_export.native_formats import NATIVE_EXPORT_FORMATS, is_native_format, write_native_format
+from data_export.resources import prefetch_resources
 from data_manager.models import View
 from django.conf import settings
 from django.core.files import File
 from django.core.files import temp as tempfile
-from django.db import transaction
+from django.db import connections
 from django.db.models import Prefetch
 from django.db.models.query_utils import Q
 from django.utils import dateformat, timezone
 from label_studio_sdk.converter import Converter
+from rq import Retry
 from tasks.models import Annotation, AnnotationDraft, Task
 
 ONLY = 'only'
@@ -34,6 +41,84 @@ EXCLUDE = 'exclude'
 logger = logging.getLogger(__name__)
 
 
+class ExportFileWriter:
+    """Stream an export file straight to the storage of a file field, computing its md5 on the fly.
+
+    Written data is buffered and flushed to the storage backend in chunks of EXPORT_WRITE_BUFFER_SIZE bytes,
+    so no temporary copy of the export is made: local storages write to the final path,
+    S3-compatible storages upload the chunks as parts of a multipart upload.
+    `on_progress(bytes_written)` is called at most once per EXPORT_PROGRESS_INTERVAL seconds.
+    If writing fails, the partially written file is deleted.
+
+        with ExportFileWriter(export.file, 'project-1.json') as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+        export.file.name, export.md5 = writer.name, writer.hexdigest()
+    """
+
+    def __init__(self, field_file, name, on_progress=None):
+        self.storage = field_file.storage
+        self.name = self.storage.get_available_name(
+            field_file.field.generate_filename(field_file.instance, name), max_length=field_file.field.max_length
+        )
+        self.on_progress = on_progress
+        self.buffer_size = settings.EXPORT_WRITE_BUFFER_SIZE
+        self.progress_interval = settings.EXPORT_PROGRESS_INTERVAL
+
+        self.file = None
+        self.md5 = hashlib.md5()  # nosec
+        self.bytes_written = 0
+        self.buffer = []
+        self.buffered = 0
+        self.reported_at = time.monotonic()
+
+    def __enter__(self):
+        try:
+            os.makedirs(os.path.dirname(self.storage.path(self.name)), exist_ok=True)
+        except NotImplementedError:
+            # remote storages don't have local paths
+            pass
+        self.file = self.storage.open(self.name, 'wb')
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is None:
+                self.flush()
+            self.file.close()
+        finally:
+            if exc_type is not None:
+                try:
+                    self.storage.delete(self.name)
+                except Exception:
+                    logger.warning(f'Failed to delete partially written export file {self.name}', exc_info=True)
+        return False
+
+    def write(self, data):
+        self.buffer.append(data)
+        self.buffered += len(data)
+        if self.buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        chunk = b''.join(self.buffer)
+        self.buffer = []
+        self.buffered = 0
+
+        self.md5.update(chunk)
+        self.file.write(chunk)
+        self.bytes_written += len(chunk)
+
+        if self.on_progress and time.monotonic() - self.reported_at >= self.progress_interval:
+            self.reported_at = time.monotonic()
+            self.on_progress(self.bytes_written)
+
+    def hexdigest(self):
+        return self.md5.hexdigest()
+
+
 class ExportMixin:
     def has_permission(self, user):
         user.project = self.project  # link for activity log
@@ -186,54 +271,64 @@ class ExportMixin:
                 })
         })
         """
-        from .serializers import ExportDataSerializer
-
         logger.debug('Run get_task_queryset')
 
         start = datetime.now()
-        with transaction.atomic():
-            # TODO: make counters from queryset
-            # counters = Project.objects.with_counts().filter(id=self.project.id)[0].get_counters()
-            self.counters = {'task_number': 0}
-            all_tasks = self.project.tasks
-            logger.debug('Tasks filtration')
-            task_ids = (
-                self._get_filtered_tasks(all_tasks, task_filter_options=task_filter_options)
-                .distinct()
-                .values_list('id', flat=True)
-            )
-            base_export_serializer_option = self._get_export_serializer_option(serialization_options)
-            i = 0
-            BATCH_SIZE = 1000
-            for ids in batch(task_ids, BATCH_SIZE):
-                i += 1
-                tasks = list(self.get_task_queryset(ids, annotation_filter_options))
-                logger.debug(f'Batch: {i*BATCH_SIZE}')
-                if isinstance(task_filter_options, dict) and task_filter_options.get('only_with_annotations'):
-                    tasks = [task for task in tasks if task.annotations.exists()]
-
-                if serialization_options and serialization_options.get('include_annotation_history') is True:
-                    task_ids = [task.id for task in tasks]
-                    annotation_ids = Annotation.objects.filter(task_id__in=task_ids).values_list('id', flat=True)
-                    base_export_serializer_option = self.update_export_serializer_option(
-                        base_export_serializer_option, annotation_ids
-                    )
-
-                serializer = ExportDataSerializer(tasks, many=True, **base_export_serializer_option)
-                self.counters['task_number'] += len(tasks)
-                for task in serializer.data:
-                    yield task
+        # no transaction here: the export progress is saved to the Export row while tasks are being serialized,
+        # task ids are loaded at once
+        # TODO: make counters from queryset
+        # counters = Project.objects.with_counts().filter(id=self.project.id)[0].get_counters()
+        self.counters = {'task_number': 0}
+        task_ids = self.get_export_task_ids(task_filter_options)
+        for tasks in self.iter_serialized_tasks(
+            task_ids, task_filter_options, annotation_filter_options, serialization_options
+        ):
+            self.counters['task_number'] += len(tasks)
+            for task in tasks:
+                yield task
         duration = datetime.now() - start
         logger.info(
             f'{self.counters["task_number"]} tasks from project {self.project_id} exported in {duration.total_seconds():.2f} seconds'
         )
 
+    def get_export_task_ids(self, task_filter_options=None):
+        """Ids of the exported tasks in ascending order"""
+        logger.debug('Tasks filtration')
+        tasks = self._get_filtered_tasks(self.project.tasks, task_filter_options=task_filter_options)
+        return list(tasks.order_by('id').distinct().values_list('id', flat=True))
+
+    def iter_serialized_tasks(
+        self, task_ids, task_filter_options=None, annotation_filter_options=None, serialization_options=None
+    ):
+        """Serialize tasks in batches, yield a list of serialized tasks per batch"""
+        from .serializers import ExportDataSerializer
+
+        base_export_serializer_option = self._get_export_serializer_option(serialization_options)
+        i = 0
+        BATCH_SIZE = 1000
+        for ids in batch(task_ids, BATCH_SIZE):
+            i += 1
+            tasks = list(self.get_task_queryset(ids, annotation_filter_options))
+            logger.debug(f'Batch: {i*BATCH_SIZE}')
+            if isinstance(task_filter_options, dict) and task_filter_options.get('only_with_annotations'):
+                tasks = [task for task in tasks if task.annotations.exists()]
+
+            if serialization_options and serialization_options.get('include_annotation_history') is True:
+                batch_task_ids = [task.id for task in tasks]
+                annotation_ids = Annotation.objects.filter(task_id__in=batch_task_ids).values_list('id', flat=True)
+                base_export_serializer_option = self.update_export_serializer_option(
+                    base_export_serializer_option, annotation_ids
+                )
+
+            serializer = ExportDataSerializer(tasks, many=True, **base_export_serializer_option)
+            yield serializer.data
+
     def update_export_serializer_option(self, base_export_serializer_option, annotation_ids):
         return base_export_serializer_option
 
     @staticmethod
     def eval_md5(file):
-        md5_object = hashlib.md5()   # nosec
+        md5_object = hashlib.md5()  # nosec
         block_size = 128 * md5_object.block_size
         chunk = file.read(block_size)
         while chunk:
@@ -251,6 +346,87 @@ class ExportMixin:
         self.md5 = md5
         self.save(update_fields=['file', 'md5', 'counters'])
 
+    def save_bytes_written(self, bytes_written):
+        self.counters['bytes_written'] = bytes_written
+        self.save(update_fields=['counters'])
+
+    def export_shards(self, task_filter_options=None, annotation_filter_options=None, serialization_options=None):
+        """Serialize tasks shard by shard into part files, checkpointing completed shards on the Export row.
+
+        A shard is EXPORT_SHARD_SIZE consecutive task ids, with EXPORT_SHARD_WORKERS > 1 shards are serialized
+        in a process pool. Completed shards are checkpointed in order: `counters['parts']` lists their part files
+        and `counters['last_task_id']` is the last exported task id, so a restarted export skips them.
+        """
+        if self.counters.get('parts') is None:
+            self.counters = {'task_number': 0, 'parts': [], 'last_task_id': 0}
+
+        last_task_id = self.counters['last_task_id']
+        task_ids = [task_id for task_id in self.get_export_task_ids(task_filter_options) if task_id > last_task_id]
+        shard_size = settings.EXPORT_SHARD_SIZE
+        shards = [task_ids[i : i + shard_size] for i in range(0, len(task_ids), shard_size)]
+        first_part = len(self.counters['parts'])
+        self.counters['shards_total'] = first_part + len(shards)
+        self.save(update_fields=['counters'])
+
+        jobs = [
+            (self.id, first_part + n, ids, task_filter_options, annotation_filter_options, serialization_options)
+            for n, ids in enumerate(shards)
+        ]
+        workers = min(settings.EXPORT_SHARD_WORKERS, len(jobs))
+        if workers <= 1:
+            self._checkpoint_shards(shards, (export_shard(*job) for job in jobs))
+            return
+
+        # forked processes must open their own database connections
+        connections.close_all()
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'))
+        try:
+            self._checkpoint_shards(shards, executor.map(export_shard, *zip(*jobs)))
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _checkpoint_shards(self, shards, results):
+        for ids, (part, task_number) in zip(shards, results):
+            self.counters['parts'].append(part)
+            self.counters['last_task_id'] = ids[-1]
+            self.counters['task_number'] += task_number
+            self.save(update_fields=['counters'])
+
+    def concatenate_shards(self):
+        """Concatenate the part files into one JSON export file, then delete them"""
+        # md5 isn't known before the file is written, so the export id makes the file name unique,
+        # finally file will be in settings.DELAYED_EXPORT_DIR/self.project.id/file_name
+        now = datetime.now()
+        file_name = f'project-{self.project.id}-at-{now.strftime("%Y-%m-%d-%H-%M")}-{self.id}.json'
+        file_path = f'{self.project.id}/{file_name}'
+        storage = self.file.storage
+        parts = self.counters['parts']
+
+        with ExportFileWriter(self.file, file_path, on_progress=self.save_bytes_written) as writer:
+            writer.write(b'[')
+            empty = True
+            for part in parts:
+                with storage.open(part, 'rb') as f:
+                    chunk = f.read(settings.EXPORT_WRITE_BUFFER_SIZE)
+                    if chunk and not empty:
+                        writer.write(b', ')
+                    while chunk:
+                        empty = False
+                        writer.write(chunk)
+                        chunk = f.read(settings.EXPORT_WRITE_BUFFER_SIZE)
+            writer.write(b']')
+
+        self.file.name = writer.name
+        self.md5 = writer.hexdigest()
+        self.counters = {'task_number': self.counters['task_number'], 'bytes_written': writer.bytes_written}
+        self.save(update_fields=['file', 'md5', 'counters'])
+
+        for part in parts:
+            try:
+                storage.delete(part)
+            except Exception:
+                logger.warning(f'Failed to delete export part {part}', exc_info=True)
+
     def export_to_file(self, task_filter_options=None, annotation_filter_options=None, serialization_options=None):
         logger.debug(
             f'Run export for {self.id} with params:\n'
@@ -259,23 +435,13 @@ class ExportMixin:
             f'serialization_options: {serialization_options}\n'
         )
         try:
-            iter_json = json.JSONEncoder(ensure_ascii=False).iterencode(
-                SerializableGenerator(
-                    self.get_export_data(
-                        task_filter_options=task_filter_options,
-                        annotation_filter_options=annotation_filter_options,
-                        serialization_options=serialization_options,
-                    )
-                )
-            )
-            with tempfile.NamedTemporaryFile(suffix='.export.json', dir=settings.FILE_UPLOAD_TEMP_DIR) as file:
-                for chunk in iter_json:
-                    encoded_chunk = chunk.encode('utf-8')
-                    file.write(encoded_chunk)
-                file.seek(0)
+            if self.counters.get('parts') is not None:
+                logger.info(f'Resume export {self.id} after {len(self.counters["parts"])} exported shards')
+                self.status = self.Status.IN_PROGRESS
+                self.save(update_fields=['status'])
 
-                md5 = self.eval_md5(file)
-                self.save_file(file, md5)
+            self.export_shards(task_filter_options, annotation_filter_options, serialization_options)
+            self.concatenate_shards()
 
             self.status = self.Status.COMPLETED
             self.save(update_fields=['status'])
@@ -306,6 +472,8 @@ class ExportMixin:
                 serialization_options,
                 on_failure=set_export_background_failure,
                 job_timeout='3h',  # 3 hours
+                # a job abandoned by a crashed worker is restarted and resumes from the last exported shard
+                retry=Retry(max=settings.EXPORT_JOB_RETRIES),
             )
         else:
             self.export_to_file(
@@ -314,7 +482,11 @@ class ExportMixin:
                 serialization_options=serialization_options,
             )
 
-    def convert_file(self, to_format, download_resources=False, hostname=None):
+    def convert_file(self, to_format, download_resources=False, hostname=None, on_progress=None):
+        """Convert the export snapshot to another format, `on_progress` is called with resource download counts"""
+        if is_native_format(to_format):
+            return self.convert_file_to_native_format(to_format)
+
         with get_temp_dir() as tmp_dir:
             OUT = 'out'
             out_dir = pathlib.Path(tmp_dir) / OUT
@@ -335,6 +507,7 @@ class ExportMixin:
             with open(input_file_path, 'wb') as file_:
                 file_.write(self.file.open().read())
 
+            prefetch_resources(converter, self.project, input_file_path, to_format, out_dir, on_progress=on_progress)
             converter.convert(input_file_path, out_dir, to_format, is_dir=False)
 
             files = get_all_files_from_dir(out_dir)
@@ -357,6 +530,19 @@ class ExportMixin:
                     name=filename,
                 )
 
+    def convert_file_to_native_format(self, to_format):
+        """Stream tasks from the JSON snapshot into a temporary file of the native format"""
+        extension = NATIVE_EXPORT_FORMATS[to_format]['extension']
+        out = tempfile.NamedTemporaryFile(suffix=f'.export.{extension}', dir=settings.FILE_UPLOAD_TEMP_DIR)
+        try:
+            with self.file.open('rb') as snapshot:
+                write_native_format(to_format, iter_json_array(snapshot, settings.EXPORT_WRITE_BUFFER_SIZE), out)
+            out.seek(0)
+        except Exception:
+            out.close()
+            raise
+        return File(out, name=f'{pathlib.Path(self.file.name).stem}.{extension}')
+
 
 def export_background(
     export_id, task_filter_options, annotation_filter_options, serialization_options, *args, **kwargs
@@ -370,6 +556,31 @@ def export_background(
     )
 
 
+def export_shard(
+    export_id, part_number, task_ids, task_filter_options, annotation_filter_options, serialization_options
+):
+    """Serialize tasks of one export shard into a part file, return the part file name and the number of tasks.
+
+    A part is a comma separated sequence of JSON tasks, parts are concatenated by Export.concatenate_shards().
+    """
+    from data_export.models import Export
+
+    export = Export.objects.get(id=export_id)
+    encoder = json.JSONEncoder(ensure_ascii=False)
+    part_path = f'{export.project_id}/parts/export-{export.id}-part-{part_number:05d}.json'
+    task_number = 0
+    with ExportFileWriter(export.file, part_path) as writer:
+        for tasks in export.iter_serialized_tasks(
+            task_ids, task_filter_options, annotation_filter_options, serialization_options
+        ):
+            for task in tasks:
+                if task_number:
+                    writer.write(b', ')
+                writer.write(encoder.encode(task).encode('utf-8'))
+                task_number += 1
+    return writer.name, task_number
+
+
 def set_export_background_failure(job, connection, type, value, traceback):
     from data_export.models import Export
 
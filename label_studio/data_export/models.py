@@ -1,9 +1,11 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
 import hashlib
+import itertools
 import logging
 import os
 import shutil
+import uuid
 from copy import deepcopy
 from datetime import datetime
 
@@ -12,7 +14,10 @@ from core import version
 from core.feature_flags import flag_set
 from core.utils.common import load_func
 from core.utils.io import get_all_files_from_dir, get_temp_dir, path_to_open_binary_file
+from data_export.native_formats import NATIVE_EXPORT_FORMATS, get_native_format_info, write_native_format
+from data_export.resources import prefetch_resources
 from django.conf import settings
+from django.core.files import temp as tempfile
 from django.db import models
 from django.db.models.signals import post_save
 from django.dispatch import receiver
@@ -92,18 +97,50 @@ def set_export_default_name(sender, instance, created, **kwargs):
 
 
 class DataExport(object):
-    # TODO: deprecated
     @staticmethod
-    def save_export_files(project, now, get_args, data, md5, name):
-        """Generate two files: meta info and result file and store them locally for logging"""
-        filename_results = os.path.join(settings.EXPORT_DIR, name + '.json')
+    def stream_export_files(project, now, get_args, tasks):
+        """Stream tasks to the result file once, hashing it on the fly, and save the meta info file.
+
+        Tasks can be any iterable, only one task is held in memory at a time.
+        Return the result file name and the export name.
+        """
+        md5_object = hashlib.md5()  # nosec
+        partial_filename = os.path.join(settings.EXPORT_DIR, f'project-{project.id}-{uuid.uuid4().hex}.json.partial')
+        try:
+            with open(partial_filename, 'wb', buffering=settings.EXPORT_WRITE_BUFFER_SIZE) as f:
+
+                def write(data):
+                    md5_object.update(data)
+                    f.write(data)
+
+                write(b'[')
+                for n, task in enumerate(tasks):
+                    if n:
+                        write(b',')
+                    write(json.dumps(task, ensure_ascii=False).encode('utf-8'))
+                write(b']')
+
+            md5 = md5_object.hexdigest()
+            name = 'project-' + str(project.id) + '-at-' + now.strftime('%Y-%m-%d-%H-%M') + f'-{md5[0:8]}'
+            filename_results = os.path.join(settings.EXPORT_DIR, name + '.json')
+            os.replace(partial_filename, filename_results)
+        except Exception:
+            if os.path.exists(partial_filename):
+                os.remove(partial_filename)
+            raise
+
+        DataExport.save_export_info(project, now, get_args, md5, filename_results, name)
+        return filename_results, name
+
+    @staticmethod
+    def save_export_info(project, now, get_args, md5, filename_results, name):
         filename_info = os.path.join(settings.EXPORT_DIR, name + '-info.json')
         annotation_number = Annotation.objects.filter(project=project).count()
         try:
             platform_version = version.get_git_version()
         except:  # noqa: E722
             platform_version = 'none'
-            logger.error('Version is not detected in save_export_files()')
+            logger.error('Version is not detected in save_export_info()')
         info = {
             'project': {
                 'title': project.title,
@@ -121,12 +158,8 @@ class DataExport(object):
                 'md5': md5,
             },
         }
-
-        with open(filename_results, 'w', encoding='utf-8') as f:
-            f.write(data)
         with open(filename_info, 'w', encoding='utf-8') as f:
             json.dump(info, f, ensure_ascii=False)
-        return filename_results
 
     @staticmethod
     def get_export_formats(project):
@@ -139,22 +172,43 @@ class DataExport(object):
             if format.name not in supported_formats:
                 format_info['disabled'] = True
             formats.append(format_info)
+        formats += [get_native_format_info(export_type) for export_type in NATIVE_EXPORT_FORMATS]
         return sorted(formats, key=lambda f: f.get('disabled', False))
 
+    @staticmethod
+    def generate_native_export_file(project, task_ids, output_format, serialization_options=None):
+        """Stream tasks from the database into an export file of a native format
+        and return it as an open file object.
+
+        Be sure to close the file after using it, it's a temporary file.
+        """
+        now = datetime.now()
+        info = NATIVE_EXPORT_FORMATS[output_format]
+        filename = f'project-{project.id}-at-{now.strftime("%Y-%m-%d-%H-%M")}.{info["extension"]}'
+
+        tasks = itertools.chain.from_iterable(
+            Export(project=project).iter_serialized_tasks(task_ids, serialization_options=serialization_options)
+        )
+        out = tempfile.NamedTemporaryFile(suffix=f'.export.{info["extension"]}', dir=settings.FILE_UPLOAD_TEMP_DIR)
+        try:
+            write_native_format(output_format, tasks, out)
+            out.seek(0)
+        except Exception:
+            out.close()
+            raise
+        return out, info['content_type'], filename
+
     @staticmethod
     def generate_export_file(project, tasks, output_format, download_resources, get_args, hostname=None):
         """Generate export file and return it as an open file object.
 
+        Tasks can be a list or an iterator of serialized tasks, they are streamed to the converter input file.
         Be sure to close the file after using it, to avoid wasting disk space.
         """
 
         # prepare for saving
         now = datetime.now()
-        data = json.dumps(tasks, ensure_ascii=False)
-        md5 = hashlib.md5(json.dumps(data).encode('utf-8')).hexdigest()   # nosec
-        name = 'project-' + str(project.id) + '-at-' + now.strftime('%Y-%m-%d-%H-%M') + f'-{md5[0:8]}'
-
-        input_json = DataExport.save_export_files(project, now, get_args, data, md5, name)
+        input_json, name = DataExport.stream_export_files(project, now, get_args, tasks)
 
         converter = Converter(
             config=project.get_parsed_config(),
@@ -165,6 +219,7 @@ class DataExport(object):
             hostname=hostname,
         )
         with get_temp_dir() as tmp_dir:
+            prefetch_resources(converter, project, input_json, output_format, tmp_dir)
             converter.convert(input_json, tmp_dir, output_format, is_dir=False)
             files = get_all_files_from_dir(tmp_dir)
             # if only one file is exported - no need to create archive
@@ -220,6 +275,11 @@ class ConvertedFormat(models.Model):
     )
     traceback = models.TextField(null=True, blank=True, help_text='Traceback report in case of errors')
     export_type = models.CharField(max_length=64)
+    counters = models.JSONField(
+        _('Conversion meta data'),
+        default=dict,
+        help_text='Resource download counts of formats with resources',
+    )
     created_at = models.DateTimeField(
         _('created at'),
         null=True,
@@ -246,6 +306,10 @@ class ConvertedFormat(models.Model):
         verbose_name=_('created by'),
     )
 
+    def save_resources_progress(self, progress):
+        self.counters['resources'] = progress
+        self.save(update_fields=['counters'])
+
     def delete(self, *args, **kwargs):
         if flag_set('ff_back_dev_4664_remove_storage_file_on_export_delete_29032023_short'):
             if self.file:
@@ -0,0 +1,222 @@
+"""This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
+
+Export formats written by Label Studio itself instead of the converter. Tasks are streamed into the file one by one,
+so these formats are produced with constant memory from the database or from a JSON export snapshot.
+"""
+import itertools
+import json
+import logging
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+NATIVE_EXPORT_FORMATS = {
+    'JSONL': {
+        'title': 'JSONL',
+        'description': 'Tasks in raw JSON format, one task per line. '
+        'Use to read large exports line by line instead of parsing one JSON array.',
+        'link': 'https://labelstud.io/guide/export.html#JSON',
+        'extension': 'jsonl',
+        'content_type': 'application/jsonl',
+    },
+    'PARQUET': {
+        'title': 'Parquet',
+        'description': 'Tasks in Apache Parquet format with annotation and prediction results as nested columns. '
+        'Use to read exports with Arrow based tools like pandas, Polars or Spark.',
+        'link': 'https://parquet.apache.org',
+        'extension': 'parquet',
+        'content_type': 'application/vnd.apache.parquet',
+    },
+}
+
+
+def is_native_format(export_type):
+    return export_type in NATIVE_EXPORT_FORMATS
+
+
+def get_native_format_info(export_type):
+    """Format info as listed by DataExport.get_export_formats()"""
+    info = NATIVE_EXPORT_FORMATS[export_type]
+    return {'title': info['title'], 'description': info['description'], 'link': info['link'], 'name': export_type}
+
+
+def write_native_format(export_type, tasks, file):
+    """Write serialized tasks to a binary file in the native export format"""
+    if export_type == 'JSONL':
+        write_jsonl(tasks, file)
+    elif export_type == 'PARQUET':
+        write_parquet(tasks, file)
+    else:
+        raise ValueError(f'{export_type} is not a native export format')
+
+
+def write_jsonl(tasks, file):
+    encoder = json.JSONEncoder(ensure_ascii=False)
+    for task in tasks:
+        file.write(encoder.encode(task).encode('utf-8'))
+        file.write(b'\n')
+
+
+def _json(value):
+    return None if value is None else json.dumps(value, ensure_ascii=False)
+
+
+def _str(value):
+    return None if value is None else str(value)
+
+
+def _int(value):
+    try:
+        return None if value is None else int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _float(value):
+    try:
+        return None if value is None else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _bool(value):
+    return None if value is None else bool(value)
+
+
+def _timestamp(value):
+    try:
+        return datetime.fromisoformat(value) if isinstance(value, str) else value
+    except ValueError:
+        return None
+
+
+def _id(value):
+    # expanded relations are serialized as objects
+    return _int(value.get('id') if isinstance(value, dict) else value)
+
+
+def _columns(item, converters):
+    """Typed columns of a serialized object, the rest of its fields are kept as JSON in the `extra` column"""
+    if not isinstance(item, dict):
+        # not expanded relations are serialized as ids
+        item = {'id': item}
+    row = dict.fromkeys(converters)
+    extra = {}
+    for key, value in item.items():
+        if key in converters:
+            row[key] = converters[key](value)
+        else:
+            extra[key] = value
+    row['extra'] = _json(extra) if extra else None
+    return row
+
+
+def _results(results):
+    return [_columns(result, RESULT_COLUMNS) for result in results or []]
+
+
+def _annotations(annotations):
+    return [_columns(annotation, ANNOTATION_COLUMNS) for annotation in annotations or []]
+
+
+def _predictions(predictions):
+    return [_columns(prediction, PREDICTION_COLUMNS) for prediction in predictions or []]
+
+
+TIMESTAMP = pa.timestamp('us', tz='UTC')
+
+RESULT_COLUMNS = {
+    'id': _str,
+    'type': _str,
+    'from_name': _str,
+    'to_name': _str,
+    'origin': _str,
+    'value': _json,
+}
+RESULT_TYPE = pa.struct(
+    [(name, pa.string()) for name in RESULT_COLUMNS] + [('extra', pa.string())],
+)
+
+ANNOTATION_COLUMNS = {
+    'id': _id,
+    'completed_by': _id,
+    'result': _results,
+    'was_cancelled': _bool,
+    'ground_truth': _bool,
+    'lead_time': _float,
+    'created_at': _timestamp,
+    'updated_at': _timestamp,
+}
+ANNOTATION_TYPE = pa.struct(
+    [
+        ('id', pa.int64()),
+        ('completed_by', pa.int64()),
+        ('result', pa.list_(RESULT_TYPE)),
+        ('was_cancelled', pa.bool_()),
+        ('ground_truth', pa.bool_()),
+        ('lead_time', pa.float64()),
+        ('created_at', TIMESTAMP),
+        ('updated_at', TIMESTAMP),
+        ('extra', pa.string()),
+    ]
+)
+
+PREDICTION_COLUMNS = {
+    'id': _id,
+    'model_version': _str,
+    'score': _float,
+    'result': _results,
+    'created_at': _timestamp,
+    'updated_at': _timestamp,
+}
+PREDICTION_TYPE = pa.struct(
+    [
+        ('id', pa.int64()),
+        ('model_version', pa.string()),
+        ('score', pa.float64()),
+        ('result', pa.list_(RESULT_TYPE)),
+        ('created_at', TIMESTAMP),
+        ('updated_at', TIMESTAMP),
+        ('extra', pa.string()),
+    ]
+)
+
+TASK_COLUMNS = {
+    'id': _id,
+    'inner_id': _int,
+    'data': _json,
+    'meta': _json,
+    'annotations': _annotations,
+    'predictions': _predictions,
+    'created_at': _timestamp,
+    'updated_at': _timestamp,
+}
+TASK_SCHEMA = pa.schema(
+    [
+        ('id', pa.int64()),
+        ('inner_id', pa.int64()),
+        ('data', pa.string()),
+        ('meta', pa.string()),
+        ('annotations', pa.list_(ANNOTATION_TYPE)),
+        ('predictions', pa.list_(PREDICTION_TYPE)),
+        ('created_at', TIMESTAMP),
+        ('updated_at', TIMESTAMP),
+        ('extra', pa.string()),
+    ]
+)
+
+
+def write_parquet(tasks, file):
+    """Write tasks in row groups of EXPORT_PARQUET_ROW_GROUP_SIZE tasks.
+
+    Task data, meta and result values are JSON strings, because their structure depends on the labeling config.
+    Other serialized fields are kept as JSON objects in the `extra` columns.
+    """
+    rows = (_columns(task, TASK_COLUMNS) for task in tasks)
+    with pq.ParquetWriter(file, TASK_SCHEMA) as writer:
+        while row_group := list(itertools.islice(rows, settings.EXPORT_PARQUET_ROW_GROUP_SIZE)):
+            writer.write_table(pa.Table.from_pylist(row_group, schema=TASK_SCHEMA))
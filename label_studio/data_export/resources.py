@@ -0,0 +1,310 @@
+"""This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
+
+Concurrent download of the media files referenced by tasks, for export formats that include them.
+
+The converter downloads resources one by one: cloud storage files go through the presign API of this instance
+and every export downloads them again. Instead, resources are prefetched before the conversion by a thread pool:
+cloud storage files are read with the project import storages, other URLs with a pooled HTTP session.
+Downloaded files are kept in a content-addressed cache in EXPORT_RESOURCES_CACHE_DIR and linked into
+the converter output under the names the converter uses for them, so the converter finds them and skips the download.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from core.utils.io import iter_json_array
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# formats the converter downloads resources for, into `<output_dir>/images`
+PREFETCH_FORMATS = ('COCO_WITH_IMAGES', 'YOLO_WITH_IMAGES', 'YOLO_OBB_WITH_IMAGES')
+CLOUD_STORAGE_PREFIXES = ('s3:', 'gs:', 'azure-blob:')
+CHUNK_SIZE = 1024 * 1024
+
+
+def get_converter_hostname(hostname=None):
+    """Hostname the converter resolves cloud storage files with"""
+    return hostname or os.getenv('LABEL_STUDIO_URL', '') or os.getenv('LABEL_STUDIO_HOST', '')
+
+
+def get_data_keys(project):
+    """Task data keys of the object tags in the project label config, the converter reads resources from them"""
+    data_keys = set()
+    for info in project.get_parsed_config().values():
+        for input_tag in info.get('inputs', []):
+            for value_key_name in ('value', 'valueList'):
+                if value_key_name in input_tag:
+                    data_keys.add(input_tag[value_key_name])
+    return sorted(data_keys)
+
+
+def get_converter_path(url, task_id, image_dir, hostname):
+    """Path the converter downloads the url to, or None if the converter reads it locally.
+
+    This mirrors the naming of label_studio_sdk get_local_path() and download_and_cache().
+    """
+    if url.startswith(CLOUD_STORAGE_PREFIXES):
+        if not hostname:
+            return None
+        url = hostname.rstrip('/') + f'/tasks/{task_id}/presign/?fileuri={url}'
+        filename = os.path.basename(url)
+    elif url.startswith(('http://', 'https://')):
+        filename = os.path.basename(urlparse(url).path)
+    else:
+        # uploaded and local storage files
+        return None
+    return os.path.join(image_dir, hashlib.md5(url.encode()).hexdigest()[:8] + '__' + filename)
+
+
+class ResourceCache:
+    """Content-addressed file cache.
+
+    Files are stored once by the sha256 of their content in `blobs/`, `refs/` maps the sha256 of a uri
+    to the content hash. Least recently used files are evicted when the cache is larger than
+    EXPORT_RESOURCES_CACHE_MAX_SIZE bytes and files not used for EXPORT_RESOURCES_CACHE_MAX_AGE seconds always,
+    so changed files behind the same uri are downloaded again at the latest after the max age.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or settings.EXPORT_RESOURCES_CACHE_DIR
+        self.blobs_dir = os.path.join(self.directory, 'blobs')
+        self.refs_dir = os.path.join(self.directory, 'refs')
+
+    def _ref_path(self, uri):
+        return os.path.join(self.refs_dir, hashlib.sha256(uri.encode()).hexdigest())
+
+    def _blob_path(self, digest):
+        return os.path.join(self.blobs_dir, digest[:2], digest)
+
+    def get(self, uri):
+        """Path of the cached file of the uri or None"""
+        ref_path = self._ref_path(uri)
+        try:
+            with open(ref_path, encoding='utf-8') as f:
+                path = self._blob_path(f.read().strip())
+            # the access time of blobs is their modification time, it's used for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except OSError:
+            logger.warning(f'Failed to read {uri} from the export resources cache', exc_info=True)
+            return None
+        return path
+
+    def put(self, uri, chunks):
+        """Write the file of the uri from byte chunks into the cache, return the path of the cached file"""
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        os.makedirs(self.refs_dir, exist_ok=True)
+        partial_path = os.path.join(self.blobs_dir, f'{uuid.uuid4().hex}.partial')
+        sha256 = hashlib.sha256()
+        try:
+            with open(partial_path, 'wb') as f:
+                for chunk in chunks:
+                    sha256.update(chunk)
+                    f.write(chunk)
+            path = self._blob_path(sha256.hexdigest())
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(partial_path, path)
+        except Exception:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+
+        ref_path = self._ref_path(uri)
+        with open(f'{ref_path}.{uuid.uuid4().hex}.partial', 'w', encoding='utf-8') as f:
+            f.write(sha256.hexdigest())
+        os.replace(f.name, ref_path)
+        return path
+
+    def evict(self):
+        """Delete expired blobs and the least recently used ones over the size limit, with refs to them"""
+        try:
+            entries = []
+            for root, _, names in os.walk(self.blobs_dir):
+                for name in names:
+                    stat = os.stat(os.path.join(root, name))
+                    entries.append((stat.st_mtime, stat.st_size, os.path.join(root, name)))
+        except OSError:
+            logger.warning('Failed to list the export resources cache', exc_info=True)
+            return
+
+        now = time.time()
+        total_size = sum(size for _, size, _ in entries)
+        evicted = False
+        for used_at, size, path in sorted(entries):
+            if (
+                now - used_at <= settings.EXPORT_RESOURCES_CACHE_MAX_AGE
+                and total_size <= settings.EXPORT_RESOURCES_CACHE_MAX_SIZE
+            ):
+                continue
+            try:
+                os.remove(path)
+                evicted = True
+            except OSError:
+                logger.warning(f'Failed to evict {path} from the export resources cache', exc_info=True)
+            total_size -= size
+
+        if evicted:
+            self._remove_dangling_refs()
+
+    def _remove_dangling_refs(self):
+        for name in os.listdir(self.refs_dir):
+            ref_path = os.path.join(self.refs_dir, name)
+            try:
+                with open(ref_path, encoding='utf-8') as f:
+                    if not os.path.exists(self._blob_path(f.read().strip())):
+                        os.remove(ref_path)
+            except OSError:
+                pass
+
+
+class ResourceDownloader:
+    """Prefetch the resources of exported tasks into the converter output directory.
+
+    Resources are downloaded by EXPORT_RESOURCES_WORKERS threads. `on_progress(progress)` is called at most
+    once per EXPORT_PROGRESS_INTERVAL seconds and after the last resource, with a dict of
+    `total`, `downloaded`, `cached` and `failed` resource counts. Failed resources are left to the converter.
+
+        downloader = ResourceDownloader(project, hostname, access_token)
+        with open(input_json, 'rb') as f:
+            downloader.prefetch(iter_json_array(f), data_key, os.path.join(output_dir, 'images'))
+    """
+
+    def __init__(self, project, hostname=None, access_token=None, on_progress=None, workers=None, cache=None):
+        self.project = project
+        self.hostname = get_converter_hostname(hostname)
+        self.access_token = access_token
+        self.on_progress = on_progress
+        self.workers = max(workers or settings.EXPORT_RESOURCES_WORKERS, 1)
+        self.cache = cache or ResourceCache()
+        self.progress = {'total': 0, 'downloaded': 0, 'cached': 0, 'failed': 0}
+        self.reported_at = time.monotonic()
+
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def iter_resources(self, tasks, data_key, image_dir):
+        """Yield (uri, storage, path) of resources to prefetch, each path once"""
+        from io_storages.functions import get_storage_by_url
+
+        storage_objects = self.project.get_all_import_storage_objects
+        paths = set()
+        for task in tasks:
+            urls = (task.get('data') or {}).get(data_key)
+            for url in urls if isinstance(urls, list) else [urls]:
+                if not isinstance(url, str):
+                    continue
+                path = get_converter_path(url, task['id'], image_dir, self.hostname)
+                if path is None or path in paths:
+                    continue
+                storage = None
+                if url.startswith(CLOUD_STORAGE_PREFIXES):
+                    storage = get_storage_by_url(url, storage_objects)
+                    if storage is None:
+                        # the converter will try the presign API
+                        continue
+                paths.add(path)
+                yield url, storage, path
+
+    def prefetch(self, tasks, data_key, image_dir):
+        """Download resources of serialized tasks into image_dir, return the progress counts"""
+        os.makedirs(image_dir, exist_ok=True)
+        pending = deque()
+        executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix=f'export-resources-{self.project.id}'
+        )
+        try:
+            # storages are found in this thread, the workers don't use the database;
+            # get_bytes_stream() of import storages is thread safe, see ImportStorage.prefetch_data()
+            for uri, storage, path in self.iter_resources(tasks, data_key, image_dir):
+                self.progress['total'] += 1
+                pending.append((uri, executor.submit(self.fetch, uri, storage, path)))
+                if len(pending) >= self.workers * 2:
+                    self._collect(*pending.popleft())
+            while pending:
+                self._collect(*pending.popleft())
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            self.session.close()
+
+        self.cache.evict()
+        if self.on_progress:
+            self.on_progress(dict(self.progress))
+        logger.info(f'Export resources of project {self.project.id} prefetched: {self.progress}')
+        return self.progress
+
+    def _collect(self, uri, future):
+        try:
+            self.progress[future.result()] += 1
+        except Exception:
+            logger.warning(f'Failed to prefetch export resource {uri}', exc_info=True)
+            self.progress['failed'] += 1
+
+        if self.on_progress and time.monotonic() - self.reported_at >= settings.EXPORT_PROGRESS_INTERVAL:
+            self.reported_at = time.monotonic()
+            self.on_progress(dict(self.progress))
+
+    def fetch(self, uri, storage, path):
+        """Link the cached file of the uri to path, downloading it first if it isn't cached"""
+        status = 'cached'
+        cached_path = self.cache.get(uri)
+        if cached_path is None:
+            cached_path = self.cache.put(uri, self.iter_chunks(uri, storage))
+            status = 'downloaded'
+
+        try:
+            os.link(cached_path, path)
+        except FileExistsError:
+            pass
+        except OSError:
+            # the cache is on another file system
+            shutil.copyfile(cached_path, path)
+        return status
+
+    def iter_chunks(self, uri, storage):
+        if storage is not None:
+            stream, _, _ = storage.get_bytes_stream(uri)
+            if stream is None:
+                raise FileNotFoundError(f'{uri} is not found in {storage}')
+            try:
+                yield from stream.iter_chunks(chunk_size=CHUNK_SIZE)
+            finally:
+                try:
+                    stream.close()
+                except Exception as e:
+                    logger.debug(f"Couldn't close stream: {e}")
+            return
+
+        headers = {}
+        # files of this instance are downloaded with the organization token, like the converter does
+        if self.access_token and self.hostname and urlparse(uri).netloc == urlparse(self.hostname).netloc:
+            headers['Authorization'] = 'Token ' + self.access_token
+        timeout = settings.EXPORT_RESOURCES_TIMEOUT
+        with self.session.get(
+            uri, headers=headers, stream=True, timeout=timeout, verify=settings.VERIFY_SSL_CERTS
+        ) as response:
+            response.raise_for_status()
+            yield from response.iter_content(chunk_size=CHUNK_SIZE)
+
+
+def prefetch_resources(converter, project, input_json, output_format, output_dir, on_progress=None):
+    """Prefetch resources of the tasks in the converter input file, if the converter downloads them for the format"""
+    if output_format not in PREFETCH_FORMATS or settings.EXPORT_RESOURCES_WORKERS <= 0:
+        return None
+    # formats with images are available for a single data key only
+    data_keys = get_data_keys(project)
+    if len(data_keys) != 1:
+        return None
+    downloader = ResourceDownloader(project, converter.hostname, converter.access_token, on_progress=on_progress)
+    with open(input_json, 'rb') as f:
+        return downloader.prefetch(iter_json_array(f), data_keys[0], os.path.join(output_dir, 'images'))
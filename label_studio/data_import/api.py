@@ -29,17 +29,15 @@ from rest_framework.response import Response
 from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from tasks.functions import update_tasks_counters
-from tasks.models import Prediction, Task
+from tasks.models import Prediction, PredictionResultNormalizer, Task
 from users.models import User
-from webhooks.models import WebhookAction
-from webhooks.utils import emit_webhooks_for_instance
 
 from label_studio.core.utils.common import load_func
 
 from .functions import (
     async_import_background,
     async_reimport_background,
-    reformat_predictions,
+    save_tasks_in_batches,
     set_import_background_failure,
     set_reimport_background_failure,
 )
@@ -252,73 +250,43 @@ class ImportAPI(generics.CreateAPIView):
     def post(self, *args, **kwargs):
         return super(ImportAPI, self).post(*args, **kwargs)
 
-    def _save(self, tasks):
-        serializer = self.get_serializer(data=tasks, many=True)
-        serializer.is_valid(raise_exception=True)
-        task_instances = serializer.save(project_id=self.kwargs['pk'])
-        project = generics.get_object_or_404(Project.objects.for_user(self.request.user), pk=self.kwargs['pk'])
-        emit_webhooks_for_instance(
-            self.request.user.active_organization, project, WebhookAction.TASKS_CREATED, task_instances
-        )
-        return task_instances, serializer
-
     def sync_import(self, request, project, preannotated_from_fields, commit_to_project, return_task_ids):
         start = time.time()
-        tasks = None
+        task_ids = None
         # upload files from request, and parse all tasks
         # TODO: Stop passing request to load_tasks function, make all validation before
-        parsed_data, file_upload_ids, could_be_tasks_list, found_formats, data_columns = load_tasks(request, project)
-
-        if preannotated_from_fields:
-            # turn flat task JSONs {"column1": value, "column2": value} into {"data": {"column1"..}, "predictions": [{..."column2"}]
-            parsed_data = reformat_predictions(parsed_data, preannotated_from_fields)
+        tasks, file_upload_ids, could_be_tasks_list, stats = load_tasks(request, project)
 
         if commit_to_project:
             # Immediately create project tasks and update project states and counters
-            tasks, serializer = self._save(parsed_data)
-            task_count = len(tasks)
-            annotation_count = len(serializer.db_annotations)
-            prediction_count = len(serializer.db_predictions)
-
-            recalculate_stats_counts = {
-                'task_count': task_count,
-                'annotation_count': annotation_count,
-                'prediction_count': prediction_count,
-            }
-
-            # Update counters (like total_annotations) for new tasks and after bulk update tasks stats. It should be a
-            # single operation as counters affect bulk is_labeled update
-            project.update_tasks_counters_and_task_states(
-                tasks_queryset=tasks,
-                maximum_annotations_changed=False,
-                overlap_cohort_percentage_changed=False,
-                tasks_number_changed=True,
-                recalculate_stats_counts=recalculate_stats_counts,
-            )
+            with transaction.atomic():
+                counts, task_ids = save_tasks_in_batches(
+                    project,
+                    tasks,
+                    context=self.get_serializer_context(),
+                    organization=request.user.active_organization,
+                    summary=project.summary,
+                    preannotated_from_fields=preannotated_from_fields,
+                    return_task_ids=return_task_ids,
+                )
             logger.info('Tasks bulk_update finished (sync import)')
-
-            project.summary.update_data_columns(parsed_data)
             # TODO: project.summary.update_created_annotations_and_labels
         else:
             # Do nothing - just output file upload ids for further use
-            task_count = len(parsed_data)
-            annotation_count = None
-            prediction_count = None
+            counts = {'task_count': sum(1 for _ in tasks), 'annotation_count': None, 'prediction_count': None}
 
         duration = time.time() - start
 
         response = {
-            'task_count': task_count,
-            'annotation_count': annotation_count,
-            'prediction_count': prediction_count,
+            **counts,
             'duration': duration,
             'file_upload_ids': file_upload_ids,
             'could_be_tasks_list': could_be_tasks_list,
-            'found_formats': found_formats,
-            'data_columns': data_columns,
+            'found_formats': stats.get('found_formats', []),
+            'data_columns': list(stats.get('data_columns', [])),
         }
-        if tasks and return_task_ids:
-            response['task_ids'] = [task.id for task in tasks]
+        if task_ids and return_task_ids:
+            response['task_ids'] = task_ids
 
         return Response(response, status=status.HTTP_201_CREATED)
 
@@ -404,22 +372,25 @@ class ImportPredictionsAPI(generics.CreateAPIView):
         logger.debug(
             f'Importing {len(self.request.data)} predictions to project {project} with {len(tasks_ids)} tasks'
         )
-        predictions = []
         for item in self.request.data:
             if item.get('task') not in tasks_ids:
                 raise ValidationError(
                     f'{item} contains invalid "task" field: corresponding task ID couldn\'t be retrieved '
                     f'from project {project} tasks'
                 )
-            predictions.append(
-                Prediction(
-                    task_id=item['task'],
-                    project_id=project.id,
-                    result=Prediction.prepare_prediction_result(item.get('result'), project),
-                    score=item.get('score'),
-                    model_version=item.get('model_version', 'undefined'),
-                )
+        results = PredictionResultNormalizer.for_project(project).normalize_batch(
+            [item.get('result') for item in self.request.data]
+        )
+        predictions = [
+            Prediction(
+                task_id=item['task'],
+                project_id=project.id,
+                result=result,
+                score=item.get('score'),
+                model_version=item.get('model_version', 'undefined'),
             )
+            for item, result in zip(self.request.data, results)
+        ]
         predictions_obj = Prediction.objects.bulk_create(predictions, batch_size=settings.BATCH_SIZE)
         start_job_async_or_sync(update_tasks_counters, Task.objects.filter(id__in=tasks_ids))
         return Response({'created': len(predictions_obj)}, status=status.HTTP_201_CREATED)
@@ -435,46 +406,31 @@ class ReImportAPI(ImportAPI):
 
     def sync_reimport(self, project, file_upload_ids, files_as_tasks_list):
         start = time.time()
-        tasks, found_formats, data_columns = FileUpload.load_tasks_from_uploaded_files(
-            project, file_upload_ids, files_as_tasks_list=files_as_tasks_list
+        stats = {}
+        tasks = FileUpload.iter_tasks_from_uploaded_files(
+            project, file_upload_ids, files_as_tasks_list=files_as_tasks_list, stats=stats
         )
 
         with transaction.atomic():
             project.remove_tasks_by_file_uploads(file_upload_ids)
-            tasks, serializer = self._save(tasks)
+            counts, _ = save_tasks_in_batches(
+                project,
+                tasks,
+                context=self.get_serializer_context(),
+                organization=self.request.user.active_organization,
+                summary=project.summary,
+            )
         duration = time.time() - start
-
-        task_count = len(tasks)
-        annotation_count = len(serializer.db_annotations)
-        prediction_count = len(serializer.db_predictions)
-
-        # Update counters (like total_annotations) for new tasks and after bulk update tasks stats. It should be a
-        # single operation as counters affect bulk is_labeled update
-        project.update_tasks_counters_and_task_states(
-            tasks_queryset=tasks,
-            maximum_annotations_changed=False,
-            overlap_cohort_percentage_changed=False,
-            tasks_number_changed=True,
-            recalculate_stats_counts={
-                'task_count': task_count,
-                'annotation_count': annotation_count,
-                'prediction_count': prediction_count,
-            },
-        )
         logger.info('Tasks bulk_update finished (sync reimport)')
-
-        project.summary.update_data_columns(tasks)
         # TODO: project.summary.update_created_annotations_and_labels
 
         return Response(
             {
-                'task_count': task_count,
-                'annotation_count': annotation_count,
-                'prediction_count': prediction_count,
+                **counts,
                 'duration': duration,
                 'file_upload_ids': file_upload_ids,
-                'found_formats': found_formats,
-                'data_columns': data_columns,
+                'found_formats': stats.get('found_formats', {}),
+                'data_columns': list(stats.get('data_columns', [])),
             },
             status=status.HTTP_201_CREATED,
         )
@@ -1,3 +1,4 @@
+import itertools
 import logging
 import time
 import traceback
@@ -7,6 +8,7 @@ from core.utils.common import load_func
 from django.conf import settings
 from django.db import transaction
 from projects.models import ProjectImport, ProjectReimport, ProjectSummary
+from tasks.models import Task
 from users.models import User
 from webhooks.models import WebhookAction
 from webhooks.utils import emit_webhooks_for_instance
@@ -37,71 +39,179 @@ def async_import_background(
 
     start = time.time()
     project = project_import.project
-    tasks = None
     # upload files from request, and parse all tasks
     # TODO: Stop passing request to load_tasks function, make all validation before
-    tasks, file_upload_ids, found_formats, data_columns = load_tasks_for_async_import(project_import, user)
+    tasks, file_upload_ids, stats = load_tasks_for_async_import(project_import, user)
 
-    if project_import.preannotated_from_fields:
-        # turn flat task JSONs {"column1": value, "column2": value} into {"data": {"column1"..}, "predictions": [{..."column2"}]
-        tasks = reformat_predictions(tasks, project_import.preannotated_from_fields)
-
-    if project_import.commit_to_project:
+    task_ids = None
+    if project_import.commit_to_project and settings.IMPORT_ASYNC_COMMIT_IN_BATCHES:
+        # Immediately create project tasks batch by batch, without locking the summary for the whole import
+        counts, task_ids = commit_tasks_in_batches(
+            project_import, tasks, context={'project': project}, organization=user.active_organization
+        )
+        logger.info('Tasks bulk_update finished (async import)')
+        # TODO: summary.update_created_annotations_and_labels
+    elif project_import.commit_to_project:
         with transaction.atomic():
             # Lock summary for update to avoid race conditions
             summary = ProjectSummary.objects.select_for_update().get(project=project)
 
             # Immediately create project tasks and update project states and counters
-            serializer = ImportApiSerializer(data=tasks, many=True, context={'project': project})
-            serializer.is_valid(raise_exception=True)
-            tasks = serializer.save(project_id=project.id)
-            emit_webhooks_for_instance(user.active_organization, project, WebhookAction.TASKS_CREATED, tasks)
-
-            task_count = len(tasks)
-            annotation_count = len(serializer.db_annotations)
-            prediction_count = len(serializer.db_predictions)
-            # Update counters (like total_annotations) for new tasks and after bulk update tasks stats. It should be a
-            # single operation as counters affect bulk is_labeled update
-
-            recalculate_stats_counts = {
-                'task_count': task_count,
-                'annotation_count': annotation_count,
-                'prediction_count': prediction_count,
-            }
-
-            project.update_tasks_counters_and_task_states(
-                tasks_queryset=tasks,
-                maximum_annotations_changed=False,
-                overlap_cohort_percentage_changed=False,
-                tasks_number_changed=True,
-                recalculate_stats_counts=recalculate_stats_counts,
+            counts, task_ids = save_tasks_in_batches(
+                project,
+                tasks,
+                context={'project': project},
+                organization=user.active_organization,
+                summary=summary,
+                preannotated_from_fields=project_import.preannotated_from_fields,
+                return_task_ids=project_import.return_task_ids,
             )
             logger.info('Tasks bulk_update finished (async import)')
-
-            summary.update_data_columns(tasks)
             # TODO: summary.update_created_annotations_and_labels
     else:
         # Do nothing - just output file upload ids for further use
-        task_count = len(tasks)
-        annotation_count = None
-        prediction_count = None
+        counts = {'task_count': sum(1 for _ in tasks), 'annotation_count': None, 'prediction_count': None}
 
     duration = time.time() - start
 
-    project_import.task_count = task_count or 0
-    project_import.annotation_count = annotation_count or 0
-    project_import.prediction_count = prediction_count or 0
+    project_import.task_count = counts['task_count'] or 0
+    project_import.annotation_count = counts['annotation_count'] or 0
+    project_import.prediction_count = counts['prediction_count'] or 0
     project_import.duration = duration
     project_import.file_upload_ids = file_upload_ids
-    project_import.found_formats = found_formats
-    project_import.data_columns = data_columns
+    project_import.found_formats = stats.get('found_formats', [])
+    project_import.data_columns = list(stats.get('data_columns', []))
     if project_import.return_task_ids:
-        project_import.task_ids = [task.id for task in tasks]
+        project_import.task_ids = task_ids or []
 
     project_import.status = ProjectImport.Status.COMPLETED
     project_import.save()
 
 
+def save_tasks_batch(project, batch, context, organization, item_offset=0, preannotated_from_fields=None):
+    """Validate and save one batch of tasks with ImportApiSerializer and update counters of the saved tasks.
+
+    Returns the saved tasks and their task, annotation and prediction counts.
+    """
+    if preannotated_from_fields:
+        # turn flat task JSONs {"column1": value, "column2": value} into {"data": {"column1"..}, "predictions": [{..."column2"}]
+        batch = reformat_predictions(batch, preannotated_from_fields)
+
+    # item numbers in validation errors are counted from the first imported task
+    serializer = ImportApiSerializer(data=batch, many=True, context={**context, 'item_offset': item_offset})
+    serializer.is_valid(raise_exception=True)
+    db_tasks = serializer.save(project_id=project.id)
+    emit_webhooks_for_instance(organization, project, WebhookAction.TASKS_CREATED, db_tasks)
+
+    batch_counts = {
+        'task_count': len(db_tasks),
+        'annotation_count': len(serializer.db_annotations),
+        'prediction_count': len(serializer.db_predictions),
+    }
+    # Update counters (like total_annotations) for new tasks and after bulk update tasks stats. It should be a
+    # single operation as counters affect bulk is_labeled update
+    project.update_tasks_counters_and_task_states(
+        tasks_queryset=db_tasks,
+        maximum_annotations_changed=False,
+        overlap_cohort_percentage_changed=False,
+        tasks_number_changed=False,
+        recalculate_stats_counts=batch_counts,
+    )
+    return db_tasks, batch_counts
+
+
+def save_tasks_in_batches(
+    project, tasks, context, organization, summary, preannotated_from_fields=None, return_task_ids=False
+):
+    """Validate and save tasks with ImportApiSerializer in batches of IMPORT_BATCH_SIZE tasks.
+
+    Tasks can be a generator, only one batch of them is kept in memory. Counters and data columns are updated
+    for every saved batch, overlap cohort once after the last one. Call it in a transaction to save all tasks
+    or none of them. Returns the task, annotation and prediction counts and the task ids if return_task_ids is set.
+    """
+    counts = {'task_count': 0, 'annotation_count': 0, 'prediction_count': 0}
+    task_ids = [] if return_task_ids else None
+    tasks = iter(tasks)
+    while batch := list(itertools.islice(tasks, settings.IMPORT_BATCH_SIZE)):
+        db_tasks, batch_counts = save_tasks_batch(
+            project, batch, context, organization, counts['task_count'], preannotated_from_fields
+        )
+        summary.update_data_columns(db_tasks)
+
+        for key, count in batch_counts.items():
+            counts[key] += count
+        if return_task_ids:
+            task_ids += [task.id for task in db_tasks]
+
+    if counts['task_count']:
+        project.update_tasks_states(
+            maximum_annotations_changed=False, overlap_cohort_percentage_changed=False, tasks_number_changed=True
+        )
+    return counts, task_ids
+
+
+def commit_tasks_in_batches(project_import, tasks, context, organization):
+    """Save tasks of an async import like save_tasks_in_batches(), committing every batch in its own transaction.
+
+    The project summary is locked only at the end of each batch transaction to merge data columns of the batch,
+    so annotations can be saved in the project during long imports. Counts of the import are updated after
+    every batch to be polled as progress. If a batch fails, already committed tasks of the import are deleted.
+    Returns the task, annotation and prediction counts and the task ids if return_task_ids of the import is set.
+    """
+    project = project_import.project
+    counts = {'task_count': 0, 'annotation_count': 0, 'prediction_count': 0}
+    task_ids = []
+    tasks = iter(tasks)
+    try:
+        while batch := list(itertools.islice(tasks, settings.IMPORT_BATCH_SIZE)):
+            with transaction.atomic():
+                db_tasks, batch_counts = save_tasks_batch(
+                    project,
+                    batch,
+                    context,
+                    organization,
+                    counts['task_count'],
+                    project_import.preannotated_from_fields,
+                )
+                summary = ProjectSummary.objects.select_for_update().get(project=project)
+                summary.update_data_columns(db_tasks)
+
+                progress = {key: counts[key] + count for key, count in batch_counts.items()}
+                ProjectImport.objects.filter(id=project_import.id).update(**progress)
+            counts = progress
+            task_ids += [task.id for task in db_tasks]
+            logger.info(f'Import {project_import.id}: {counts["task_count"]} tasks committed')
+    except Exception:
+        if task_ids:
+            logger.info(f'Import {project_import.id} failed, deleting {len(task_ids)} committed tasks')
+            delete_committed_tasks(project, task_ids, organization)
+            ProjectImport.objects.filter(id=project_import.id).update(
+                task_count=0, annotation_count=0, prediction_count=0
+            )
+        raise
+    finally:
+        if task_ids:
+            project.update_tasks_states(
+                maximum_annotations_changed=False, overlap_cohort_percentage_changed=False, tasks_number_changed=True
+            )
+
+    return counts, task_ids if project_import.return_task_ids else None
+
+
+def delete_committed_tasks(project, task_ids, organization):
+    """Delete tasks of a failed import in batches, removing their data columns from the project summary"""
+    for start in range(0, len(task_ids), settings.IMPORT_BATCH_SIZE):
+        batch_ids = task_ids[start : start + settings.IMPORT_BATCH_SIZE]
+        with transaction.atomic():
+            queryset = Task.objects.filter(id__in=batch_ids)
+            summary = ProjectSummary.objects.select_for_update().get(project=project)
+            summary.remove_data_columns(queryset)
+            Task.delete_tasks_without_signals(queryset)
+        emit_webhooks_for_instance(
+            organization, project, WebhookAction.TASKS_DELETED, [{'id': task_id} for task_id in batch_ids]
+        )
+
+
 def set_import_background_failure(job, connection, type, value, _):
     import_id = job.args[0]
     ProjectImport.objects.filter(id=import_id).update(
@@ -147,8 +257,9 @@ def async_reimport_background(reimport_id, organization_id, user, **kwargs):
 
     project = reimport.project
 
-    tasks, found_formats, data_columns = FileUpload.load_tasks_from_uploaded_files(
-        reimport.project, reimport.file_upload_ids, files_as_tasks_list=reimport.files_as_tasks_list
+    stats = {}
+    tasks = FileUpload.iter_tasks_from_uploaded_files(
+        reimport.project, reimport.file_upload_ids, files_as_tasks_list=reimport.files_as_tasks_list, stats=stats
     )
 
     with transaction.atomic():
@@ -156,40 +267,21 @@ def async_reimport_background(reimport_id, organization_id, user, **kwargs):
         summary = ProjectSummary.objects.select_for_update().get(project=project)
 
         project.remove_tasks_by_file_uploads(reimport.file_upload_ids)
-        serializer = ImportApiSerializer(data=tasks, many=True, context={'project': project, 'user': user})
-        serializer.is_valid(raise_exception=True)
-        tasks = serializer.save(project_id=project.id)
-        emit_webhooks_for_instance(organization_id, project, WebhookAction.TASKS_CREATED, tasks)
-
-        task_count = len(tasks)
-        annotation_count = len(serializer.db_annotations)
-        prediction_count = len(serializer.db_predictions)
-
-        recalculate_stats_counts = {
-            'task_count': task_count,
-            'annotation_count': annotation_count,
-            'prediction_count': prediction_count,
-        }
-
-        # Update counters (like total_annotations) for new tasks and after bulk update tasks stats. It should be a
-        # single operation as counters affect bulk is_labeled update
-        project.update_tasks_counters_and_task_states(
-            tasks_queryset=tasks,
-            maximum_annotations_changed=False,
-            overlap_cohort_percentage_changed=False,
-            tasks_number_changed=True,
-            recalculate_stats_counts=recalculate_stats_counts,
+        counts, _ = save_tasks_in_batches(
+            project,
+            tasks,
+            context={'project': project, 'user': user},
+            organization=organization_id,
+            summary=summary,
         )
         logger.info('Tasks bulk_update finished (async reimport)')
-
-        summary.update_data_columns(tasks)
         # TODO: summary.update_created_annotations_and_labels
 
-    reimport.task_count = task_count
-    reimport.annotation_count = annotation_count
-    reimport.prediction_count = prediction_count
-    reimport.found_formats = found_formats
-    reimport.data_columns = list(data_columns)
+    reimport.task_count = counts['task_count']
+    reimport.annotation_count = counts['annotation_count']
+    reimport.prediction_count = counts['prediction_count']
+    reimport.found_formats = stats.get('found_formats', {})
+    reimport.data_columns = list(stats.get('data_columns', []))
     reimport.status = ProjectReimport.Status.COMPLETED
     reimport.save()
 
@@ -3,9 +3,11 @@
 import logging
 import os
 import uuid
-from collections import Counter
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from core.utils.io import iter_json_array
 
 try:
     import ujson as json
@@ -73,40 +75,45 @@ class FileUpload(models.Model):
             setattr(self, '_file_body', body)
         return body
 
-    def read_tasks_list_from_csv(self, sep=','):
+    def iter_tasks_list_from_csv(self, sep=','):
+        """Read CSV rows in chunks of IMPORT_CSV_CHUNK_SIZE rows.
+
+        Rows are read twice: column types are inferred over the whole file first,
+        so like with one DataFrame a column of numbers with a single text value is a text column in all rows.
+        """
         logger.debug('Read tasks list from CSV file {}'.format(self.filepath))
-        tasks = pd.read_csv(self.file.open(), sep=sep).fillna('').to_dict('records')
-        tasks = [{'data': task} for task in tasks]
-        return tasks
+        with self.file.open('rb') as f:
+            column_types = _csv_column_types(_read_csv_chunks(f, sep))
+            for chunk in _read_csv_chunks(f, sep):
+                for row in _csv_records(chunk, column_types):
+                    yield {'data': row}
 
-    def read_tasks_list_from_tsv(self):
-        return self.read_tasks_list_from_csv('\t')
+    def iter_tasks_list_from_tsv(self):
+        return self.iter_tasks_list_from_csv('\t')
 
-    def read_tasks_list_from_txt(self):
+    def iter_tasks_list_from_txt(self):
         logger.debug('Read tasks list from text file {}'.format(self.filepath))
-        lines = self.content.splitlines()
-        tasks = [{'data': {settings.DATA_UNDEFINED_NAME: line}} for line in lines]
-        return tasks
+        with self.file.open('rb') as f:
+            for line in f:
+                yield {'data': {settings.DATA_UNDEFINED_NAME: line.decode('utf-8').rstrip('\r\n')}}
 
-    def read_tasks_list_from_json(self):
+    def iter_tasks_list_from_json(self):
+        """Read a JSON array of tasks item by item, or one task from a JSON object"""
         logger.debug('Read tasks list from JSON file {}'.format(self.filepath))
+        with self.file.open('rb') as f:
+            if _first_char(f) == b'{':
+                tasks = [json.load(f)]
+            else:
+                tasks = iter_json_array(f)
+            for task in tasks:
+                yield _format_json_task(task)
 
-        raw_data = self.content
-        # Python 3.5 compatibility fix https://docs.python.org/3/whatsnew/3.6.html#json
-        try:
-            tasks = json.loads(raw_data)
-        except TypeError:
-            tasks = json.loads(raw_data.decode('utf8'))
-        if isinstance(tasks, dict):
-            tasks = [tasks]
-        tasks_formatted = []
-        for i, task in enumerate(tasks):
-            if not task.get('data'):
-                task = {'data': task}
-            if not isinstance(task['data'], dict):
-                raise ValidationError('Task item should be dict')
-            tasks_formatted.append(task)
-        return tasks_formatted
+    def iter_tasks_list_from_jsonl(self):
+        logger.debug('Read tasks list from JSONL file {}'.format(self.filepath))
+        with self.file.open('rb') as f:
+            for line in f:
+                if line.strip():
+                    yield _format_json_task(json.loads(line))
 
     def read_task_from_hypertext_body(self):
         logger.debug('Read 1 task from hypertext file {}'.format(self.filepath))
@@ -126,18 +133,21 @@ class FileUpload(models.Model):
     def format_could_be_tasks_list(self):
         return self.format in ('.csv', '.tsv', '.txt')
 
-    def read_tasks(self, file_as_tasks_list=True):
+    def iter_tasks(self, file_as_tasks_list=True):
+        """Yield tasks of the file one by one, tasks lists are read incrementally"""
         file_format = self.format
         try:
             # file as tasks list
             if file_format == '.csv' and file_as_tasks_list:
-                tasks = self.read_tasks_list_from_csv()
+                yield from self.iter_tasks_list_from_csv()
             elif file_format == '.tsv' and file_as_tasks_list:
-                tasks = self.read_tasks_list_from_tsv()
+                yield from self.iter_tasks_list_from_tsv()
             elif file_format == '.txt' and file_as_tasks_list:
-                tasks = self.read_tasks_list_from_txt()
+                yield from self.iter_tasks_list_from_txt()
             elif file_format == '.json':
-                tasks = self.read_tasks_list_from_json()
+                yield from self.iter_tasks_list_from_json()
+            elif file_format == '.jsonl':
+                yield from self.iter_tasks_list_from_jsonl()
 
             # otherwise - only one object tag should be presented in label config
             elif not self.project.one_object_in_label_config:
@@ -148,21 +158,28 @@ class FileUpload(models.Model):
 
             # file as a single asset
             elif file_format in ('.html', '.htm', '.xml'):
-                tasks = self.read_task_from_hypertext_body()
+                yield from self.read_task_from_hypertext_body()
             else:
-                tasks = self.read_task_from_uploaded_file()
+                yield from self.read_task_from_uploaded_file()
 
         except Exception as exc:
             raise ValidationError('Failed to parse input file ' + self.file_name + ': ' + str(exc))
-        return tasks
+
+    def read_tasks(self, file_as_tasks_list=True):
+        return list(self.iter_tasks(file_as_tasks_list))
 
     @classmethod
-    def load_tasks_from_uploaded_files(
-        cls, project, file_upload_ids=None, formats=None, files_as_tasks_list=True, trim_size=None
+    def iter_tasks_from_uploaded_files(
+        cls, project, file_upload_ids=None, formats=None, files_as_tasks_list=True, stats=None
     ):
-        tasks = []
-        fileformats = []
-        common_data_fields = set()
+        """Yield tasks of uploaded files one by one, without loading whole files.
+
+        Found formats and common data fields are collected into the `stats` dict as `found_formats`
+        and `data_columns` while tasks are consumed, so they are complete only after the last task.
+        """
+        stats = {} if stats is None else stats
+        found_formats = stats.setdefault('found_formats', {})
+        common_data_fields = stats.setdefault('data_columns', set())
 
         # scan all files
         file_uploads = FileUpload.objects.filter(project=project)
@@ -172,30 +189,109 @@ class FileUpload(models.Model):
             file_format = file_upload.format
             if formats and file_format not in formats:
                 continue
-            new_tasks = file_upload.read_tasks(files_as_tasks_list)
-            for task in new_tasks:
-                task['file_upload_id'] = file_upload.id
-
-            new_data_fields = set(iter(new_tasks[0]['data'].keys())) if len(new_tasks) > 0 else set()
-            if not common_data_fields:
-                common_data_fields = new_data_fields
-            elif not common_data_fields.intersection(new_data_fields):
-                raise ValidationError(
-                    _old_vs_new_data_keys_inconsistency_message(
-                        new_data_fields, common_data_fields, file_upload.file.name
-                    )
-                )
-            else:
-                common_data_fields &= new_data_fields
-
-            tasks += new_tasks
-            fileformats.append(file_format)
 
-            if trim_size is not None:
-                if len(tasks) > trim_size:
-                    break
+            first = True
+            for task in file_upload.iter_tasks(files_as_tasks_list):
+                task['file_upload_id'] = file_upload.id
+                if first:
+                    first = False
+                    new_data_fields = set(task['data'].keys())
+                    if not common_data_fields:
+                        common_data_fields.update(new_data_fields)
+                    elif not common_data_fields.intersection(new_data_fields):
+                        raise ValidationError(
+                            _old_vs_new_data_keys_inconsistency_message(
+                                new_data_fields, common_data_fields, file_upload.file.name
+                            )
+                        )
+                    else:
+                        common_data_fields &= new_data_fields
+                yield task
+
+            found_formats[file_format] = found_formats.get(file_format, 0) + 1
 
-        return tasks, dict(Counter(fileformats)), common_data_fields
+    @classmethod
+    def load_tasks_from_uploaded_files(
+        cls, project, file_upload_ids=None, formats=None, files_as_tasks_list=True, trim_size=None
+    ):
+        tasks, stats = [], {}
+        for task in cls.iter_tasks_from_uploaded_files(project, file_upload_ids, formats, files_as_tasks_list, stats):
+            # files are read whole, up to the first one after trim_size tasks
+            next_file = tasks and task['file_upload_id'] != tasks[-1]['file_upload_id']
+            if trim_size is not None and len(tasks) > trim_size and next_file:
+                break
+            tasks.append(task)
+
+        return tasks, stats['found_formats'], stats['data_columns']
+
+
+def _first_char(file):
+    """First not whitespace byte of a binary file, the file is rewound"""
+    char = b''
+    while chunk := file.read(1024):
+        chunk = chunk.lstrip()
+        if chunk:
+            char = chunk[:1]
+            break
+    file.seek(0)
+    return char
+
+
+def _format_json_task(task):
+    if not task.get('data'):
+        task = {'data': task}
+    if not isinstance(task['data'], dict):
+        raise ValidationError('Task item should be dict')
+    return task
+
+
+def _read_csv_chunks(file, sep):
+    file.seek(0)
+    return pd.read_csv(file, sep=sep, dtype=str, chunksize=settings.IMPORT_CSV_CHUNK_SIZE)
+
+
+# types of CSV columns in the order of preference, columns that fit none of them are text
+CSV_COLUMN_TYPES = (pa.int64(), pa.float64(), pa.bool_())
+
+
+def _csv_column(values, column_type=None):
+    array = pa.array(values, type=pa.string(), from_pandas=True)
+    if column_type is None:
+        return array
+    if pa.types.is_boolean(column_type):
+        # like pandas, only true and false are booleans, not 1 and 0
+        array = pc.utf8_lower(array)
+        if pc.all(pc.is_in(array.drop_null(), value_set=pa.array(['true', 'false']))).as_py() is False:
+            raise pa.ArrowInvalid('Not a boolean column')
+    else:
+        # like pandas, numbers can be surrounded by spaces
+        array = pc.utf8_trim_whitespace(array)
+    return array.cast(column_type)
+
+
+def _csv_column_types(chunks):
+    """Types of CSV columns: the first of CSV_COLUMN_TYPES all values of a column can be cast to"""
+    candidates = {}
+    with chunks:
+        for chunk in chunks:
+            for name, values in chunk.items():
+                types = candidates.setdefault(name, list(CSV_COLUMN_TYPES))
+                for column_type in list(types):
+                    try:
+                        _csv_column(values, column_type)
+                    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                        types.remove(column_type)
+    return {name: types[0] if types else pa.string() for name, types in candidates.items()}
+
+
+def _csv_records(chunk, column_types):
+    """Rows of a CSV chunk as dicts, missing values are empty strings"""
+    columns = {
+        name: _csv_column(values, None if column_types[name] == pa.string() else column_types[name]).to_pylist()
+        for name, values in chunk.items()
+    }
+    for row in zip(*columns.values()):
+        yield {name: '' if value is None else value for name, value in zip(columns, row)}
 
 
 def _old_vs_new_data_keys_inconsistency_message(new_data_keys, old_data_keys, current_file):
@@ -5,6 +5,7 @@ import io
 import logging
 import mimetypes
 import os
+from types import GeneratorType
 
 try:
     import ujson as json
@@ -48,6 +49,38 @@ def check_max_task_number(tasks):
         )
 
 
+def iter_checked_tasks(tasks):
+    """Yield tasks checking that there are any and not more than TASKS_MAX_NUMBER, without loading them all"""
+    count = 0
+    for task in tasks:
+        count += 1
+        if count > settings.TASKS_MAX_NUMBER:
+            raise ValidationError(
+                f'Maximum task number is {settings.TASKS_MAX_NUMBER}, current task number is more than that'
+            )
+        yield task
+
+    if not count:
+        raise ValidationError('load_tasks: No tasks added')
+
+
+def check_tasks(tasks):
+    """Check loaded tasks, tasks of uploaded files are streamed and checked while they are consumed"""
+    # check is data root is list
+    if not isinstance(tasks, (list, GeneratorType)):
+        raise ValidationError('load_tasks: Data root must be list')
+
+    if isinstance(tasks, GeneratorType):
+        return iter_checked_tasks(tasks)
+
+    # empty tasks error
+    if not tasks:
+        raise ValidationError('load_tasks: No tasks added')
+
+    check_max_task_number(tasks)
+    return tasks
+
+
 def check_tasks_max_file_size(value):
     if value >= settings.TASKS_MAX_FILE_SIZE:
         raise ValidationError(
@@ -122,8 +155,8 @@ def str_to_json(data):
         return None
 
 
-def tasks_from_url(file_upload_ids, project, user, url, could_be_tasks_list):
-    """Download file using URL and read tasks from it"""
+def tasks_from_url(file_upload_ids, project, user, url, could_be_tasks_list, stats):
+    """Download file using URL and stream tasks from it, see FileUpload.iter_tasks_from_uploaded_files()"""
     # process URL with tasks
     try:
         filename = url.rsplit('/', 1)[-1]
@@ -137,13 +170,13 @@ def tasks_from_url(file_upload_ids, project, user, url, could_be_tasks_list):
         if file_upload.format_could_be_tasks_list:
             could_be_tasks_list = True
         file_upload_ids.append(file_upload.id)
-        tasks, found_formats, data_keys = FileUpload.load_tasks_from_uploaded_files(project, file_upload_ids)
 
     except ValidationError as e:
         raise e
     except Exception as e:
         raise ValidationError(str(e))
-    return data_keys, found_formats, tasks, file_upload_ids, could_be_tasks_list
+    tasks = FileUpload.iter_tasks_from_uploaded_files(project, file_upload_ids, stats=stats)
+    return tasks, file_upload_ids, could_be_tasks_list
 
 
 @timeit
@@ -163,14 +196,16 @@ def create_file_uploads(user, project, FILES):
 
 
 def load_tasks_for_async_import(project_import, user):
-    """Load tasks from different types of request.data / request.files saved in project_import model"""
-    file_upload_ids, found_formats, data_keys = [], [], set()
+    """Load tasks from different types of request.data / request.files saved in project_import model.
+
+    Tasks of uploaded files are returned as a generator, `stats` gets their found formats and data columns
+    only after it's consumed.
+    """
+    tasks, file_upload_ids, stats = None, [], {}
 
     if project_import.file_upload_ids:
         file_upload_ids = project_import.file_upload_ids
-        tasks, found_formats, data_keys = FileUpload.load_tasks_from_uploaded_files(
-            project_import.project, file_upload_ids
-        )
+        tasks = FileUpload.iter_tasks_from_uploaded_files(project_import.project, file_upload_ids, stats=stats)
 
     # take tasks from url address
     elif project_import.url:
@@ -184,20 +219,13 @@ def load_tasks_for_async_import(project_import, user):
                 SimpleUploadedFile('inplace.json', url.encode()),
             )
             file_upload_ids.append(file_upload.id)
-            tasks, found_formats, data_keys = FileUpload.load_tasks_from_uploaded_files(
-                project_import.project, file_upload_ids
-            )
+            tasks = FileUpload.iter_tasks_from_uploaded_files(project_import.project, file_upload_ids, stats=stats)
 
         # download file using url and read tasks from it
         else:
-            could_be_tasks_list = False
-            (
-                data_keys,
-                found_formats,
-                tasks,
-                file_upload_ids,
-                could_be_tasks_list,
-            ) = tasks_from_url(file_upload_ids, project_import.project, user, url, could_be_tasks_list)
+            tasks, file_upload_ids, could_be_tasks_list = tasks_from_url(
+                file_upload_ids, project_import.project, user, url, False, stats
+            )
             if could_be_tasks_list:
                 project_import.could_be_tasks_list = True
                 project_import.save(update_fields=['could_be_tasks_list'])
@@ -205,21 +233,12 @@ def load_tasks_for_async_import(project_import, user):
     elif project_import.tasks:
         tasks = project_import.tasks
 
-    # check is data root is list
-    if not isinstance(tasks, list):
-        raise ValidationError('load_tasks: Data root must be list')
-
-    # empty tasks error
-    if not tasks:
-        raise ValidationError('load_tasks: No tasks added')
-
-    check_max_task_number(tasks)
-    return tasks, file_upload_ids, found_formats, list(data_keys)
+    return check_tasks(tasks), file_upload_ids, stats
 
 
 def load_tasks(request, project):
-    """Load tasks from different types of request.data / request.files"""
-    file_upload_ids, found_formats, data_keys = [], [], set()
+    """Load tasks from different types of request.data / request.files, see load_tasks_for_async_import()"""
+    tasks, file_upload_ids, stats = None, [], {}
     could_be_tasks_list = False
 
     # take tasks from request FILES
@@ -231,7 +250,7 @@ def load_tasks(request, project):
             if file_upload.format_could_be_tasks_list:
                 could_be_tasks_list = True
             file_upload_ids.append(file_upload.id)
-        tasks, found_formats, data_keys = FileUpload.load_tasks_from_uploaded_files(project, file_upload_ids)
+        tasks = FileUpload.iter_tasks_from_uploaded_files(project, file_upload_ids, stats=stats)
 
     # take tasks from url address
     elif 'application/x-www-form-urlencoded' in request.content_type:
@@ -245,17 +264,13 @@ def load_tasks(request, project):
         if json_data:
             file_upload = create_file_upload(request.user, project, SimpleUploadedFile('inplace.json', url.encode()))
             file_upload_ids.append(file_upload.id)
-            tasks, found_formats, data_keys = FileUpload.load_tasks_from_uploaded_files(project, file_upload_ids)
+            tasks = FileUpload.iter_tasks_from_uploaded_files(project, file_upload_ids, stats=stats)
 
         # download file using url and read tasks from it
         else:
-            (
-                data_keys,
-                found_formats,
-                tasks,
-                file_upload_ids,
-                could_be_tasks_list,
-            ) = tasks_from_url(file_upload_ids, project, request.user, url, could_be_tasks_list)
+            tasks, file_upload_ids, could_be_tasks_list = tasks_from_url(
+                file_upload_ids, project, request.user, url, could_be_tasks_list, stats
+            )
 
     # take one task from request DATA
     elif 'application/json' in request.content_type and isinstance(request.data, dict):
@@ -269,13 +284,4 @@ def load_tasks(request, project):
     else:
         raise ValidationError('load_tasks: No data found in DATA or in FILES')
 
-    # check is data root is list
-    if not isinstance(tasks, list):
-        raise ValidationError('load_tasks: Data root must be list')
-
-    # empty tasks error
-    if not tasks:
-        raise ValidationError('load_tasks: No tasks added')
-
-    check_max_task_number(tasks)
-    return tasks, file_upload_ids, could_be_tasks_list, found_formats, list(data_keys)
+    return check_tasks(tasks), file_upload_ids, could_be_tasks_list, stats
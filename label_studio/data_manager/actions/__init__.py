@@ -12,6 +12,7 @@ import traceback as tb
 from importlib import import_module
 
 from core.feature_flags import flag_set
+from data_manager.counts import invalidate_tasks_counts
 from data_manager.functions import DataManagerException
 from django.conf import settings
 from rest_framework.exceptions import PermissionDenied as DRFPermissionDenied
@@ -116,6 +117,8 @@ def perform_action(action_id, project, queryset, user, **kwargs):
         logger.error(text, extra={'sentry_skip': True})
         raise e
 
+    # actions change tasks in bulk without model signals
+    invalidate_tasks_counts(project.id)
     return result
 
 
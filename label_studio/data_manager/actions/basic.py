@@ -83,12 +83,19 @@ def delete_tasks_annotations(project, queryset, **kwargs):
     # take only tasks where annotations were deleted
     real_task_ids = set(list(annotations.values_list('task__id', flat=True)))
     annotations_ids = list(annotations.values('id'))
-    # remove deleted annotations from project.summary
-    project.summary.remove_created_annotations_and_labels(annotations)
+    # remove deleted annotations from project.summary,
+    # counters are reset at once when no annotations are left in the project
+    if Annotation.objects.filter(project=project).exclude(task__id__in=task_ids).exists():
+        project.summary.remove_created_annotations_and_labels(annotations)
+    else:
+        project.summary.reset_created_annotations_and_labels()
     # also remove drafts for the task. This includes task and annotation level
     # drafts by design.
     drafts = AnnotationDraft.objects.filter(task__id__in=task_ids)
-    project.summary.remove_created_drafts_and_labels(drafts)
+    if AnnotationDraft.objects.filter(task__project=project).exclude(task__id__in=task_ids).exists():
+        project.summary.remove_created_drafts_and_labels(drafts)
+    else:
+        project.summary.reset_created_labels_drafts()
 
     annotations.delete()
     drafts.delete()  # since task-level annotation drafts will not have been deleted by CASCADE
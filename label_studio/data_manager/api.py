@@ -1,26 +1,40 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
+import base64
 import logging
+from datetime import datetime
 
+import ujson as json
 from asgiref.sync import async_to_sync, sync_to_async
 from core.feature_flags import flag_set
 from core.permissions import ViewClassPermission, all_permissions
+from core.redis import start_job_async_or_sync
 from core.utils.common import int_from_request, load_func
 from core.utils.params import bool_from_request
 from data_manager.actions import get_all_actions, perform_action
-from data_manager.functions import evaluate_predictions, get_prepare_params, get_prepared_queryset
+from data_manager.counts import get_tasks_counts
+from data_manager.functions import (
+    build_data_column_index,
+    drop_data_column_index,
+    evaluate_predictions,
+    get_prepare_params,
+    get_prepared_queryset,
+    set_indexed_data_column_status,
+)
 from data_manager.managers import get_fields_for_evaluation
 from data_manager.models import View
 from data_manager.prepare_params import filters_schema, ordering_schema, prepare_params_schema
 from data_manager.serializers import (
     DataManagerTaskSerializer,
+    IndexedDataColumnSerializer,
     ViewOrderSerializer,
     ViewResetSerializer,
     ViewSerializer,
 )
 from django.conf import settings
-from django.db.models import Sum
-from django.db.models.functions import Coalesce
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db.models import ExpressionWrapper, F, Q
+from django.db.models.expressions import OrderBy
 from django.utils.decorators import method_decorator
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg import openapi
@@ -29,6 +43,7 @@ from projects.models import Project
 from projects.serializers import ProjectSerializer
 from rest_framework import generics, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -208,8 +223,11 @@ class ViewAPI(viewsets.ModelViewSet):
 class TaskPagination(PageNumberPagination):
     page_size = 100
     page_size_query_param = 'page_size'
+    approximate_count_query_param = 'approximate_count'
+    total = None
     total_annotations = 0
     total_predictions = 0
+    total_is_estimated = False
     max_page_size = settings.TASK_API_PAGE_SIZE_MAX
 
     @async_to_sync
@@ -221,18 +239,35 @@ class TaskPagination(PageNumberPagination):
         self.total_annotations = await sync_to_async(annotations_count_qs.count, thread_sensitive=True)()
         return await sync_to_async(super().paginate_queryset, thread_sensitive=True)(queryset, request, view)
 
-    def sync_paginate_queryset(self, queryset, request, view=None):
+    def django_paginator_class(self, object_list, per_page):
+        """Django paginator which reuses the total calculated together with annotation and prediction totals"""
+        paginator = DjangoPaginator(object_list, per_page)
+        if self.total is not None:
+            paginator.count = self.total
+        return paginator
+
+    def count_related(self, queryset):
         self.total_predictions = Prediction.objects.filter(task_id__in=queryset).count()
         self.total_annotations = Annotation.objects.filter(task_id__in=queryset, was_cancelled=False).count()
-        return super().paginate_queryset(queryset, request, view)
 
-    def paginate_totals_queryset(self, queryset, request, view=None):
-        totals = queryset.values('id').aggregate(
-            total_annotations=Coalesce(Sum('total_annotations'), 0),
-            total_predictions=Coalesce(Sum('total_predictions'), 0),
-        )
+    def count_totals(self, queryset, request=None, view=None):
+        """Count tasks, annotations and predictions of the filtered view, counts are cached per project data version.
+        With ?approximate_count=1 big views get planner estimates and `total_is_estimated` in the response.
+        """
+        project = getattr(view, 'project', None)
+        approximate = request is not None and bool_from_request(request.GET, self.approximate_count_query_param, False)
+        totals = get_tasks_counts(queryset, project_id=project.id if project else None, approximate=approximate)
+        self.total = totals['total']
         self.total_annotations = totals['total_annotations']
         self.total_predictions = totals['total_predictions']
+        self.total_is_estimated = totals['total_is_estimated']
+
+    def sync_paginate_queryset(self, queryset, request, view=None):
+        self.count_related(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def paginate_totals_queryset(self, queryset, request, view=None):
+        self.count_totals(queryset, request, view)
         return super().paginate_queryset(queryset, request, view)
 
     def paginate_queryset(self, queryset, request, view=None):
@@ -246,6 +281,128 @@ class TaskPagination(PageNumberPagination):
                 'total_annotations': self.total_annotations,
                 'total_predictions': self.total_predictions,
                 'total': self.page.paginator.count,
+                'total_is_estimated': self.total_is_estimated,
+                'tasks': data,
+            }
+        )
+
+
+class TaskCursorPagination(TaskPagination):
+    """Keyset (seek) pagination for the task list
+
+    Tasks are ordered by the active Data Manager ordering with `id` as a tie-breaker,
+    and the next page is selected by the last seen (value, id) pair instead of OFFSET,
+    so deep pages cost the same as the first one.
+    Use `?pagination=cursor` for the first page and `?cursor=<next_cursor>` for the next ones.
+    Totals are counted for the first page only, the next pages return them as null.
+    """
+
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    ordering_alias = 'keyset_value'
+
+    @classmethod
+    def is_requested(cls, request):
+        return cls.cursor_query_param in request.GET or request.GET.get(cls.mode_query_param) == 'cursor'
+
+    def get_ordering(self, queryset):
+        """Get the first ordering expression applied by apply_ordering() as OrderBy"""
+        ordering = queryset.query.order_by[0] if queryset.query.order_by else 'id'
+        if isinstance(ordering, str):
+            ordering = OrderBy(F(ordering.lstrip('-')), descending=ordering.startswith('-'), nulls_last=True)
+        return ordering
+
+    def order_queryset(self, queryset):
+        ordering = self.get_ordering(queryset)
+        self.descending = ordering.descending
+        id_ordering = '-id' if self.descending else 'id'
+
+        name = getattr(ordering.expression, 'name', None)
+        if name in ('id', 'pk'):
+            self.ordering_key = id_ordering
+            self.ordering_field = None
+            return queryset.order_by(id_ordering)
+
+        self.ordering_key = ('-' if self.descending else '') + (name or str(ordering.expression))
+        self.ordering_field = self.ordering_alias
+        # wrap the expression to use plain lookups of its output field, e.g. not JSON key lookups for data__ fields
+        output_field = ordering.expression.resolve_expression(queryset.query).output_field
+        expression = ExpressionWrapper(ordering.expression, output_field=output_field)
+        value = F(self.ordering_alias)
+        value = value.desc(nulls_last=True) if self.descending else value.asc(nulls_last=True)
+        return queryset.annotate(**{self.ordering_alias: expression}).order_by(value, id_ordering)
+
+    def seek(self, queryset, value, pk):
+        """Filter tasks going after (value, id) in the keyset ordering, nulls go last"""
+        id_lookup = 'id__lt' if self.descending else 'id__gt'
+        if self.ordering_field is None:
+            return queryset.filter(**{id_lookup: pk})
+
+        field = self.ordering_field
+        if value is None:
+            return queryset.filter(**{f'{field}__isnull': True, id_lookup: pk})
+
+        value_lookup = f'{field}__lt' if self.descending else f'{field}__gt'
+        return queryset.filter(
+            Q(**{value_lookup: value}) | Q(**{field: value, id_lookup: pk}) | Q(**{f'{field}__isnull': True})
+        )
+
+    def encode_cursor(self, task):
+        value = getattr(task, self.ordering_field) if self.ordering_field else None
+        payload = {'o': self.ordering_key, 'id': task.id, 'v': value}
+        if isinstance(value, datetime):
+            payload['v'], payload['t'] = value.isoformat(), 'datetime'
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.GET.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            value, pk = payload.get('v'), int(payload['id'])
+            if payload.get('t') == 'datetime':
+                value = datetime.fromisoformat(value)
+        except Exception:
+            raise NotFound('Invalid cursor')
+
+        # cursor is bound to the ordering it was created with
+        if payload.get('o') != self.ordering_key:
+            raise NotFound('Cursor does not match the current ordering')
+        return value, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        filtered = queryset
+        queryset = self.order_queryset(queryset)
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            # the client keeps totals from the first page, counting them again would cost a full scan
+            self.total = self.total_annotations = self.total_predictions = None
+            queryset = self.seek(queryset, *cursor)
+        else:
+            self.count_totals(filtered, request, view)
+
+        # fetch one extra task to know whether there is a next page
+        page = list(queryset[: page_size + 1])
+        has_next = len(page) > page_size
+        page = page[:page_size]
+        self.next_cursor = self.encode_cursor(page[-1]) if has_next else None
+        return page
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                'total_annotations': self.total_annotations,
+                'total_predictions': self.total_predictions,
+                'total': self.total,
+                'total_is_estimated': self.total_is_estimated,
+                'next_cursor': self.next_cursor,
                 'tasks': data,
             }
         )
@@ -261,6 +418,16 @@ class TaskListAPI(generics.ListCreateAPIView):
         DELETE=all_permissions.tasks_delete,
     )
     pagination_class = TaskPagination
+    cursor_pagination_class = TaskCursorPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.cursor_pagination_class and self.cursor_pagination_class.is_requested(self.request):
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
 
     @staticmethod
     def get_task_serializer_context(request, project):
@@ -306,6 +473,8 @@ class TaskListAPI(generics.ListCreateAPIView):
             self.check_object_permissions(request, project)
         else:
             return Response({'detail': 'Neither project nor view id specified'}, status=404)
+        # pagination caches view totals per project
+        self.project = project
         # get prepare params (from view or from payload directly)
         prepare_params = get_prepare_params(request, project)
         queryset = self.get_task_queryset(request, prepare_params)
@@ -425,6 +594,76 @@ class ProjectColumnsAPI(APIView):
         return Response(data)
 
 
+@method_decorator(
+    name='get',
+    decorator=swagger_auto_schema(
+        tags=['Data Manager'],
+        x_fern_audiences=['internal'],
+        operation_summary='List indexed data columns',
+        operation_description='Retrieve task data columns with database indexes and their build status.',
+        manual_parameters=[
+            openapi.Parameter(
+                name='project', type=openapi.TYPE_INTEGER, in_=openapi.IN_QUERY, description='Project ID'
+            ),
+        ],
+    ),
+)
+@method_decorator(
+    name='post',
+    decorator=swagger_auto_schema(
+        tags=['Data Manager'],
+        x_fern_audiences=['internal'],
+        operation_summary='Index data column',
+        operation_description="""
+        Build a database index for the task data column to speed up Data Manager filters and ordering.
+        The index is built in the background, use the list endpoint to check its status.
+        """,
+        request_body=IndexedDataColumnSerializer,
+    ),
+)
+@method_decorator(
+    name='delete',
+    decorator=swagger_auto_schema(
+        tags=['Data Manager'],
+        x_fern_audiences=['internal'],
+        operation_summary='Drop data column index',
+        operation_description='Drop the database index of the task data column.',
+        request_body=IndexedDataColumnSerializer,
+    ),
+)
+class ProjectIndexedDataColumnsAPI(APIView):
+    permission_required = ViewClassPermission(
+        GET=all_permissions.projects_view,
+        POST=all_permissions.projects_change,
+        DELETE=all_permissions.projects_change,
+    )
+
+    def get_serializer(self, request):
+        serializer = IndexedDataColumnSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        self.check_object_permissions(request, serializer.validated_data['project'])
+        return serializer
+
+    def get(self, request):
+        pk = int_from_request(request.GET, 'project', 0)
+        project = generics.get_object_or_404(Project, pk=pk)
+        self.check_object_permissions(request, project)
+        return Response(project.summary.indexed_data_columns or {})
+
+    def post(self, request):
+        data = self.get_serializer(request).validated_data
+        project, key, kind = data['project'], data['key'], data['kind']
+        set_indexed_data_column_status(project.id, key, kind, 'queued')
+        start_job_async_or_sync(build_data_column_index, project.id, key, kind, job_timeout=3600 * 24)
+        project.summary.refresh_from_db()
+        return Response(project.summary.indexed_data_columns, status=201)
+
+    def delete(self, request):
+        data = self.get_serializer(request).validated_data
+        start_job_async_or_sync(drop_data_column_index, data['project'].id, data['key'], data['kind'])
+        return Response(status=204)
+
+
 @method_decorator(
     name='get',
     decorator=swagger_auto_schema(
@@ -0,0 +1,135 @@
+"""This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
+"""
+import hashlib
+import logging
+import uuid
+
+import ujson as json
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+
+logger = logging.getLogger(__name__)
+
+COUNTS_VERSION_KEY = 'dm:tasks-counts-version:{project_id}'
+COUNTS_KEY = 'dm:tasks-counts:{project_id}:{version}:{query_hash}:{mode}'
+
+
+def get_tasks_counts_version(project_id):
+    """Data version of project tasks, annotations and predictions used in the counts cache key"""
+    key = COUNTS_VERSION_KEY.format(project_id=project_id)
+    version = cache.get(key)
+    if version is None:
+        # a random token instead of a counter: an evicted version never matches old cached counts
+        version = uuid.uuid4().hex
+        cache.add(key, version, timeout=None)
+        version = cache.get(key, version)
+    return version
+
+
+def invalidate_tasks_counts(project_id):
+    """Drop cached Data Manager counts of the project
+
+    Invalidation is repeated on commit, so counts calculated in parallel
+    with a not yet committed transaction are not kept in the cache.
+    """
+    if not project_id or not settings.DATA_MANAGER_COUNTS_CACHE_TTL:
+        return
+
+    def bump():
+        cache.set(COUNTS_VERSION_KEY.format(project_id=project_id), uuid.uuid4().hex, timeout=None)
+
+    bump()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(bump)
+
+
+def get_query_hash(queryset):
+    """Hash of the filtered tasks SQL, it covers view filters, selected items and the project"""
+    sql, params = queryset.order_by().values('id').query.sql_with_params()
+    return hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+
+
+def count_tasks(queryset):
+    """Exact number of tasks and sums of their annotation and prediction counters"""
+    totals = queryset.values('id').aggregate(
+        total=Count('id'),
+        total_annotations=Coalesce(Sum('total_annotations'), 0),
+        total_predictions=Coalesce(Sum('total_predictions'), 0),
+    )
+    totals['total_is_estimated'] = False
+    return totals
+
+
+def get_planner_estimate(queryset):
+    """Row estimate of the query planner, PostgreSQL only"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    sql, params = queryset.order_by().values('id').query.sql_with_params()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+    except Exception as exc:
+        logger.warning(f'Can\'t get planner estimate for tasks count: {exc}')
+        return None
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def estimate_tasks(queryset):
+    """Approximate counts for big filtered views
+
+    The number of tasks comes from the planner estimate, annotation and prediction totals
+    are extrapolated from the first DATA_MANAGER_APPROXIMATE_COUNT_SAMPLE_SIZE tasks.
+    Exact counts are returned when the estimate is below DATA_MANAGER_APPROXIMATE_COUNT_THRESHOLD.
+    """
+    estimate = get_planner_estimate(queryset)
+    if estimate is None or estimate < settings.DATA_MANAGER_APPROXIMATE_COUNT_THRESHOLD:
+        return count_tasks(queryset)
+
+    sample = count_tasks(queryset.order_by()[: settings.DATA_MANAGER_APPROXIMATE_COUNT_SAMPLE_SIZE])
+    if sample['total'] < settings.DATA_MANAGER_APPROXIMATE_COUNT_SAMPLE_SIZE:
+        # the whole view fits into the sample, so it's exact
+        return sample
+
+    scale = estimate / sample['total']
+    return {
+        'total': estimate,
+        'total_annotations': round(sample['total_annotations'] * scale),
+        'total_predictions': round(sample['total_predictions'] * scale),
+        'total_is_estimated': True,
+    }
+
+
+def get_tasks_counts(queryset, project_id=None, approximate=False):
+    """Get total, total_annotations and total_predictions for the filtered tasks
+
+    Counts are cached by (project, filters hash, data version) for DATA_MANAGER_COUNTS_CACHE_TTL seconds,
+    the data version is changed by task, annotation and prediction writes, see invalidate_tasks_counts().
+    :param queryset: filtered tasks
+    :param project_id: project of the tasks, counts are not cached without it
+    :param approximate: allow planner estimates instead of exact counts for big views
+    :return: dict with total, total_annotations, total_predictions and total_is_estimated
+    """
+    calculate = estimate_tasks if approximate else count_tasks
+    if not project_id or not settings.DATA_MANAGER_COUNTS_CACHE_TTL:
+        return calculate(queryset)
+
+    key = COUNTS_KEY.format(
+        project_id=project_id,
+        version=get_tasks_counts_version(project_id),
+        query_hash=get_query_hash(queryset),
+        mode='approximate' if approximate else 'exact',
+    )
+    counts = cache.get(key)
+    if counts is None:
+        counts = calculate(queryset)
+        cache.set(key, counts, timeout=settings.DATA_MANAGER_COUNTS_CACHE_TTL)
+    return counts
@@ -1,5 +1,6 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
+import hashlib
 import logging
 from collections import OrderedDict
 from typing import Any, Iterable, Tuple
@@ -7,9 +8,14 @@ from urllib.parse import unquote
 
 import ujson as json
 from core.utils.common import int_from_request
+from data_manager.managers import DataColumnIndexKind, data_column_expression, sqlite_json_path
 from data_manager.models import View
 from data_manager.prepare_params import PrepareParams
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db import connection, models, transaction
+from django.db.models import Q
+from django.db.models.functions import Upper
 from rest_framework.generics import get_object_or_404
 from tasks.models import Task
 
@@ -427,3 +433,100 @@ def intersperse(items: Iterable, separator: Any) -> list:
     if output:
         output.pop()
     return output
+
+
+def get_data_column_index_name(project_id, key, kind):
+    digest = hashlib.md5(key.encode()).hexdigest()[:10]
+    return f'task_data_{kind}_{project_id}_{digest}'
+
+
+def get_data_column_index(project_id, key, kind):
+    """PostgreSQL partial expression index over the task.data key of the project,
+    built from the same expressions that data manager queries use
+    """
+    name = get_data_column_index_name(project_id, key, kind)
+    condition = Q(project_id=project_id)
+    if kind == DataColumnIndexKind.TRIGRAM:
+        # upper() serves case-insensitive "contains", the raw text serves regex
+        expression = data_column_expression(key)
+        return GinIndex(
+            OpClass(Upper(expression), name='gin_trgm_ops'),
+            OpClass(expression, name='gin_trgm_ops'),
+            name=name,
+            condition=condition,
+        )
+    return models.Index(data_column_expression(key, kind), name=name, condition=condition)
+
+
+def get_sqlite_data_column_index_sql(project_id, key, kind):
+    """SQLite has no partial index matching for bound project ids, so the index covers the key in all tasks"""
+    name = get_data_column_index_name(project_id, key, kind)
+    expression = f'json_extract("data", {sqlite_json_path(key)})'
+    if kind == DataColumnIndexKind.NUMBER:
+        expression = f'CAST({expression} AS real)'
+    return (
+        f'CREATE INDEX IF NOT EXISTS "{name}" ON "task" ({expression})',
+        f'DROP INDEX IF EXISTS "{name}"',
+    )
+
+
+def set_indexed_data_column_status(project_id, key, kind, status):
+    """Store index status in ProjectSummary.indexed_data_columns, status=None removes the index record"""
+    from projects.models import ProjectSummary
+
+    with transaction.atomic():
+        summary = ProjectSummary.objects.select_for_update().get(project_id=project_id)
+        indexed_data_columns = summary.indexed_data_columns or {}
+        kinds = indexed_data_columns.setdefault(key, {})
+        if status is None:
+            kinds.pop(kind, None)
+            if not kinds:
+                indexed_data_columns.pop(key)
+        else:
+            kinds[kind] = status
+        summary.indexed_data_columns = indexed_data_columns
+        summary.save(update_fields=['indexed_data_columns'])
+
+
+def _drop_data_column_index(project_id, key, kind):
+    if settings.DJANGO_DB == settings.DJANGO_DB_SQLITE:
+        _, drop_sql = get_sqlite_data_column_index_sql(project_id, key, kind)
+        with connection.cursor() as cursor:
+            cursor.execute(drop_sql)
+    else:
+        index = get_data_column_index(project_id, key, kind)
+        with connection.schema_editor(atomic=False) as schema_editor:
+            schema_editor.remove_index(Task, index, concurrently=not connection.in_atomic_block)
+
+
+def build_data_column_index(project_id, key, kind):
+    """Create index for the task.data key, CONCURRENTLY on PostgreSQL when running outside of a transaction"""
+    set_indexed_data_column_status(project_id, key, kind, 'in_progress')
+    try:
+        if settings.DJANGO_DB == settings.DJANGO_DB_SQLITE:
+            create_sql, _ = get_sqlite_data_column_index_sql(project_id, key, kind)
+            with connection.cursor() as cursor:
+                cursor.execute(create_sql)
+        else:
+            if kind == DataColumnIndexKind.TRIGRAM:
+                with connection.cursor() as cursor:
+                    cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            index = get_data_column_index(project_id, key, kind)
+            with connection.schema_editor(atomic=False) as schema_editor:
+                schema_editor.add_index(Task, index, concurrently=not connection.in_atomic_block)
+    except Exception as exc:
+        # e.g. number index fails when some values can't be cast to numbers
+        logger.error(f'Failed to build {kind} index for data column "{key}" in project {project_id}: {exc}')
+        try:
+            # failed concurrent builds leave invalid indexes behind
+            _drop_data_column_index(project_id, key, kind)
+        except Exception as drop_exc:
+            logger.error(f'Failed to drop invalid index for data column "{key}": {drop_exc}')
+        set_indexed_data_column_status(project_id, key, kind, 'failed')
+    else:
+        set_indexed_data_column_status(project_id, key, kind, 'completed')
+
+
+def drop_data_column_index(project_id, key, kind):
+    _drop_data_column_index(project_id, key, kind)
+    set_indexed_data_column_status(project_id, key, kind, None)
@@ -7,10 +7,12 @@ from typing import ClassVar
 
 import ujson as json
 from core.feature_flags import flag_set
-from core.utils.db import fast_first
+from core.utils.db import BulkInsertManagerMixin, fast_first
 from data_manager.prepare_params import ConjunctionEnum
 from django.conf import settings
 from django.contrib.postgres.aggregates import ArrayAgg
+from django.contrib.postgres.fields import ArrayField
+from django.core.exceptions import FieldDoesNotExist, FieldError
 from django.db import models
 from django.db.models import (
     Aggregate,
@@ -20,6 +22,7 @@ from django.db.models import (
     Exists,
     F,
     FloatField,
+    Func,
     OuterRef,
     Q,
     Subquery,
@@ -29,6 +32,7 @@ from django.db.models import (
 )
 from django.db.models.fields.json import KeyTextTransform
 from django.db.models.functions import Cast, Coalesce, Concat
+from django.utils.translation import gettext_lazy as _
 from pydantic import BaseModel
 
 from label_studio.core.utils.common import load_func
@@ -135,6 +139,51 @@ def get_fields_for_evaluation(prepare_params, user, skip_regular=True):
     return result
 
 
+class DataColumnIndexKind(models.TextChoices):
+    TEXT = 'text', _('Text')
+    NUMBER = 'number', _('Number')
+    TRIGRAM = 'trigram', _('Trigram')
+
+
+def sqlite_json_path(key):
+    """SQL string literal with SQLite JSON path to the task.data key"""
+    path = '$.' + json.dumps(key, ensure_ascii=False, escape_forward_slashes=False)
+    return "'%s'" % path.replace("'", "''")
+
+
+class SQLiteJSONExtract(Func):
+    """json_extract() of the task.data key with a literal JSON path.
+    SQLite matches expression indexes only against literal paths, while Django binds them as parameters
+    """
+
+    function = 'json_extract'
+    template = '%(function)s(%(expressions)s, %(path)s)'
+    output_field = TextField()
+
+    def __init__(self, expression, key, **extra):
+        super().__init__(expression, path=sqlite_json_path(key).replace('%', '%%'), **extra)
+
+
+def data_column_expression(key, kind=DataColumnIndexKind.TEXT):
+    """Expression over a task.data key used both by data manager filters/orderings and by indexed data columns:
+    a database uses an expression index only if the query is compiled from the same expression
+    """
+    if settings.DJANGO_DB == settings.DJANGO_DB_SQLITE:
+        # the column is compiled by Django, so the table is aliased properly when the queryset is a subquery
+        expression = SQLiteJSONExtract('data', key)
+    else:
+        expression = KeyTextTransform(key, 'data')
+    if kind == DataColumnIndexKind.NUMBER:
+        return Cast(expression, output_field=FloatField())
+    return expression
+
+
+def get_indexed_data_column_kinds(project, key):
+    """Kinds of ready-to-use indexes built for the task.data key in the project"""
+    indexed_data_columns = project.summary.indexed_data_columns or {}
+    return {kind for kind, status in indexed_data_columns.get(key, {}).items() if status == 'completed'}
+
+
 def apply_ordering(queryset, ordering, project, request, view_data=None):
     if ordering:
 
@@ -154,19 +203,24 @@ def apply_ordering(queryset, ordering, project, request, view_data=None):
         if field_name.startswith('data__'):
             # annotate task with data field for float/int/bool ordering support
             json_field = field_name.replace('data__', '')
+            indexed_kinds = get_indexed_data_column_kinds(project, json_field)
             numeric_ordering_applied = False
             if numeric_ordering is True:
                 queryset = queryset.annotate(
-                    ordering_field=Cast(KeyTextTransform(json_field, 'data'), output_field=FloatField())
+                    ordering_field=data_column_expression(json_field, DataColumnIndexKind.NUMBER)
                 )
-                # for non numeric values we need fallback to string ordering
-                try:
-                    queryset.first()
+                # numeric index was built successfully, so all values are numbers
+                if DataColumnIndexKind.NUMBER in indexed_kinds:
                     numeric_ordering_applied = True
-                except Exception as e:
-                    logger.warning(f'Failed to apply numeric ordering for field {json_field}: {e}')
+                # for non numeric values we need fallback to string ordering
+                else:
+                    try:
+                        queryset.first()
+                        numeric_ordering_applied = True
+                    except Exception as e:
+                        logger.warning(f'Failed to apply numeric ordering for field {json_field}: {e}')
             if not numeric_ordering_applied:
-                queryset = queryset.annotate(ordering_field=KeyTextTransform(json_field, 'data'))
+                queryset = queryset.annotate(ordering_field=data_column_expression(json_field))
             f = F('ordering_field').asc(nulls_last=True) if ascending else F('ordering_field').desc(nulls_last=True)
 
         else:
@@ -198,6 +252,34 @@ def cast_value(_filter):
             _filter.value = cast_bool_from_str(_filter.value)
 
 
+def get_field_value_type(queryset, field_name):
+    """Get python type name of the field values using the queryset schema only, without database queries:
+    task.data keys are strings, annotated fields are typed by their output fields, other fields by model fields
+    """
+    if field_name.startswith('data__'):
+        return 'str'
+
+    try:
+        if field_name in queryset.query.annotations:
+            field = queryset.query.annotations[field_name].output_field
+            # annotated JSON fields keep aggregated values like annotators
+            if isinstance(field, models.JSONField):
+                return 'list'
+        else:
+            model = queryset.model
+            for part in field_name.split('__'):
+                field = model._meta.get_field(part)
+                model = field.related_model or model
+    except (FieldDoesNotExist, FieldError):
+        return 'str'
+
+    if isinstance(field, ArrayField):
+        return 'list'
+    if isinstance(field, (models.CharField, models.TextField, models.FileField)):
+        return 'str'
+    return field.get_internal_type()
+
+
 def add_result_filter(field_name, _filter, filter_expressions, project):
     from django.db.models.expressions import RawSQL
     from tasks.models import Annotation, Prediction
@@ -341,12 +423,18 @@ def apply_filters(queryset, filters, project, request):
             json_field = field_name.replace('data__', '')
             queryset = queryset.annotate(
                 **{
-                    f'filter_{json_field.replace("$undefined$", "undefined")}': Cast(
-                        KeyTextTransform(json_field, 'data'), output_field=FloatField()
+                    f'filter_{json_field.replace("$undefined$", "undefined")}': data_column_expression(
+                        json_field, DataColumnIndexKind.NUMBER
                     )
                 }
             )
             clean_field_name = f'filter_{json_field.replace("$undefined$", "undefined")}'
+        # compare indexed keys as text to match their expression indexes
+        elif field_name.startswith('data__') and get_indexed_data_column_kinds(project, field_name[len('data__') :]):
+            json_field = field_name[len('data__') :]
+            field_name = f'filter_{json_field.replace("$undefined$", "undefined")}'
+            queryset = queryset.annotate(**{field_name: data_column_expression(json_field)})
+            clean_field_name = field_name
         else:
             clean_field_name = field_name
 
@@ -359,9 +447,7 @@ def apply_filters(queryset, filters, project, request):
             _filter.value = 0
 
         # get type of annotated field
-        value_type = 'str'
-        if queryset.exists():
-            value_type = type(queryset.values_list(field_name, flat=True)[0]).__name__
+        value_type = get_field_value_type(queryset, field_name)
 
         if (value_type == 'list' or value_type == 'tuple') and 'equal' in _filter.operator:
             raise Exception('Not supported filter type')
@@ -516,8 +602,15 @@ def newest_annotation_subquery() -> Subquery:
     return Subquery(newest_annotations.values('created_at'))
 
 
+def newest_annotation_created_at():
+    """Creation time of the newest task annotation, taken from the materialized aggregates if enabled"""
+    if settings.DATA_MANAGER_TASK_AGGREGATES:
+        return F('aggregate__last_annotation_at')
+    return newest_annotation_subquery()
+
+
 def base_annotate_completed_at(queryset: TaskQuerySet) -> TaskQuerySet:
-    return queryset.annotate(completed_at=Case(When(is_labeled=True, then=newest_annotation_subquery())))
+    return queryset.annotate(completed_at=Case(When(is_labeled=True, then=newest_annotation_created_at())))
 
 
 def annotate_completed_at(queryset: TaskQuerySet) -> TaskQuerySet:
@@ -573,7 +666,7 @@ def annotated_completed_at_considering_agreement_threshold(queryset):
                 Q(_agreement__gte=agreement_threshold)
                 | Q(annotation_count__gte=(F('overlap') + max_additional_annotators_assignable))
             ),
-            then=newest_annotation_subquery(),
+            then=newest_annotation_created_at(),
         ),
         default=Value(None),
         output_field=DateTimeField(),
@@ -614,7 +707,9 @@ def annotate_predictions_results(queryset):
 
 
 def annotate_annotators(queryset):
-    if settings.DJANGO_DB == settings.DJANGO_DB_SQLITE:
+    if settings.DATA_MANAGER_TASK_AGGREGATES:
+        return queryset.annotate(annotators=F('aggregate__annotators'))
+    elif settings.DJANGO_DB == settings.DJANGO_DB_SQLITE:
         return queryset.annotate(
             annotators=Coalesce(GroupConcat('annotations__completed_by'), Value(''), output_field=models.CharField())
         )
@@ -622,6 +717,12 @@ def annotate_annotators(queryset):
         return queryset.annotate(annotators=ArrayAgg('annotations__completed_by', distinct=True, default=Value([])))
 
 
+def annotate_all_predictions_score(queryset):
+    if settings.DATA_MANAGER_TASK_AGGREGATES:
+        return queryset.annotate(predictions_score=F('aggregate__predictions_score'))
+    return queryset.annotate(predictions_score=Avg('predictions__score'))
+
+
 def annotate_predictions_score(queryset):
     first_task = queryset.first()
     if not first_task:
@@ -633,7 +734,7 @@ def annotate_predictions_score(queryset):
             first_task.project.ml_backends.filter(project=first_task.project).values_list('model_version', flat=True)
         )
         if len(model_versions) == 0:
-            return queryset.annotate(predictions_score=Avg('predictions__score'))
+            return annotate_all_predictions_score(queryset)
 
         else:
             return queryset.annotate(
@@ -642,7 +743,7 @@ def annotate_predictions_score(queryset):
     else:
         model_version = first_task.project.model_version
         if model_version is None:
-            return queryset.annotate(predictions_score=Avg('predictions__score'))
+            return annotate_all_predictions_score(queryset)
         else:
             return queryset.annotate(
                 predictions_score=Avg('predictions__score', filter=Q(predictions__model_version=model_version))
@@ -751,6 +852,6 @@ class PreparedTaskManager(models.Manager):
         return queryset.prepared(prepare_params=prepare_params)
 
 
-class TaskManager(models.Manager):
+class TaskManager(BulkInsertManagerMixin, models.Manager):
     def for_user(self, user):
         return self.filter(project__organization=user.active_organization)
@@ -3,6 +3,7 @@
 import os
 
 import ujson as json
+from data_manager.managers import DataColumnIndexKind
 from data_manager.models import Filter, FilterGroup, View
 from django.conf import settings
 from django.db import transaction
@@ -13,6 +14,7 @@ from tasks.models import Task
 from tasks.serializers import (
     AnnotationDraftSerializer,
     AnnotationSerializer,
+    ListTaskSerializer,
     PredictionSerializer,
     TaskSerializer,
 )
@@ -363,6 +365,7 @@ class DataManagerTaskSerializer(TaskSerializer):
         model = Task
         ref_name = 'data_manager_task_serializer'
         fields = '__all__'
+        list_serializer_class = ListTaskSerializer
         expandable_fields = {'annotations': (AnnotationSerializer, {'many': True})}
 
     def to_representation(self, obj):
@@ -493,3 +496,29 @@ class ViewOrderSerializer(serializers.Serializer):
     ids = serializers.ListField(
         child=serializers.IntegerField(), allow_empty=False, help_text='A list of view IDs in the desired order.'
     )
+
+
+class IndexedDataColumnSerializer(serializers.Serializer):
+    project = serializers.PrimaryKeyRelatedField(queryset=Project.objects.all())
+    key = serializers.CharField(help_text='Task data key from the project data columns')
+    kind = serializers.ChoiceField(
+        choices=DataColumnIndexKind.choices,
+        default=DataColumnIndexKind.TEXT,
+        help_text='Index kind: text and number serve equality, range and ordering, trigram serves contains and regex',
+    )
+
+    def validate(self, data):
+        summary = data['project'].summary
+        indexed = data['kind'] in (summary.indexed_data_columns or {}).get(data['key'], {})
+        if self.context['request'].method == 'DELETE':
+            if not indexed:
+                raise serializers.ValidationError('Index for this data column does not exist')
+            return data
+
+        if data['key'] not in (summary.all_data_columns or {}):
+            raise serializers.ValidationError(f'Data column "{data["key"]}" is not found in project tasks')
+        if indexed:
+            raise serializers.ValidationError('Index for this data column already exists')
+        if data['kind'] == DataColumnIndexKind.TRIGRAM and settings.DJANGO_DB == settings.DJANGO_DB_SQLITE:
+            raise serializers.ValidationError('Trigram indexes are supported on PostgreSQL only')
+        return data
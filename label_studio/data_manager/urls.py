@@ -13,6 +13,7 @@ urlpatterns = [
     path('api/dm/columns/', api.ProjectColumnsAPI.as_view(), name='dm-columns'),
     path('api/dm/project/', api.ProjectStateAPI.as_view(), name='dm-project'),
     path('api/dm/actions/', api.ProjectActionsAPI.as_view(), name='dm-actions'),
+    path('api/dm/indexed-columns/', api.ProjectIndexedDataColumnsAPI.as_view(), name='dm-indexed-columns'),
     # path("api/dm/tasks/", api.TaskListAPI.as_view()),
     # path("api/dm/tasks/<int:pk>", api.TaskAPI.as_view()),
     path('projects/<int:pk>/', views.task_page, name='project-data'),
@@ -291,6 +291,9 @@ def async_export_annotation_to_azure_storages(annotation):
 
 @receiver(post_save, sender=Annotation)
 def export_annotation_to_azure_storages(sender, instance, **kwargs):
+    if settings.STORAGE_EXPORT_CHANGE_LOG:
+        # exported in background from the annotation change log
+        return
     storages = getattr(instance.project, 'io_storages_azureblobexportstorages', None)
     if storages and storages.exists():  # avoid excess jobs in rq
         start_job_async_or_sync(async_export_annotation_to_azure_storages, instance)
@@ -2,14 +2,16 @@
 """
 import base64
 import concurrent.futures
+import hashlib
 import itertools
 import json
 import logging
-import os
+import time
 import traceback as tb
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
 from dataclasses import asdict
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Union
 from urllib.parse import urljoin
 
@@ -20,17 +22,21 @@ from core.feature_flags import flag_set
 from core.redis import is_job_in_queue, is_job_on_worker, redis_connected
 from core.utils.common import load_func
 from data_export.serializers import ExportDataSerializer
+from data_manager.counts import invalidate_tasks_counts
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
-from django.db import models, transaction
-from django.db.models import JSONField
+from django.core.cache import cache
+from django.db import connection, models, transaction
+from django.db.models import Count, JSONField, Prefetch, Q
 from django.shortcuts import reverse
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django_rq import job
+from io_storages.change_log import AnnotationChangeLog
+from io_storages.progress import StorageProgressReporter
 from io_storages.utils import StorageObject, get_uri_via_regex, parse_bucket_uri
 from rq.job import Job
-from tasks.models import Annotation, Task
+from tasks.models import Annotation, Prediction, Task, TaskAggregate
 from tasks.serializers import AnnotationSerializer, PredictionSerializer
 from webhooks.models import WebhookAction
 from webhooks.utils import emit_webhooks_for_instance
@@ -130,11 +136,15 @@ class StorageInfo(models.Model):
         delta = (now - last_ping).total_seconds()
 
         if delta > settings.STORAGE_IN_PROGRESS_TIMER:
-            self.last_sync_count = last_sync_count
-            self.meta['time_last_ping'] = str(now)
-            self.meta['duration'] = (now - self.time_in_progress).total_seconds()
-            self.meta.update(kwargs)
-            self.save(update_fields=['last_sync_count', 'meta'])
+            self.info_save_progress(last_sync_count, **kwargs)
+
+    def info_save_progress(self, last_sync_count, **kwargs):
+        now = timezone.now()
+        self.last_sync_count = last_sync_count
+        self.meta['time_last_ping'] = str(now)
+        self.meta['duration'] = (now - self.time_in_progress).total_seconds()
+        self.meta.update(kwargs)
+        self.save(update_fields=['last_sync_count', 'meta'])
 
     @staticmethod
     def ensure_storage_statuses(storages):
@@ -237,6 +247,31 @@ class ImportStorage(Storage):
     def generate_http_url(self, url):
         raise NotImplementedError
 
+    def get_presigned_url_cache_key(self, url):
+        digest = hashlib.md5(url.encode()).hexdigest()
+        return f'io_storages:presigned-url:{self._meta.label_lower}:{self.id}:{self.presign_ttl}:{digest}'
+
+    def generate_http_url_cached(self, url):
+        """Generate http url for the storage URI, presigned URLs are reused from the cache
+        until STORAGE_PRESIGNED_URL_CACHE_MARGIN seconds before they expire
+        """
+        if not getattr(self, 'presign', False) or not self.id:
+            # without presign urls contain file content or local links, they are not cached
+            return self.generate_http_url(url)
+
+        timeout = self.presign_ttl * 60 - settings.STORAGE_PRESIGNED_URL_CACHE_MARGIN
+        if settings.STORAGE_PRESIGNED_URL_CACHE_MARGIN < 0 or timeout <= 0:
+            return self.generate_http_url(url)
+
+        key = self.get_presigned_url_cache_key(url)
+        http_url = cache.get(key)
+        if http_url is None:
+            http_url = self.generate_http_url(url)
+            # storages return the original url when presign fails
+            if http_url and http_url != url:
+                cache.set(key, http_url, timeout=timeout)
+        return http_url
+
     def get_bytes_stream(self, uri):
         """Get file bytes from storage as a stream and content type.
 
@@ -323,12 +358,52 @@ class ImportStorage(Storage):
                         # this branch is our old approach:
                         # it generates presigned URLs if storage.presign=True;
                         # or it inserts base64 media into task data if storage.presign=False
-                        http_url = self.generate_http_url(extracted_uri)
+                        http_url = self.generate_http_url_cached(extracted_uri)
 
                 return uri.replace(extracted_uri, http_url)
             except Exception:
                 logger.info(f"Can't resolve URI={uri}", exc_info=True)
 
+    def get_data_or_raise(self, key) -> list[StorageObject]:
+        try:
+            return self.get_data(key)
+        except (UnicodeDecodeError, json.decoder.JSONDecodeError) as exc:
+            logger.debug(exc, exc_info=True)
+            raise ValueError(
+                f'Error loading JSON from file "{key}".\nIf you\'re trying to import non-JSON data '
+                f'(images, audio, text, etc.), edit storage settings and enable '
+                f'"Treat every bucket object as a source file"'
+            )
+
+    def prefetch_data(self, keys):
+        """Yield (key, storage objects) pairs in the order of keys, while get_data() for the next keys
+        is running in STORAGE_IMPORT_PREFETCH_WORKERS threads. Keys are consumed lazily and at most
+        2 * STORAGE_IMPORT_PREFETCH_WORKERS objects are fetched ahead of the consumer,
+        so get_data() implementations must be thread safe and must not use the database:
+        S3 reads with a boto3 client (not a resource), GCS caches clients per thread,
+        Azure creates a client per call, Redis clients and local files are thread safe.
+        """
+        workers = settings.STORAGE_IMPORT_PREFETCH_WORKERS
+        if workers <= 1:
+            for key in keys:
+                yield key, self.get_data_or_raise(key)
+            return
+
+        pending = deque()
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'{self.__class__.__name__}-{self.id}')
+        try:
+            for key in keys:
+                pending.append((key, executor.submit(self.get_data_or_raise, key)))
+                if len(pending) >= workers * 2:
+                    key, future = pending.popleft()
+                    yield key, future.result()
+            while pending:
+                key, future = pending.popleft()
+                yield key, future.result()
+        finally:
+            # the consumer failed or stopped early: don't download the rest
+            executor.shutdown(wait=True, cancel_futures=True)
+
     def _scan_and_create_links_v2(self):
         # Async job execution for batch of objects:
         # e.g. GCS example
@@ -341,8 +416,9 @@ class ImportStorage(Storage):
 
         raise NotImplementedError
 
-    @classmethod
-    def add_task(cls, project, maximum_annotations, max_inner_id, storage, link_object: StorageObject, link_class):
+    @staticmethod
+    def parse_link_object(link_object: StorageObject):
+        """Split storage object into task data, predictions, annotations and link kwargs"""
         link_kwargs = asdict(link_object)
         data = link_kwargs.pop('task_data', None)
 
@@ -356,31 +432,50 @@ class ImportStorage(Storage):
 
         # annotations
         annotations = data.get('annotations') or []
-        cancelled_annotations = 0
         if annotations:
             if 'data' not in data:
                 raise ValueError(
                     'If you use "annotations" field in the task, ' 'you must put "data" field in the task too'
                 )
-            cancelled_annotations = len([a for a in annotations if a.get('was_cancelled', False)])
 
         if 'data' in data and isinstance(data['data'], dict):
             if data['data'] is not None:
                 data = data['data']
             else:
                 data.pop('data')
+        return data, predictions, annotations, link_kwargs
+
+    @staticmethod
+    def make_task(project, maximum_annotations, inner_id, data, predictions, annotations):
+        cancelled_annotations = len([a for a in annotations if a.get('was_cancelled', False)])
+        return Task(
+            data=data,
+            project=project,
+            overlap=maximum_annotations,
+            is_labeled=len(annotations) >= maximum_annotations,
+            total_predictions=len(predictions),
+            total_annotations=len(annotations) - cancelled_annotations,
+            cancelled_annotations=cancelled_annotations,
+            inner_id=inner_id,
+        )
+
+    @staticmethod
+    def add_task_annotations(project, task, annotations, raise_exception):
+        logger.debug(f'Create {len(annotations)} annotations for task={task}')
+        for annotation in annotations:
+            annotation['task'] = task.id
+            annotation['project'] = project.id
+        annotation_ser = AnnotationSerializer(data=annotations, many=True)
+        if annotation_ser.is_valid(raise_exception=raise_exception):
+            annotation_ser.save()
+
+    @classmethod
+    def add_task(cls, project, maximum_annotations, max_inner_id, storage, link_object: StorageObject, link_class):
+        data, predictions, annotations, link_kwargs = cls.parse_link_object(link_object)
 
         with transaction.atomic():
-            task = Task.objects.create(
-                data=data,
-                project=project,
-                overlap=maximum_annotations,
-                is_labeled=len(annotations) >= maximum_annotations,
-                total_predictions=len(predictions),
-                total_annotations=len(annotations) - cancelled_annotations,
-                cancelled_annotations=cancelled_annotations,
-                inner_id=max_inner_id,
-            )
+            task = cls.make_task(project, maximum_annotations, max_inner_id, data, predictions, annotations)
+            task.save()
 
             link_class.create(task, storage=storage, **link_kwargs)
             logger.debug(f'Create {storage.__class__.__name__} link with {link_kwargs} for {task=}')
@@ -399,16 +494,92 @@ class ImportStorage(Storage):
                 prediction_ser.save()
 
             # add annotations
-            logger.debug(f'Create {len(annotations)} annotations for task={task}')
-            for annotation in annotations:
-                annotation['task'] = task.id
-                annotation['project'] = project.id
-            annotation_ser = AnnotationSerializer(data=annotations, many=True)
-            if annotation_ser.is_valid(raise_exception=raise_exception):
-                annotation_ser.save()
+            cls.add_task_annotations(project, task, annotations, raise_exception)
         return task
         # FIXME: add_annotation_history / post_process_annotations should be here
 
+    @classmethod
+    def add_tasks(cls, project, maximum_annotations, max_inner_id, storage, link_objects, link_class):
+        """Bulk version of add_task(): create tasks, storage links, predictions and annotations
+        for a batch of storage objects in one transaction
+
+        Tasks, links and predictions are inserted with bulk_create, so model signals are replaced
+        by explicit project summary and task aggregates updates. Annotations are saved with AnnotationSerializer
+        as in add_task() to keep their counters and side effects.
+        :return: list of created tasks, inner_id of the tasks starts with max_inner_id
+        """
+        if not connection.features.can_return_rows_from_bulk_insert:
+            # ids of bulk created tasks are required for links, predictions and annotations
+            return [
+                cls.add_task(project, maximum_annotations, max_inner_id + i, storage, link_object, link_class)
+                for i, link_object in enumerate(link_objects)
+            ]
+
+        items = [cls.parse_link_object(link_object) for link_object in link_objects]
+        raise_exception = not flag_set(
+            'ff_fix_back_dev_3342_storage_scan_with_invalid_annotations', user=AnonymousUser()
+        )
+
+        with transaction.atomic():
+            tasks = Task.objects.bulk_create(
+                [
+                    cls.make_task(project, maximum_annotations, max_inner_id + i, data, predictions, annotations)
+                    for i, (data, predictions, annotations, _) in enumerate(items)
+                ],
+                batch_size=settings.BATCH_SIZE,
+            )
+            link_class.objects.bulk_create(
+                [
+                    link_class(task=task, storage=storage, object_exists=True, **link_kwargs)
+                    for task, (_, _, _, link_kwargs) in zip(tasks, items)
+                ],
+                batch_size=settings.BATCH_SIZE,
+            )
+            logger.debug(f'Create {len(tasks)} tasks with {storage.__class__.__name__} links')
+
+            # add predictions
+            db_predictions = []
+            for task, (_, predictions, _, _) in zip(tasks, items):
+                if not predictions:
+                    continue
+                for prediction in predictions:
+                    prediction['task'] = task.id
+                    prediction['project'] = project.id
+                prediction_ser = PredictionSerializer(data=predictions, many=True)
+                # results are normalized by the serializer, bulk_create doesn't call save()
+                if prediction_ser.is_valid(raise_exception=raise_exception):
+                    db_predictions += [Prediction(**validated) for validated in prediction_ser.validated_data]
+            Prediction.objects.bulk_create(db_predictions, batch_size=settings.BATCH_SIZE)
+            logger.debug(f'Create {len(db_predictions)} predictions for {len(tasks)} tasks')
+
+            # add annotations
+            for task, (_, _, annotations, _) in zip(tasks, items):
+                if annotations:
+                    cls.add_task_annotations(project, task, annotations, raise_exception)
+
+            # replace post_save signals of tasks and predictions
+            project.summary.update_data_columns(tasks)
+            TaskAggregate.refresh({prediction.task_id for prediction in db_predictions})
+            invalidate_tasks_counts(project.id)
+        return tasks
+
+    def emit_tasks_created_webhooks(self, tasks_for_webhook, final=False):
+        """Send TASKS_CREATED webhooks by WEBHOOK_BATCH_SIZE tasks, the rest is returned to be sent later
+
+        `WEBHOOK_BATCH_SIZE` sets the maximum number of tasks sent in a single webhook call, ensuring manageable
+        payload sizes. If tasks remain at the end of sync (less than `WEBHOOK_BATCH_SIZE`), they're sent in a final
+        webhook call to ensure all tasks are processed and no task is left unreported in the webhook.
+        """
+        while tasks_for_webhook and (final or len(tasks_for_webhook) >= settings.WEBHOOK_BATCH_SIZE):
+            emit_webhooks_for_instance(
+                self.project.organization,
+                self.project,
+                WebhookAction.TASKS_CREATED,
+                tasks_for_webhook[: settings.WEBHOOK_BATCH_SIZE],
+            )
+            tasks_for_webhook = tasks_for_webhook[settings.WEBHOOK_BATCH_SIZE :]
+        return tasks_for_webhook
+
     def _scan_and_create_links(self, link_class):
         """
         TODO: deprecate this function and transform it to "pipeline" version  _scan_and_create_links_v2,
@@ -423,74 +594,71 @@ class ImportStorage(Storage):
         max_inner_id = (task.inner_id + 1) if task else 1
 
         tasks_for_webhook = []
-        for key in self.iterkeys():
-            # w/o Dataflow
-            # pubsub.push(topic, key)
-            # -> GF.pull(topic, key) + env -> add_task()
-            logger.debug(f'Scanning key {key}')
-            self.info_update_progress(last_sync_count=tasks_created, tasks_existed=tasks_existed)
-
-            # skip if key has already been synced
-            if n_tasks_linked := link_class.n_tasks_linked(key, self):
-                logger.debug(f'{self.__class__.__name__} already has {n_tasks_linked} tasks linked to {key=}')
-                tasks_existed += n_tasks_linked  # update progress counter
-                continue
+        # storage objects are collected and written to DB by STORAGE_IMPORT_BATCH_SIZE tasks
+        link_objects_batch = []
+
+        def new_keys():
+            nonlocal tasks_existed
+            # already synced keys are resolved with one query per chunk of keys,
+            # so a re-sync makes DB work only for new keys
+            for keys in _batched(self.iterkeys(), settings.STORAGE_IMPORT_BATCH_SIZE):
+                # w/o Dataflow
+                # pubsub.push(topic, key)
+                # -> GF.pull(topic, key) + env -> add_task()
+                logger.debug(f'Scanning {len(keys)} keys starting from {keys[0]}')
+                progress.update(tasks_created, tasks_existed=tasks_existed)
+
+                n_tasks_linked = link_class.n_tasks_linked_by_keys(keys, self)
+                for key in keys:
+                    # skip if key has already been synced
+                    if n_tasks := n_tasks_linked.get(key):
+                        logger.debug(f'{self.__class__.__name__} already has {n_tasks} tasks linked to {key=}')
+                        tasks_existed += n_tasks  # update progress counter
+                        continue
+
+                    logger.debug(f'{self}: found new key {key}')
+                    yield key
+
+        with StorageProgressReporter(self) as progress:
+            # objects are downloaded and parsed in background threads ahead of the DB writes
+            for key, link_objects in self.prefetch_data(new_keys()):
+                if not flag_set('fflag_feat_dia_2092_multitasks_per_storage_link'):
+                    link_objects = link_objects[:1]
+                link_objects_batch.extend(link_objects)
+
+                if len(link_objects_batch) >= settings.STORAGE_IMPORT_BATCH_SIZE:
+                    tasks = self.add_tasks(
+                        self.project,
+                        maximum_annotations,
+                        max_inner_id,
+                        self,
+                        link_objects_batch,
+                        link_class=link_class,
+                    )
+                    link_objects_batch = []
+                    max_inner_id += len(tasks)
 
-            logger.debug(f'{self}: found new key {key}')
-            try:
-                link_objects = self.get_data(key)
-            except (UnicodeDecodeError, json.decoder.JSONDecodeError) as exc:
-                logger.debug(exc, exc_info=True)
-                raise ValueError(
-                    f'Error loading JSON from file "{key}".\nIf you\'re trying to import non-JSON data '
-                    f'(images, audio, text, etc.), edit storage settings and enable '
-                    f'"Treat every bucket object as a source file"'
-                )
+                    # update progress counters for storage info
+                    tasks_created += len(tasks)
+                    progress.update(tasks_created, tasks_existed=tasks_existed)
+
+                    # add tasks to webhook list, full webhook batches are sent immediately
+                    tasks_for_webhook = self.emit_tasks_created_webhooks(tasks_for_webhook + tasks)
 
-            if not flag_set('fflag_feat_dia_2092_multitasks_per_storage_link'):
-                link_objects = link_objects[:1]
-
-            for link_object in link_objects:
-                # TODO: batch this loop body with add_task -> add_tasks in a single bulk write.
-                # See DIA-2062 for prerequisites
-                task = self.add_task(
-                    self.project,
-                    maximum_annotations,
-                    max_inner_id,
-                    self,
-                    link_object,
-                    link_class=link_class,
+            if link_objects_batch:
+                tasks = self.add_tasks(
+                    self.project, maximum_annotations, max_inner_id, self, link_objects_batch, link_class=link_class
                 )
-                max_inner_id += 1
-
-                # update progress counters for storage info
-                tasks_created += 1
-
-                # add task to webhook list
-                tasks_for_webhook.append(task)
-
-                # settings.WEBHOOK_BATCH_SIZE
-                # `WEBHOOK_BATCH_SIZE` sets the maximum number of tasks sent in a single webhook call, ensuring manageable payload sizes.
-                # When `tasks_for_webhook` accumulates tasks equal to/exceeding `WEBHOOK_BATCH_SIZE`, they're sent in a webhook via
-                # `emit_webhooks_for_instance`, and `tasks_for_webhook` is cleared for new tasks.
-                # If tasks remain in `tasks_for_webhook` at process end (less than `WEBHOOK_BATCH_SIZE`), they're sent in a final webhook
-                # call to ensure all tasks are processed and no task is left unreported in the webhook.
-                if len(tasks_for_webhook) >= settings.WEBHOOK_BATCH_SIZE:
-                    emit_webhooks_for_instance(
-                        self.project.organization, self.project, WebhookAction.TASKS_CREATED, tasks_for_webhook
-                    )
-                    tasks_for_webhook = []
-        if tasks_for_webhook:
-            emit_webhooks_for_instance(
-                self.project.organization, self.project, WebhookAction.TASKS_CREATED, tasks_for_webhook
-            )
+                tasks_created += len(tasks)
+                tasks_for_webhook += tasks
+            self.emit_tasks_created_webhooks(tasks_for_webhook, final=True)
 
-        self.project.update_tasks_states(
-            maximum_annotations_changed=False, overlap_cohort_percentage_changed=False, tasks_number_changed=True
-        )
+            self.project.update_tasks_states(
+                maximum_annotations_changed=False, overlap_cohort_percentage_changed=False, tasks_number_changed=True
+            )
 
         # sync is finished, set completed status for storage info
-        self.info_set_completed(last_sync_count=tasks_created, tasks_existed=tasks_existed)
+        progress.complete(last_sync_count=tasks_created, tasks_existed=tasks_existed)
 
     def scan_and_create_links(self):
         """This is proto method - you can override it, or just replace ImportStorageLink by your own model"""
@@ -604,19 +772,39 @@ class ExportStorage(Storage, ProjectStorageMixin):
     can_delete_objects = models.BooleanField(
         _('can_delete_objects'), null=True, blank=True, help_text='Deletion from storage enabled'
     )
-    # Use 8 threads, unless we know we only have a single core
-    # TODO from testing, more than 8 seems to cause problems. revisit to add more parallelism.
-    max_workers = min(8, (os.cpu_count() or 2) * 4)
+    workers = models.PositiveSmallIntegerField(
+        _('workers'),
+        null=True,
+        blank=True,
+        help_text='Number of parallel uploads during export sync, STORAGE_EXPORT_WORKERS is used if empty',
+    )
 
-    def _get_serialized_data(self, annotation):
+    last_change_id = models.BigIntegerField(
+        _('last change id'),
+        default=0,
+        help_text='Cursor of the annotation change log, changes up to this id are exported',
+    )
+
+    @property
+    def max_workers(self):
+        return self.workers or settings.STORAGE_EXPORT_WORKERS
+
+    def save_task_to_storage(self):
+        """Storage objects are tasks with all their annotations instead of single annotations"""
         user = self.project.organization.created_by
         flag = flag_set(
             'fflag_feat_optic_650_target_storage_task_format_long', user=user, override_system_default=False
         )
-        if settings.FUTURE_SAVE_TASK_TO_STORAGE or flag:
+        return settings.FUTURE_SAVE_TASK_TO_STORAGE or flag
+
+    def _get_serialized_data(self, annotation):
+        # the task is serialized in advance by save_annotations()
+        serialized_task = getattr(annotation, 'serialized_task', None)
+        if serialized_task is not None:
+            return serialized_task
+
+        if self.save_task_to_storage():
             # export task with annotations
-            # TODO: we have to rewrite save_all_annotations, because this func will be called for each annotation
-            # TODO: instead of each task, however, we have to call it only once per task
             expand = ['annotations.reviews', 'annotations.completed_by']
             context = {'project': self.project}
             return ExportDataSerializer(annotation.task, context=context, expand=expand).data
@@ -629,31 +817,201 @@ class ExportStorage(Storage, ProjectStorageMixin):
         raise NotImplementedError
 
     def save_annotations(self, annotations: models.QuerySet[Annotation]):
-        annotation_exported = 0
         total_annotations = annotations.count()
         self.info_set_in_progress()
+
+        progress = StorageProgressReporter(self)
+        with progress:
+            annotation_exported, annotation_failed = self.export_annotations(
+                annotations, progress=progress, total_annotations=total_annotations
+            )
+
+        progress.complete(
+            last_sync_count=annotation_exported,
+            total_annotations=total_annotations,
+            failed_annotations=annotation_failed,
+        )
+
+    def export_annotations(self, annotations: models.QuerySet[Annotation], progress=None, **progress_kwargs):
+        """Export the given annotations. Storage objects are uploaded by max_workers threads,
+        at most 2 * max_workers objects are loaded ahead of the uploads, failed uploads are retried
+        STORAGE_EXPORT_RETRIES times and then skipped.
+        Returns the numbers of exported and failed annotations.
+        """
+        annotation_exported = annotation_failed = 0
         self.cached_user = self.project.organization.created_by
 
+        if self.save_task_to_storage():
+            annotation_groups = self._iter_task_annotation_groups(annotations)
+        else:
+            annotation_groups = (
+                [annotation] for annotation in annotations.iterator(chunk_size=settings.STORAGE_EXPORT_CHUNK_SIZE)
+            )
+
+        # the rest of annotations in groups are stored in the same objects, only links are needed for them
+        pending_links = []
+        futures = {}
+
+        def collect(done):
+            nonlocal annotation_exported, annotation_failed, pending_links
+            for future in done:
+                group = futures.pop(future)
+                if future.result():
+                    annotation_exported += len(group)
+                    pending_links += group[1:]
+                else:
+                    annotation_failed += len(group)
+            if progress is not None:
+                progress.update(annotation_exported, failed_annotations=annotation_failed, **progress_kwargs)
+
+            if len(pending_links) >= settings.STORAGE_EXPORT_CHUNK_SIZE or not futures:
+                self.links.model.bulk_create_links(pending_links, self)
+                pending_links = []
+
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Batch annotations so that we update progress before having to submit every future.
-            # Updating progress in thread requires coordinating on count and db writes, so just
-            # batching to keep it simpler.
-            for annotation_batch in _batched(
-                Annotation.objects.filter(project=self.project).iterator(
-                    chunk_size=settings.STORAGE_EXPORT_CHUNK_SIZE
-                ),
-                settings.STORAGE_EXPORT_CHUNK_SIZE,
-            ):
-                futures = []
-                for annotation in annotation_batch:
-                    annotation.cached_user = self.cached_user
-                    futures.append(executor.submit(self.save_annotation, annotation))
+            for group in annotation_groups:
+                # every storage object is saved once, using the first annotation of the group
+                group[0].cached_user = self.cached_user
+                futures[executor.submit(self.save_annotation_with_retries, group[0])] = group
+
+                # bounded work queue: don't load and serialize objects faster than they are uploaded
+                if len(futures) >= self.max_workers * 2:
+                    done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+                    collect(done)
+
+            while futures:
+                done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+                collect(done)
+
+        return annotation_exported, annotation_failed
+
+    def export_changes(self):
+        """Export annotation changes logged after the storage cursor in batches of STORAGE_EXPORT_CHUNK_SIZE.
+        The cursor is moved only when the whole batch is written, so every change is exported at least once.
+
+        Change ids are allocated on insert, not on commit, so a change with a lower id can become visible
+        after a higher one. The cursor is therefore moved only over changes older than
+        STORAGE_EXPORT_CHANGE_LOG_GRACE seconds: newer changes are exported too, but again by the next run.
+        Returns the number of processed changes.
+        """
+        settled_before = timezone.now() - timedelta(seconds=settings.STORAGE_EXPORT_CHANGE_LOG_GRACE)
+        position = self.last_change_id
+        settled = True
+        processed = 0
+        while True:
+            changes = list(
+                AnnotationChangeLog.objects.filter(project_id=self.project_id, id__gt=position).order_by('id')[
+                    : settings.STORAGE_EXPORT_CHUNK_SIZE
+                ]
+            )
+            if not changes:
+                return processed
+
+            # only the last change of every annotation matters
+            last_changes = {change.annotation_id: change for change in changes}
+            deleted = [c for c in last_changes.values() if c.action == AnnotationChangeLog.Action.DELETED]
+            condition = Q(id__in=list(last_changes))
+            if deleted and self.save_task_to_storage():
+                # the rest of annotations are still stored in the task objects
+                condition |= Q(task_id__in=[change.task_id for change in deleted])
+            annotations = Annotation.objects.filter(condition, project=self.project)
+
+            _, annotation_failed = self.export_annotations(annotations)
+            deleted_failed = self.delete_logged_annotations(deleted)
+            if annotation_failed or deleted_failed:
+                raise ValueError(
+                    f'{annotation_failed + deleted_failed} annotations were not exported to {self}, '
+                    f'changes after {self.last_change_id} will be exported again'
+                )
 
-                for future in concurrent.futures.as_completed(futures):
-                    annotation_exported += 1
-                    self.info_update_progress(last_sync_count=annotation_exported, total_annotations=total_annotations)
+            position = changes[-1].id
+            processed += len(changes)
+            if not settled:
+                continue
+            last_change_id = self.last_change_id
+            for change in changes:
+                if change.created_at > settled_before:
+                    settled = False
+                    break
+                last_change_id = change.id
+            if last_change_id != self.last_change_id:
+                self.last_change_id = last_change_id
+                self.save(update_fields=['last_change_id'])
+
+    def delete_logged_annotations(self, changes):
+        """Delete storage objects of deleted annotations, return the number of failed deletions"""
+        if not changes or not self.can_delete_objects or not hasattr(self, 'delete_annotation'):
+            return 0
+
+        if self.save_task_to_storage():
+            # task objects are deleted only when the last annotation of the task is deleted
+            alive_task_ids = set(
+                Annotation.objects.filter(task_id__in=[c.task_id for c in changes]).values_list('task_id', flat=True)
+            )
+            changes = [change for change in changes if change.task_id not in alive_task_ids]
 
-        self.info_set_completed(last_sync_count=annotation_exported, total_annotations=total_annotations)
+        failed = 0
+        for change in changes:
+            # the annotation and the task can be deleted already, keys are built from ids only
+            annotation = Annotation(id=change.annotation_id, task=Task(id=change.task_id), project=self.project)
+            annotation.cached_user = self.project.organization.created_by
+            try:
+                self.delete_annotation(annotation)
+            except Exception as exc:
+                logger.error(f'Failed to delete annotation {change.annotation_id} from {self}: {exc}', exc_info=True)
+                failed += 1
+        return failed
+
+    def save_annotation_with_retries(self, annotation):
+        """Save annotation retrying failures with exponential backoff, return False if all attempts failed"""
+        retries = settings.STORAGE_EXPORT_RETRIES
+        for attempt in range(retries + 1):
+            try:
+                self.save_annotation(annotation)
+                return True
+            except Exception as exc:
+                if attempt == retries:
+                    logger.error(f'Failed to export annotation {annotation.id} to {self}: {exc}', exc_info=True)
+                    return False
+                delay = settings.STORAGE_EXPORT_RETRY_DELAY * 2**attempt
+                logger.warning(f'Retry export of annotation {annotation.id} to {self} in {delay}s: {exc}')
+                time.sleep(delay)
+
+    def _iter_task_annotation_groups(self, annotations):
+        """Group annotations by tasks and serialize every task once.
+        Tasks are loaded by STORAGE_EXPORT_CHUNK_SIZE with annotations, completed_by users, predictions
+        and drafts prefetched, so the number of queries doesn't depend on the number of annotations.
+        Yields lists of the given annotations per task, the first annotation holds the serialized task.
+        """
+        task_ids = annotations.order_by('task_id').values_list('task_id', flat=True).distinct()
+        for task_ids_batch in _batched(
+            task_ids.iterator(chunk_size=settings.STORAGE_EXPORT_CHUNK_SIZE), settings.STORAGE_EXPORT_CHUNK_SIZE
+        ):
+            tasks = list(
+                Task.objects.filter(id__in=task_ids_batch)
+                .select_related('file_upload')
+                .prefetch_related(
+                    Prefetch('annotations', queryset=Annotation.objects.select_related('completed_by').order_by('id')),
+                    'predictions',
+                    'drafts',
+                )
+                .order_by('id')
+            )
+            # tasks are exported with all their annotations, but links are created for the given ones only
+            annotation_ids = set(annotations.filter(task_id__in=task_ids_batch).values_list('id', flat=True))
+            expand = ['annotations.reviews', 'annotations.completed_by']
+            context = {'project': self.project}
+            serialized_tasks = ExportDataSerializer(tasks, many=True, context=context, expand=expand).data
+
+            for task, serialized_task in zip(tasks, serialized_tasks):
+                group = [annotation for annotation in task.annotations.all() if annotation.id in annotation_ids]
+                if not group:
+                    continue
+                for annotation in group:
+                    annotation.task = task
+                    annotation.project = self.project
+                group[0].serialized_task = serialized_task
+                yield group
 
     def save_all_annotations(self):
         self.save_annotations(Annotation.objects.filter(project=self.project))
@@ -720,6 +1078,17 @@ class ImportStorageLink(models.Model):
     def n_tasks_linked(cls, key, storage):
         return cls.objects.filter(key=key, storage=storage.id).count()
 
+    @classmethod
+    def n_tasks_linked_by_keys(cls, keys, storage):
+        """Return {key: number of linked tasks} for keys that already have links in one query"""
+        linked = (
+            cls.objects.filter(key__in=set(keys), storage=storage.id)
+            .values('key')
+            .annotate(n_tasks=Count('id'))
+            .order_by()
+        )
+        return {item['key']: item['n_tasks'] for item in linked}
+
     @classmethod
     def create(cls, task, key, storage, row_index=None, row_group=None):
         link, created = cls.objects.get_or_create(
@@ -765,6 +1134,24 @@ class ExportStorageLink(models.Model):
     def exists(cls, annotation, storage):
         return cls.objects.filter(annotation=annotation.id, storage=storage.id).exists()
 
+    @classmethod
+    def bulk_create_links(cls, annotations, storage):
+        """Create or touch links for many annotations at once, the same as create() does for one"""
+        if not annotations:
+            return
+        annotation_ids = [annotation.id for annotation in annotations]
+        existing = cls.objects.filter(annotation_id__in=annotation_ids, storage=storage, object_exists=True)
+        existing_ids = set(existing.values_list('annotation_id', flat=True))
+        # update updated_at field
+        existing.update(updated_at=timezone.now())
+        cls.objects.bulk_create(
+            [
+                cls(annotation_id=id, storage=storage, object_exists=True)
+                for id in annotation_ids
+                if id not in existing_ids
+            ]
+        )
+
     @classmethod
     def create(cls, annotation, storage):
         link, created = cls.objects.get_or_create(annotation=annotation, storage=storage, object_exists=True)
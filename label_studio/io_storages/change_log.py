@@ -0,0 +1,156 @@
+"""This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
+
+Append-only annotation change log for continuous export to target storages.
+
+With STORAGE_EXPORT_CHANGE_LOG enabled, annotation saves and deletions don't upload anything in the request path,
+they are appended to AnnotationChangeLog in the same transaction instead. The background job
+`export_annotation_changes` tails the log and exports changes in batches to every export storage of the project,
+moving the durable `ExportStorage.last_change_id` cursor only after a batch is written (at-least-once delivery).
+The cursor is moved only over changes older than STORAGE_EXPORT_CHANGE_LOG_GRACE seconds, so changes
+committed out of id order are not skipped and not pruned before they are exported.
+"""
+import logging
+
+import django_rq
+from core.current_request import get_current_request
+from core.redis import is_job_in_queue, redis_connected, start_job_async_or_sync
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Max, QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from tasks.models import Annotation, post_bulk_create
+
+logger = logging.getLogger(__name__)
+
+
+class AnnotationChangeLog(models.Model):
+    class Action(models.TextChoices):
+        CREATED = 'created', _('Created')
+        UPDATED = 'updated', _('Updated')
+        DELETED = 'deleted', _('Deleted')
+
+    # id is the sequence number of the change
+    id = models.BigAutoField(primary_key=True)
+    project = models.ForeignKey(
+        'projects.Project', on_delete=models.CASCADE, related_name='annotation_change_log', db_index=False
+    )
+    # not foreign keys: changes of deleted annotations and tasks are kept
+    annotation_id = models.IntegerField(_('annotation id'))
+    task_id = models.IntegerField(_('task id'))
+    action = models.CharField(_('action'), max_length=16, choices=Action.choices)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['project', 'id'], name='annotation_change_log_idx')]
+
+    @classmethod
+    def log(cls, project, annotations, action):
+        """Append changes of annotations and schedule the export after commit"""
+        if not settings.STORAGE_EXPORT_CHANGE_LOG or not annotations or not has_export_storages(project):
+            return
+        cls.objects.bulk_create(
+            [
+                cls(project_id=project.id, annotation_id=annotation.id, task_id=annotation.task_id, action=action)
+                for annotation in annotations
+            ]
+        )
+        project_id = project.id
+        transaction.on_commit(lambda: start_export_annotation_changes(project_id))
+
+    @classmethod
+    def prune(cls, project_id, storages):
+        """Delete changes which are already exported to all storages of the project"""
+        if storages:
+            last_change_id = min(storage.last_change_id for storage in storages)
+        else:
+            last_change_id = cls.objects.filter(project_id=project_id).aggregate(Max('id'))['id__max'] or 0
+        cls.objects.filter(project_id=project_id, id__lte=last_change_id).delete()
+
+
+def get_export_storage_classes():
+    from io_storages.localfiles.models import LocalFilesExportStorage
+    from io_storages.models import get_storage_classes
+
+    storage_classes = get_storage_classes('export')
+    if LocalFilesExportStorage not in storage_classes:
+        storage_classes.append(LocalFilesExportStorage)
+    return storage_classes
+
+
+def get_export_storages(project):
+    storages = []
+    for storage_class in get_export_storage_classes():
+        storages += list(storage_class.objects.filter(project_id=project.id))
+    return storages
+
+
+def has_export_storages(project):
+    """Check if the project has export storages, the result is cached for the current request
+    because every annotation save in the request checks it
+    """
+    request = get_current_request()
+    cache = getattr(request, '_projects_with_export_storages', None) if request is not None else None
+    if cache is not None and project.id in cache:
+        return cache[project.id]
+
+    result = any(
+        storage_class.objects.filter(project_id=project.id).exists() for storage_class in get_export_storage_classes()
+    )
+    if request is not None:
+        if cache is None:
+            cache = request._projects_with_export_storages = {}
+        cache[project.id] = result
+    return result
+
+
+def start_export_annotation_changes(project_id):
+    meta = {'project': project_id}
+    if redis_connected() and is_job_in_queue(django_rq.get_queue('low'), 'export_annotation_changes', meta=meta):
+        # the queued job will export this change too
+        return
+    start_job_async_or_sync(export_annotation_changes, project_id, queue_name='low', meta=meta)
+
+
+def export_annotation_changes(project_id, **kwargs):
+    from projects.models import Project
+
+    project = Project.objects.filter(id=project_id).first()
+    if project is None:
+        return
+
+    storages = get_export_storages(project)
+    for storage in storages:
+        # a failing storage keeps its cursor and doesn't block the other storages
+        try:
+            exported = storage.export_changes()
+        except Exception:
+            logger.error(f'Failed to export annotation changes to {storage}', exc_info=True)
+            continue
+        logger.debug(f'{exported} annotation changes exported to {storage}')
+    AnnotationChangeLog.prune(project_id, storages)
+
+
+@receiver(post_save, sender=Annotation)
+def log_annotation_save(sender, instance, created, **kwargs):
+    if settings.STORAGE_EXPORT_CHANGE_LOG:
+        action = AnnotationChangeLog.Action.CREATED if created else AnnotationChangeLog.Action.UPDATED
+        AnnotationChangeLog.log(instance.project, [instance], action)
+
+
+@receiver(post_bulk_create, sender=Annotation)
+def log_annotation_bulk_create(sender, objs, **kwargs):
+    if settings.STORAGE_EXPORT_CHANGE_LOG and objs:
+        AnnotationChangeLog.log(objs[0].project, [obj for obj in objs if obj.id], AnnotationChangeLog.Action.CREATED)
+
+
+@receiver(post_delete, sender=Annotation)
+def log_annotation_delete(sender, instance, origin=None, **kwargs):
+    if not settings.STORAGE_EXPORT_CHANGE_LOG:
+        return
+    # the whole project is deleted together with its storages and change log
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if getattr(origin_model, '_meta', None) and origin_model._meta.label == 'projects.Project':
+        return
+    AnnotationChangeLog.log(instance.project, [instance], AnnotationChangeLog.Action.DELETED)
@@ -3,6 +3,7 @@ import fnmatch
 import json
 import logging
 import re
+import threading
 from datetime import timedelta
 from enum import Enum
 from functools import lru_cache
@@ -23,7 +24,8 @@ Base64 = bytes
 
 
 class GCS(object):
-    _client_cache = {}
+    # google-cloud-storage clients aren't thread safe, so every thread (e.g. storage sync prefetch) gets its own
+    _thread_local = threading.local()
     _credentials_cache = None
     DEFAULT_GOOGLE_PROJECT_ID = gcs.client._marker
 
@@ -60,8 +62,11 @@ class GCS(object):
         """
         google_project_id = google_project_id or GCS.DEFAULT_GOOGLE_PROJECT_ID
         cache_key = google_application_credentials
+        if not hasattr(GCS._thread_local, 'client_cache'):
+            GCS._thread_local.client_cache = {}
+        client_cache = GCS._thread_local.client_cache
 
-        if cache_key not in GCS._client_cache:
+        if cache_key not in client_cache:
 
             # use credentials from LS Cloud Storage settings
             if google_application_credentials:
@@ -72,13 +77,13 @@ class GCS(object):
                         # change JSON error to human-readable format
                         raise ValueError(f'Google Application Credentials must be valid JSON string. {e}')
                 credentials = service_account.Credentials.from_service_account_info(google_application_credentials)
-                GCS._client_cache[cache_key] = gcs.Client(project=google_project_id, credentials=credentials)
+                client_cache[cache_key] = gcs.Client(project=google_project_id, credentials=credentials)
 
             # use Google Application Default Credentials (ADC)
             else:
-                GCS._client_cache[cache_key] = gcs.Client(project=google_project_id)
+                client_cache[cache_key] = gcs.Client(project=google_project_id)
 
-        return GCS._client_cache[cache_key]
+        return client_cache[cache_key]
 
     @classmethod
     def validate_connection(
@@ -137,6 +137,9 @@ class LocalFilesExportStorageLink(ExportStorageLink):
 
 @receiver(post_save, sender=Annotation)
 def export_annotation_to_local_files(sender, instance, **kwargs):
+    if settings.STORAGE_EXPORT_CHANGE_LOG:
+        # exported in background from the annotation change log
+        return
     project = instance.project
     if hasattr(project, 'io_storages_localfilesexportstorages'):
         for storage in project.io_storages_localfilesexportstorages.all():
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.15 on 2026-10-17 07:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("io_storages", "0019_azureblobimportstoragelink_row_group_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="azureblobexportstorage",
+            name="workers",
+            field=models.PositiveSmallIntegerField(
+                blank=True,
+                help_text="Number of parallel uploads during export sync, STORAGE_EXPORT_WORKERS is used if empty",
+                null=True,
+                verbose_name="workers",
+            ),
+        ),
+        migrations.AddField(
+            model_name="gcsexportstorage",
+            name="workers",
+            field=models.PositiveSmallIntegerField(
+                blank=True,
+                help_text="Number of parallel uploads during export sync, STORAGE_EXPORT_WORKERS is used if empty",
+                null=True,
+                verbose_name="workers",
+            ),
+        ),
+        migrations.AddField(
+            model_name="localfilesexportstorage",
+            name="workers",
+            field=models.PositiveSmallIntegerField(
+                blank=True,
+                help_text="Number of parallel uploads during export sync, STORAGE_EXPORT_WORKERS is used if empty",
+                null=True,
+                verbose_name="workers",
+            ),
+        ),
+        migrations.AddField(
+            model_name="redisexportstorage",
+            name="workers",
+            field=models.PositiveSmallIntegerField(
+                blank=True,
+                help_text="Number of parallel uploads during export sync, STORAGE_EXPORT_WORKERS is used if empty",
+                null=True,
+                verbose_name="workers",
+            ),
+        ),
+        migrations.AddField(
+            model_name="s3exportstorage",
+            name="workers",
+            field=models.PositiveSmallIntegerField(
+                blank=True,
+                help_text="Number of parallel uploads during export sync, STORAGE_EXPORT_WORKERS is used if empty",
+                null=True,
+                verbose_name="workers",
+            ),
+        ),
+    ]
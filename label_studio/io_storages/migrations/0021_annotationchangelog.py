@@ -0,0 +1,100 @@
+# Generated by Django 5.1.15 on 2026-10-17 07:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("io_storages", "0020_exportstorage_workers"),
+        ("projects", "0029_projectsummary_indexed_data_columns"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="azureblobexportstorage",
+            name="last_change_id",
+            field=models.BigIntegerField(
+                default=0,
+                help_text="Cursor of the annotation change log, changes up to this id are exported",
+                verbose_name="last change id",
+            ),
+        ),
+        migrations.AddField(
+            model_name="gcsexportstorage",
+            name="last_change_id",
+            field=models.BigIntegerField(
+                default=0,
+                help_text="Cursor of the annotation change log, changes up to this id are exported",
+                verbose_name="last change id",
+            ),
+        ),
+        migrations.AddField(
+            model_name="localfilesexportstorage",
+            name="last_change_id",
+            field=models.BigIntegerField(
+                default=0,
+                help_text="Cursor of the annotation change log, changes up to this id are exported",
+                verbose_name="last change id",
+            ),
+        ),
+        migrations.AddField(
+            model_name="redisexportstorage",
+            name="last_change_id",
+            field=models.BigIntegerField(
+                default=0,
+                help_text="Cursor of the annotation change log, changes up to this id are exported",
+                verbose_name="last change id",
+            ),
+        ),
+        migrations.AddField(
+            model_name="s3exportstorage",
+            name="last_change_id",
+            field=models.BigIntegerField(
+                default=0,
+                help_text="Cursor of the annotation change log, changes up to this id are exported",
+                verbose_name="last change id",
+            ),
+        ),
+        migrations.CreateModel(
+            name="AnnotationChangeLog",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("annotation_id", models.IntegerField(verbose_name="annotation id")),
+                ("task_id", models.IntegerField(verbose_name="task id")),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("created", "Created"),
+                            ("updated", "Updated"),
+                            ("deleted", "Deleted"),
+                        ],
+                        max_length=16,
+                        verbose_name="action",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="created at"),
+                ),
+                (
+                    "project",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="annotation_change_log",
+                        to="projects.project",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["project", "id"], name="annotation_change_log_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -8,6 +8,7 @@ from .azure_blob.models import (  # noqa: F401
     AzureBlobExportStorage,
     AzureBlobExportStorageLink,
 )
+from .change_log import AnnotationChangeLog  # noqa: F401
 from .s3.models import (  # noqa: F401
     S3ImportStorage,
     S3ImportStorageLink,
@@ -0,0 +1,100 @@
+"""This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
+"""
+import json
+import logging
+import time
+
+from core.redis import redis_get, redis_set
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# published progress outlives a sync job which stopped without a final flush
+PROGRESS_REDIS_TTL = 24 * 60 * 60
+
+
+class StorageProgressReporter:
+    """Coalesce progress updates of storage import and export syncs.
+
+    The storage row is saved at most once per STORAGE_IN_PROGRESS_TIMER seconds or once per
+    STORAGE_PROGRESS_UPDATE_ITEMS processed items, whichever comes first. When STORAGE_PROGRESS_REDIS
+    is enabled, every flush is also published to Redis and returned as `progress` by the storage API.
+    Used as a context manager it flushes the latest counters if the sync fails:
+
+        with StorageProgressReporter(storage) as progress:
+            for n, key in enumerate(keys, 1):
+                ...
+                progress.update(n, tasks_existed=existed)
+        progress.complete()
+    """
+
+    def __init__(self, storage, interval=None, items=None, publish=None):
+        self.storage = storage
+        self.interval = settings.STORAGE_IN_PROGRESS_TIMER if interval is None else interval
+        self.items = settings.STORAGE_PROGRESS_UPDATE_ITEMS if items is None else items
+        self.publish = settings.STORAGE_PROGRESS_REDIS if publish is None else publish
+
+        self.last_sync_count = 0
+        self.meta = {}
+        self.dirty = False
+        self.flushed_at = time.monotonic()
+        self.flushed_count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            try:
+                self.flush(status=self.storage.Status.FAILED)
+            except Exception:
+                logger.warning(f'Failed to save progress of {self.storage}', exc_info=True)
+        return False
+
+    @staticmethod
+    def get_redis_key(storage):
+        return f'storage_progress:{storage.__class__.__name__}:{storage.id}'
+
+    @classmethod
+    def get_published_progress(cls, storage):
+        """Return the last published progress of the storage sync or None"""
+        value = redis_get(cls.get_redis_key(storage))
+        return json.loads(value) if value else None
+
+    def update(self, last_sync_count, **kwargs):
+        self.last_sync_count = last_sync_count
+        self.meta.update(kwargs)
+        self.dirty = True
+
+        if (
+            time.monotonic() - self.flushed_at > self.interval
+            or 0 < self.items <= abs(last_sync_count - self.flushed_count)
+        ):
+            self.flush()
+
+    def flush(self, status=None):
+        """Save the latest counters to the storage row and publish them"""
+        if self.dirty:
+            self.storage.info_save_progress(last_sync_count=self.last_sync_count, **self.meta)
+            self.dirty = False
+            self.flushed_at = time.monotonic()
+            self.flushed_count = self.last_sync_count
+        self.publish_progress(status or self.storage.Status.IN_PROGRESS)
+
+    def complete(self, last_sync_count=None, **kwargs):
+        """Set completed status with the latest counters"""
+        if last_sync_count is not None:
+            self.last_sync_count = last_sync_count
+        self.meta.update(kwargs)
+        self.storage.info_set_completed(last_sync_count=self.last_sync_count, **self.meta)
+        self.dirty = False
+        self.publish_progress(self.storage.Status.COMPLETED)
+
+    def publish_progress(self, status):
+        if not self.publish:
+            return
+        progress = {'status': status, 'last_sync_count': self.last_sync_count, **self.meta}
+        try:
+            redis_set(self.get_redis_key(self.storage), json.dumps(progress), ttl=PROGRESS_REDIS_TTL)
+        except Exception:
+            logger.warning(f'Failed to publish progress of {self.storage}', exc_info=True)
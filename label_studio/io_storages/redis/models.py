@@ -5,6 +5,7 @@ import json
 import logging
 
 import redis
+from django.conf import settings
 from django.db import models
 from django.db.models.signals import post_save
 from django.dispatch import receiver
@@ -139,6 +140,9 @@ class RedisExportStorage(RedisStorageMixin, ExportStorage):
 
 @receiver(post_save, sender=Annotation)
 def export_annotation_to_redis_storages(sender, instance, **kwargs):
+    if settings.STORAGE_EXPORT_CHANGE_LOG:
+        # exported in background from the annotation change log
+        return
     project = instance.project
     if hasattr(project, 'io_storages_redisexportstorages'):
         for storage in project.io_storages_redisexportstorages.all():
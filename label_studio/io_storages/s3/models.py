@@ -4,6 +4,7 @@
 import json
 import logging
 import re
+import threading
 from typing import Union
 from urllib.parse import urlparse
 
@@ -37,6 +38,7 @@ logging.getLogger('botocore').setLevel(logging.CRITICAL)
 boto3.set_stream_logger(level=logging.INFO)
 
 clients_cache = {}
+clients_cache_lock = threading.Lock()
 
 
 class S3StorageMixin(models.Model):
@@ -71,19 +73,18 @@ class S3StorageMixin(models.Model):
     def get_client_and_resource(self):
         # s3 client initialization ~ 100 ms, for 30 tasks it's a 3 seconds, so we need to cache it
         cache_key = f'{self.aws_access_key_id}:{self.aws_secret_access_key}:{self.aws_session_token}:{self.region_name}:{self.s3_endpoint}'
-        if cache_key in clients_cache:
+        # storage sync threads can fill the cache at the same time
+        with clients_cache_lock:
+            if cache_key not in clients_cache:
+                clients_cache[cache_key] = get_client_and_resource(
+                    self.aws_access_key_id,
+                    self.aws_secret_access_key,
+                    self.aws_session_token,
+                    self.region_name,
+                    self.s3_endpoint,
+                )
             return clients_cache[cache_key]
 
-        result = get_client_and_resource(
-            self.aws_access_key_id,
-            self.aws_secret_access_key,
-            self.aws_session_token,
-            self.region_name,
-            self.s3_endpoint,
-        )
-        clients_cache[cache_key] = result
-        return result
-
     def get_client(self):
         client, _ = self.get_client_and_resource()
         return client
@@ -224,10 +225,10 @@ class S3ImportStorageBase(S3StorageMixin, ImportStorage):
             task = {data_key: uri}
             return [StorageObject(key=key, task_data=task)]
 
-        # read task json from bucket and validate it
-        _, s3 = self.get_client_and_resource()
-        bucket = s3.Bucket(self.bucket)
-        obj = s3.Object(bucket.name, key).get()['Body'].read()
+        # read task json from bucket and validate it,
+        # boto3 clients are thread safe unlike resources, get_data() runs in prefetch threads
+        client = self.get_client()
+        obj = client.get_object(Bucket=self.bucket, Key=key)['Body'].read()
         return load_tasks_json(obj, key)
 
     @catch_and_reraise_from_none
@@ -315,6 +316,9 @@ def async_export_annotation_to_s3_storages(annotation):
 
 @receiver(post_save, sender=Annotation)
 def export_annotation_to_s3_storages(sender, instance, **kwargs):
+    if settings.STORAGE_EXPORT_CHANGE_LOG:
+        # exported in background from the annotation change log
+        return
     storages = getattr(instance.project, 'io_storages_s3exportstorages', None)
     if storages and storages.exists():  # avoid excess jobs in rq
         start_job_async_or_sync(async_export_annotation_to_s3_storages, instance)
@@ -322,6 +326,9 @@ def export_annotation_to_s3_storages(sender, instance, **kwargs):
 
 @receiver(pre_delete, sender=Annotation)
 def delete_annotation_from_s3_storages(sender, instance, **kwargs):
+    if settings.STORAGE_EXPORT_CHANGE_LOG:
+        # deleted in background from the annotation change log
+        return
     links = S3ExportStorageLink.objects.filter(annotation=instance)
     for link in links:
         storage = link.storage
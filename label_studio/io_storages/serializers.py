@@ -2,14 +2,27 @@
 """
 import os
 
+from django.conf import settings
 from io_storages.base_models import ExportStorage, ImportStorage
+from io_storages.progress import StorageProgressReporter
 from rest_framework import serializers
 from tasks.models import Task
 from tasks.serializers import AnnotationSerializer, TaskSerializer
 from users.models import User
 
 
-class ImportStorageSerializer(serializers.ModelSerializer):
+class StorageProgressSerializerMixin(serializers.Serializer):
+    progress = serializers.SerializerMethodField(
+        help_text='Live progress of the running sync published to Redis, null if STORAGE_PROGRESS_REDIS is disabled'
+    )
+
+    def get_progress(self, storage):
+        if not settings.STORAGE_PROGRESS_REDIS:
+            return None
+        return StorageProgressReporter.get_published_progress(storage)
+
+
+class ImportStorageSerializer(StorageProgressSerializerMixin, serializers.ModelSerializer):
     type = serializers.ReadOnlyField(default=os.path.basename(os.path.dirname(__file__)))
     synchronizable = serializers.BooleanField(required=False, default=True)
 
@@ -18,7 +31,7 @@ class ImportStorageSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class ExportStorageSerializer(serializers.ModelSerializer):
+class ExportStorageSerializer(StorageProgressSerializerMixin, serializers.ModelSerializer):
     type = serializers.ReadOnlyField(default=os.path.basename(os.path.dirname(__file__)))
     synchronizable = serializers.BooleanField(required=False, default=True)
 
@@ -1,6 +1,8 @@
 from logging import getLogger
 from typing import TYPE_CHECKING
 
+from core.redis import start_job_async_or_sync
+from django.conf import settings
 from tasks.models import AnnotationDraft, Task
 
 logger = getLogger(__name__)
@@ -56,12 +58,20 @@ def recalculate_created_annotations_and_labels_from_scratch(
     summary.common_data_columns = []
     summary.update_data_columns(project.tasks.only('data'))
 
-    summary.created_labels, summary.created_annotations = {}, {}
-    summary.update_created_annotations_and_labels(project.annotations.all())
+    if settings.PROJECT_SUMMARY_DELTAS:
+        # the recount replaces pending deltas
+        project.summary_deltas.all().delete()
+        counters = recount_label_counters(project, summary)
+        for field, value in counters.items():
+            setattr(summary, field, value)
+        summary.save(update_fields=list(counters))
+    else:
+        summary.created_labels, summary.created_annotations = {}, {}
+        summary.update_created_annotations_and_labels(project.annotations.all())
 
-    summary.created_labels_drafts = {}
-    drafts = AnnotationDraft.objects.filter(task__project=project)
-    summary.update_created_labels_drafts(drafts)
+        summary.created_labels_drafts = {}
+        drafts = AnnotationDraft.objects.filter(task__project=project)
+        summary.update_created_labels_drafts(drafts)
 
     logger.info(
         f'Reset cache finished for project {project.id} and organization {organization_id}:\n'
@@ -69,3 +79,44 @@ def recalculate_created_annotations_and_labels_from_scratch(
         f'created_labels = {summary.created_labels}\n'
         f'created_labels_drafts = {summary.created_labels_drafts}'
     )
+
+
+def recount_label_counters(project: 'Project', summary: 'ProjectSummary') -> dict:
+    """Label counters of the project summary counted from all annotations and drafts of the project"""
+    from projects.models import LABEL_COUNTER_FIELDS
+
+    deltas = summary.get_label_deltas(project.annotations.all())
+    deltas.update(summary.get_label_deltas(AnnotationDraft.objects.filter(task__project=project), drafts=True))
+    return summary.fold_label_deltas(
+        {field: {} for field in LABEL_COUNTER_FIELDS},
+        ((field, key, label, delta) for (field, key, label), delta in deltas.items()),
+    )
+
+
+def check_summary_consistency(project: 'Project', fix: bool = False) -> list:
+    """Compare label counters of the project summary, with pending deltas applied, against a full recount.
+
+    :param project: Project
+    :param fix: Replace inconsistent counters with the recount
+    :return: Names of inconsistent summary fields
+    """
+    summary = project.summary
+    summary.apply_deltas()
+    expected = recount_label_counters(project, summary)
+    inconsistent = []
+    for field, value in expected.items():
+        actual = getattr(summary, field) or {}
+        # labels counters can keep control tags without labels
+        actual = {key: count for key, count in actual.items() if count != {}}
+        if actual != value:
+            logger.warning(f'Project {project.id} summary {field} is inconsistent: {actual} != {value}')
+            inconsistent.append(field)
+
+    if inconsistent and fix:
+        start_job_async_or_sync(
+            recalculate_created_annotations_and_labels_from_scratch,
+            project,
+            summary,
+            organization_id=project.organization_id,
+        )
+    return inconsistent
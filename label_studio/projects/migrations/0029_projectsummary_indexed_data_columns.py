@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-17 06:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0028_auto_20241107_1031"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="projectsummary",
+            name="indexed_data_columns",
+            field=models.JSONField(
+                default=dict,
+                help_text="Task data columns with database indexes for Data Manager filters and ordering",
+                null=True,
+                verbose_name="indexed data columns",
+            ),
+        ),
+    ]
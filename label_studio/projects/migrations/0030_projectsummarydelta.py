@@ -0,0 +1,66 @@
+# Generated by Django 5.1.15 on 2026-10-17 09:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0029_projectsummary_indexed_data_columns"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProjectSummaryDelta",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "field",
+                    models.CharField(
+                        help_text="Summary field: created_annotations, created_labels, created_labels_drafts",
+                        max_length=32,
+                    ),
+                ),
+                (
+                    "key",
+                    models.TextField(
+                        help_text="Annotation tuple for created_annotations or from_name for labels"
+                    ),
+                ),
+                (
+                    "label",
+                    models.TextField(
+                        default=None,
+                        help_text="Label for created_labels and created_labels_drafts",
+                        null=True,
+                    ),
+                ),
+                ("delta", models.IntegerField()),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="Creation time",
+                        verbose_name="created at",
+                    ),
+                ),
+                (
+                    "project",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="summary_deltas",
+                        to="projects.project",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -1,7 +1,9 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
+import copy
 import json
 import logging
+from collections import Counter
 from typing import Any, Mapping, Optional
 
 from annoying.fields import AutoOneToOneField
@@ -539,6 +541,8 @@ class Project(ProjectMixin, models.Model):
         with transaction.atomic():
             # Lock summary for update to avoid race conditions
             summary = ProjectSummary.objects.select_for_update().get(project=self)
+            # label counters are checked below
+            self.summary.apply_deltas()
 
             if self.num_tasks == 0:
                 logger.debug(f'Project {self} has no tasks: nothing to validate here. Ensure project summary is empty')
@@ -1052,7 +1056,7 @@ class Project(ProjectMixin, models.Model):
 
         if storage:
             return {
-                'url': storage.generate_http_url(url),
+                'url': storage.generate_http_url_cached(url),
                 'presign_ttl': storage.presign_ttl,
             }
 
@@ -1208,6 +1212,13 @@ class ProjectSummary(models.Model):
     created_labels_drafts = JSONField(
         _('created labels in drafts'), null=True, default=dict, help_text='Unique drafts labels'
     )
+    # { col1: { index_kind: status } }
+    indexed_data_columns = JSONField(
+        _('indexed data columns'),
+        null=True,
+        default=dict,
+        help_text='Task data columns with database indexes for Data Manager filters and ordering',
+    )
 
     def has_permission(self, user):
         user.project = self.project  # link for activity log
@@ -1226,6 +1237,7 @@ class ProjectSummary(models.Model):
         self.created_labels = {}
         self.created_labels_drafts = {}
         self.save()
+        ProjectSummaryDelta.objects.filter(project_id=self.project_id).delete()
 
     def update_data_columns(self, tasks):
         common_data_columns = set()
@@ -1314,7 +1326,87 @@ class ProjectSummary(models.Model):
                 labels.append(str(label))
         return labels
 
+    def get_label_deltas(self, items, sign=1, drafts=False):
+        """Changes of label counters by annotations or drafts: {(field, key, label or None): delta}"""
+        labels_field = 'created_labels_drafts' if drafts else 'created_labels'
+        deltas = Counter()
+        for item in items:
+            results = get_attr_or_item(item, 'result') or []
+            if not isinstance(results, list):
+                continue
+
+            for result in results:
+                if drafts:
+                    if 'from_name' not in result:
+                        continue
+                else:
+                    key = self._get_annotation_key(result)
+                    if not key:
+                        continue
+                    deltas[('created_annotations', key, None)] += sign
+                for label in self._get_labels(result):
+                    deltas[(labels_field, result['from_name'], label)] += sign
+        return deltas
+
+    def add_label_deltas(self, items, sign=1, drafts=False):
+        """Append label counter changes to ProjectSummaryDelta instead of rewriting the summary row"""
+        ProjectSummaryDelta.objects.bulk_create(
+            [
+                ProjectSummaryDelta(project_id=self.project_id, field=field, key=key, label=label, delta=delta)
+                for (field, key, label), delta in self.get_label_deltas(items, sign, drafts).items()
+                if delta
+            ],
+            batch_size=settings.BATCH_SIZE,
+        )
+
+    @staticmethod
+    def fold_label_deltas(counters, deltas):
+        """Apply (field, key, label, delta) changes to label counters {field: {...}}, counters under 1 are removed"""
+        for field, key, label, delta in deltas:
+            counter = counters[field]
+            if label is not None:
+                counter = counter.setdefault(key, {})
+                key, parent = label, key
+            count = counter.get(key, 0) + delta
+            if count > 0:
+                counter[key] = count
+            else:
+                counter.pop(key, None)
+            if label is not None and not counter:
+                counters[field].pop(parent)
+        return counters
+
+    def apply_deltas(self):
+        """Fold pending label counter deltas into the summary, see PROJECT_SUMMARY_DELTAS"""
+        with transaction.atomic():
+            # current counters are read under the lock, other processes could fold deltas before
+            values = (
+                ProjectSummary.objects.select_for_update().filter(pk=self.pk).values(*LABEL_COUNTER_FIELDS).first()
+            )
+            deltas = list(
+                ProjectSummaryDelta.objects.filter(project_id=self.project_id)
+                .order_by('id')
+                .values_list('id', 'field', 'key', 'label', 'delta')
+            )
+            if values is None:
+                return
+            if deltas:
+                counters = {field: copy.deepcopy(values[field] or {}) for field in LABEL_COUNTER_FIELDS}
+                values = self.fold_label_deltas(counters, (delta[1:] for delta in deltas))
+                ProjectSummary.objects.filter(pk=self.pk).update(**values)
+                ids = [delta[0] for delta in deltas]
+                for start in range(0, len(ids), settings.BATCH_SIZE):
+                    ProjectSummaryDelta.objects.filter(id__in=ids[start : start + settings.BATCH_SIZE]).delete()
+                logger.debug(f'{len(deltas)} summary deltas applied for project_id={self.project_id}')
+
+        for field, value in values.items():
+            setattr(self, field, value)
+
     def update_created_annotations_and_labels(self, annotations):
+        if settings.PROJECT_SUMMARY_DELTAS:
+            self.add_label_deltas(annotations)
+            return
+
         created_annotations = dict(self.created_annotations)
         labels = dict(self.created_labels)
         for annotation in annotations:
@@ -1344,38 +1436,39 @@ class ProjectSummary(models.Model):
         self.save(update_fields=['created_annotations', 'created_labels'])
 
     def remove_created_annotations_and_labels(self, annotations):
-        # we are going to remove all annotations, so we'll reset the corresponding fields on the summary
-        remove_all_annotations = self.project.annotations.count() == len(annotations)
-        created_annotations, created_labels = (
-            ({}, {}) if remove_all_annotations else (dict(self.created_annotations), dict(self.created_labels))
-        )
+        """Decrease annotation and label counters by the removed annotations,
+        use reset_created_annotations_and_labels() when all project annotations are removed
+        """
+        if settings.PROJECT_SUMMARY_DELTAS:
+            self.add_label_deltas(annotations, sign=-1)
+            return
 
-        if not remove_all_annotations:
-            for annotation in annotations:
-                results = get_attr_or_item(annotation, 'result') or []
-                if not isinstance(results, list):
-                    continue
+        created_annotations, created_labels = dict(self.created_annotations), dict(self.created_labels)
+        for annotation in annotations:
+            results = get_attr_or_item(annotation, 'result') or []
+            if not isinstance(results, list):
+                continue
 
-                for result in results:
-                    # reduce annotation counters
-                    key = self._get_annotation_key(result)
-                    if key in created_annotations:
-                        created_annotations[key] -= 1
-                        if created_annotations[key] == 0:
-                            created_annotations.pop(key)
-
-                    # reduce labels counters
-                    from_name = result.get('from_name', None)
-                    if from_name not in created_labels:
-                        continue
-                    for label in self._get_labels(result):
-                        label = str(label)
-                        if label in created_labels[from_name]:
-                            created_labels[from_name][label] -= 1
-                            if created_labels[from_name][label] == 0:
-                                created_labels[from_name].pop(label)
-                    if not created_labels[from_name]:
-                        created_labels.pop(from_name)
+            for result in results:
+                # reduce annotation counters
+                key = self._get_annotation_key(result)
+                if key in created_annotations:
+                    created_annotations[key] -= 1
+                    if created_annotations[key] == 0:
+                        created_annotations.pop(key)
+
+                # reduce labels counters
+                from_name = result.get('from_name', None)
+                if from_name not in created_labels:
+                    continue
+                for label in self._get_labels(result):
+                    label = str(label)
+                    if label in created_labels[from_name]:
+                        created_labels[from_name][label] -= 1
+                        if created_labels[from_name][label] == 0:
+                            created_labels[from_name].pop(label)
+                if not created_labels[from_name]:
+                    created_labels.pop(from_name)
 
         logger.debug(f'summary.created_annotations = {created_annotations}')
         logger.debug(f'summary.created_labels = {created_labels}')
@@ -1383,7 +1476,22 @@ class ProjectSummary(models.Model):
         self.created_labels = created_labels
         self.save(update_fields=['created_annotations', 'created_labels'])
 
+    def reset_created_annotations_and_labels(self):
+        """All project annotations are removed, reset annotation and label counters"""
+        logger.debug(f'reset summary.created_annotations and summary.created_labels project_id={self.project_id}')
+        # pending deltas of the removed annotations are dropped together with the counters
+        ProjectSummaryDelta.objects.filter(
+            project_id=self.project_id, field__in=['created_annotations', 'created_labels']
+        ).delete()
+        self.created_annotations = {}
+        self.created_labels = {}
+        self.save(update_fields=['created_annotations', 'created_labels'])
+
     def update_created_labels_drafts(self, drafts):
+        if settings.PROJECT_SUMMARY_DELTAS:
+            self.add_label_deltas(drafts, drafts=True)
+            return
+
         labels = dict(self.created_labels_drafts)
         for draft in drafts:
             results = get_attr_or_item(draft, 'result') or []
@@ -1407,33 +1515,61 @@ class ProjectSummary(models.Model):
         self.save(update_fields=['created_labels_drafts'])
 
     def remove_created_drafts_and_labels(self, drafts):
-        # we are going to remove all drafts, so we'll reset the corresponding field on the summary
-        remove_all_drafts = AnnotationDraft.objects.filter(task__project=self.project).count() == len(drafts)
-        labels = {} if remove_all_drafts else dict(self.created_labels_drafts)
-
-        if not remove_all_drafts:
-            for draft in drafts:
-                results = get_attr_or_item(draft, 'result') or []
-                if not isinstance(results, list):
-                    continue
+        """Decrease draft label counters by the removed drafts,
+        use reset_created_labels_drafts() when all project drafts are removed
+        """
+        if settings.PROJECT_SUMMARY_DELTAS:
+            self.add_label_deltas(drafts, sign=-1, drafts=True)
+            return
 
-                for result in results:
-                    # reduce labels counters
-                    from_name = result.get('from_name', None)
-                    if from_name not in labels:
-                        continue
-                    for label in self._get_labels(result):
-                        label = str(label)
-                        if label in labels[from_name]:
-                            labels[from_name][label] -= 1
-                            if labels[from_name][label] == 0:
-                                labels[from_name].pop(label)
-                    if not labels[from_name]:
-                        labels.pop(from_name)
+        labels = dict(self.created_labels_drafts)
+        for draft in drafts:
+            results = get_attr_or_item(draft, 'result') or []
+            if not isinstance(results, list):
+                continue
+
+            for result in results:
+                # reduce labels counters
+                from_name = result.get('from_name', None)
+                if from_name not in labels:
+                    continue
+                for label in self._get_labels(result):
+                    label = str(label)
+                    if label in labels[from_name]:
+                        labels[from_name][label] -= 1
+                        if labels[from_name][label] == 0:
+                            labels[from_name].pop(label)
+                if not labels[from_name]:
+                    labels.pop(from_name)
         logger.debug(f'summary.created_labels_drafts = {labels}')
         self.created_labels_drafts = labels
         self.save(update_fields=['created_labels_drafts'])
 
+    def reset_created_labels_drafts(self):
+        """All project drafts are removed, reset draft label counters"""
+        logger.debug(f'reset summary.created_labels_drafts project_id={self.project_id}')
+        ProjectSummaryDelta.objects.filter(project_id=self.project_id, field='created_labels_drafts').delete()
+        self.created_labels_drafts = {}
+        self.save(update_fields=['created_labels_drafts'])
+
+
+LABEL_COUNTER_FIELDS = ('created_annotations', 'created_labels', 'created_labels_drafts')
+
+
+class ProjectSummaryDelta(models.Model):
+    """Change of a ProjectSummary label counter.
+
+    With PROJECT_SUMMARY_DELTAS annotation and draft writes append deltas instead of rewriting JSON fields
+    of the summary row, ProjectSummary.apply_deltas() folds them into the summary when it's read.
+    """
+
+    project = models.ForeignKey('projects.Project', on_delete=models.CASCADE, related_name='summary_deltas')
+    field = models.CharField(max_length=32, help_text='Summary field: ' + ', '.join(LABEL_COUNTER_FIELDS))
+    key = models.TextField(help_text='Annotation tuple for created_annotations or from_name for labels')
+    label = models.TextField(null=True, default=None, help_text='Label for created_labels and created_labels_drafts')
+    delta = models.IntegerField()
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True, help_text='Creation time')
+
 
 class ProjectImport(models.Model):
     class Status(models.TextChoices):
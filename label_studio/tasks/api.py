@@ -114,6 +114,28 @@ logger = logging.getLogger(__name__)
                 in_=openapi.IN_QUERY,
                 description='Specify which fields to include in the response',
             ),
+            openapi.Parameter(
+                name='pagination',
+                type=openapi.TYPE_STRING,
+                enum=['page', 'cursor'],
+                default='page',
+                in_=openapi.IN_QUERY,
+                description='Set to "cursor" to use keyset pagination: tasks are returned with `next_cursor` '
+                'that should be passed as `cursor` to get the next page',
+            ),
+            openapi.Parameter(
+                name='cursor',
+                type=openapi.TYPE_STRING,
+                in_=openapi.IN_QUERY,
+                description='Opaque cursor from `next_cursor` of the previous page, enables keyset pagination',
+            ),
+            openapi.Parameter(
+                name='approximate_count',
+                type=openapi.TYPE_BOOLEAN,
+                in_=openapi.IN_QUERY,
+                description='Allow estimated totals for big views, `total_is_estimated` is true in the response '
+                'when `total`, `total_annotations` and `total_predictions` are estimates',
+            ),
             openapi.Parameter(
                 name='query',
                 type=openapi.TYPE_STRING,
@@ -156,6 +178,10 @@ logger = logging.getLogger(__name__)
                         'total_predictions': openapi.Schema(
                             description='Total number of predictions', type=openapi.TYPE_INTEGER
                         ),
+                        'next_cursor': openapi.Schema(
+                            description='Cursor of the next page in keyset pagination mode, null on the last page',
+                            type=openapi.TYPE_STRING,
+                        ),
                     },
                 ),
             )
@@ -10,14 +10,16 @@ from core.redis import start_job_async_or_sync
 from core.utils.common import batch
 from data_export.mixins import ExportMixin
 from data_export.models import DataExport
+from data_export.native_formats import is_native_format
 from data_export.serializers import ExportDataSerializer
+from data_manager.counts import invalidate_tasks_counts
 from data_manager.managers import TaskQuerySet
 from django.conf import settings
 from django.db import transaction
 from django.db.models import Count, Q
 from organizations.models import Organization
 from projects.models import Project
-from tasks.models import Annotation, Prediction, Task
+from tasks.models import Annotation, Prediction, Task, TaskAggregate
 
 logger = logging.getLogger(__name__)
 
@@ -114,15 +116,23 @@ def export_project(project_id, export_format, path, serializer_context=None):
         serializer_context = json.loads(serializer_context)
     serializer_options = ExportMixin._get_export_serializer_option(serializer_context)
 
-    # export cycle
-    tasks = []
-    for _task_ids in batch(task_ids, 1000):
-        tasks += ExportDataSerializer(_task_ids, many=True, **serializer_options).data
+    if is_native_format(export_format):
+        # native formats are streamed from the database
+        export_file, _, filename = DataExport.generate_native_export_file(
+            project, list(task_ids.order_by('id').values_list('id', flat=True)), export_format, serializer_context
+        )
+    else:
+        # export cycle, tasks are serialized batch by batch while the export file is written
+        tasks = (
+            task
+            for _task_ids in batch(task_ids, 1000)
+            for task in ExportDataSerializer(_task_ids, many=True, **serializer_options).data
+        )
 
-    # convert to output format
-    export_file, _, filename = DataExport.generate_export_file(
-        project, tasks, export_format, settings.CONVERTER_DOWNLOAD_RESOURCES, {}
-    )
+        # convert to output format
+        export_file, _, filename = DataExport.generate_export_file(
+            project, tasks, export_format, settings.CONVERTER_DOWNLOAD_RESOURCES, {}
+        )
 
     # write to file
     filepath = os.path.join(path, filename) if os.path.isdir(path) else path
@@ -174,6 +184,32 @@ def fill_predictions_project(migration_name):
     logger.info('Finished filling project field for Prediction model')
 
 
+def _fill_tasks_aggregates(migration_name='0055_taskaggregate'):
+    project_ids = Project.objects.all().values_list('id', flat=True)
+    for project_id in project_ids:
+        migration = AsyncMigrationStatus.objects.create(
+            project_id=project_id,
+            name=migration_name,
+            status=AsyncMigrationStatus.STATUS_STARTED,
+        )
+
+        task_ids = Task.objects.filter(project_id=project_id).filter(
+            Q(annotations__isnull=False) | Q(predictions__isnull=False)
+        )
+        task_ids = list(task_ids.distinct().values_list('id', flat=True))
+        TaskAggregate.refresh(task_ids)
+
+        migration.status = AsyncMigrationStatus.STATUS_FINISHED
+        migration.meta = {'tasks_processed': len(task_ids)}
+        migration.save()
+
+
+def fill_tasks_aggregates(migration_name):
+    logger.info('Start filling TaskAggregate model')
+    start_job_async_or_sync(_fill_tasks_aggregates, migration_name=migration_name)
+    logger.info('Finished filling TaskAggregate model')
+
+
 def update_tasks_counters(queryset, from_scratch=True):
     """
     Update tasks counters for the passed queryset of Tasks
@@ -198,6 +234,12 @@ def update_tasks_counters(queryset, from_scratch=True):
             Q(total_annotations__gt=0) | Q(cancelled_annotations__gt=0) | Q(total_predictions__gt=0)
         )
 
+    # aggregates are recalculated for the same tasks as counters
+    TaskAggregate.refresh(queryset.values_list('id', flat=True))
+    # totals of data manager views include task counters
+    for project_id in queryset.order_by().values_list('project_id', flat=True).distinct():
+        invalidate_tasks_counts(project_id)
+
     # filter our tasks with 0 annotations and 0 predictions and update them with 0
     queryset.filter(annotations__isnull=True, predictions__isnull=True).update(
         total_annotations=0, cancelled_annotations=0, total_predictions=0
@@ -0,0 +1,78 @@
+# Generated by Django 5.1.15 on 2026-10-17 06:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+from tasks.functions import fill_tasks_aggregates
+
+
+def forward(apps, schema_editor):
+    fill_tasks_aggregates('0055_taskaggregate')
+
+
+def backwards(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("tasks", "0054_add_brin_index_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskAggregate",
+            fields=[
+                (
+                    "task",
+                    models.OneToOneField(
+                        help_text="Task these aggregates belong to",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="aggregate",
+                        serialize=False,
+                        to="tasks.task",
+                    ),
+                ),
+                (
+                    "annotators",
+                    models.JSONField(
+                        default=list,
+                        help_text="Sorted list of distinct user IDs who completed annotations for the task",
+                        verbose_name="annotators",
+                    ),
+                ),
+                (
+                    "last_annotation_at",
+                    models.DateTimeField(
+                        help_text="Creation time of the newest annotation of the task",
+                        null=True,
+                        verbose_name="last annotation at",
+                    ),
+                ),
+                (
+                    "predictions_score",
+                    models.FloatField(
+                        help_text="Average score of all task predictions",
+                        null=True,
+                        verbose_name="predictions score",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "task_aggregate",
+                "indexes": [
+                    models.Index(
+                        fields=["last_annotation_at"],
+                        name="task_aggregate_last_ann_idx",
+                    ),
+                    models.Index(
+                        fields=["predictions_score"],
+                        name="task_aggregate_pred_score_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(forward, backwards),
+    ]
@@ -2,6 +2,7 @@
 """
 import base64
 import datetime
+import functools
 import logging
 import numbers
 import os
@@ -15,7 +16,7 @@ import ujson as json
 from core.bulk_update_utils import bulk_update
 from core.current_request import get_current_request
 from core.feature_flags import flag_set
-from core.label_config import SINGLE_VALUED_TAGS
+from core.label_config import SINGLE_VALUED_TAGS, parse_config
 from core.redis import start_job_async_or_sync
 from core.utils.common import (
     find_first_one_to_one_related_field_by_prefix,
@@ -23,9 +24,10 @@ from core.utils.common import (
     string_is_url,
     temporary_disconnect_list_signal,
 )
-from core.utils.db import fast_first
+from core.utils.db import BulkInsertManagerMixin, fast_first
 from core.utils.params import get_env
 from data_import.models import FileUpload
+from data_manager.counts import invalidate_tasks_counts
 from data_manager.managers import PreparedTaskManager, TaskManager
 from django.conf import settings
 from django.db import OperationalError, models, transaction
@@ -427,57 +429,12 @@ class Task(TaskMixin, models.Model):
 
         if storage:
             return {
-                'url': storage.generate_http_url(url),
+                'url': storage.generate_http_url_cached(url),
                 'presign_ttl': storage.presign_ttl,
             }
 
     def resolve_uri(self, task_data, project):
-        from io_storages.functions import get_storage_by_url
-
-        if project.task_data_login and project.task_data_password:
-            protected_data = {}
-            for key, value in task_data.items():
-                if isinstance(value, str) and string_is_url(value):
-                    path = (
-                        reverse('projects-file-proxy', kwargs={'pk': project.pk})
-                        + '?url='
-                        + base64.urlsafe_b64encode(value.encode()).decode()
-                    )
-                    value = urljoin(settings.HOSTNAME, path)
-                protected_data[key] = value
-            return protected_data
-        else:
-            storage_objects = project.get_all_import_storage_objects
-
-            # try resolve URLs via storage associated with that task
-            for field in task_data:
-                # file saved in django file storage
-                prepared_filename = self.prepare_filename(task_data[field])
-                if settings.CLOUD_FILE_STORAGE_ENABLED and self.is_upload_file(prepared_filename):
-                    # permission check: resolve uploaded files to the project only
-                    file_upload = fast_first(FileUpload.objects.filter(project=project, file=prepared_filename))
-                    if file_upload is not None:
-                        task_data[field] = file_upload.url
-                    # it's very rare case, e.g. user tried to reimport exported file from another project
-                    # or user wrote his django storage path manually
-                    else:
-                        task_data[field] = task_data[field] + '?not_uploaded_project_file'
-                    continue
-
-                # project storage
-                # TODO: to resolve nested lists and dicts we should improve get_storage_by_url(),
-                # Now always using get_storage_by_url to ensure the storage with the correct bucket is used
-                # As a last fallback we can use self.storage which is the storage the Task was imported from
-                storage = get_storage_by_url(task_data[field], storage_objects) or self.storage
-                if storage:
-                    try:
-                        resolved_uri = storage.resolve_uri(task_data[field], self)
-                    except Exception as exc:
-                        logger.debug(exc, exc_info=True)
-                        resolved_uri = None
-                    if resolved_uri:
-                        task_data[field] = resolved_uri
-            return task_data
+        return TaskDataURIResolver(project, [self]).resolve(self, task_data)
 
     @property
     def storage(self):
@@ -561,7 +518,121 @@ pre_bulk_create = Signal()   # providing args 'objs' and 'batch_size'
 post_bulk_create = Signal()   # providing args 'objs' and 'batch_size'
 
 
-class AnnotationManager(models.Manager):
+class TaskDataURIResolver:
+    """Resolve storage URIs in data of a batch of tasks from the same project
+
+    FileUpload urls of uploaded files are fetched for all tasks with one query,
+    storage lookups are shared between tasks, and values that can't contain a URI
+    are skipped without touching task storage links.
+    """
+
+    def __init__(self, project, tasks=()):
+        self.project = project
+        self.storage_objects = project.get_all_import_storage_objects
+        self.storages_by_uri = {}
+        self.file_upload_urls = {}
+        self.prefetch(tasks)
+
+    def prefetch(self, tasks):
+        """Load urls of uploaded files referenced in the tasks data"""
+        if not settings.CLOUD_FILE_STORAGE_ENABLED:
+            return
+
+        filenames = set()
+        for task in tasks:
+            if not isinstance(task.data, dict):
+                continue
+            for value in task.data.values():
+                filename = Task.prepare_filename(value)
+                if Task.is_upload_file(filename) and filename not in self.file_upload_urls:
+                    filenames.add(filename)
+        if not filenames:
+            return
+
+        # permission check: resolve uploaded files to the project only
+        for file_upload in FileUpload.objects.filter(project=self.project, file__in=filenames):
+            self.file_upload_urls.setdefault(file_upload.file.name, file_upload.url)
+        for filename in filenames - self.file_upload_urls.keys():
+            self.file_upload_urls[filename] = None
+
+    def get_file_upload_url(self, filename):
+        if filename not in self.file_upload_urls:
+            file_upload = fast_first(FileUpload.objects.filter(project=self.project, file=filename))
+            self.file_upload_urls[filename] = file_upload.url if file_upload else None
+        return self.file_upload_urls[filename]
+
+    def get_storage(self, uri):
+        from io_storages.functions import get_storage_by_url
+
+        if not isinstance(uri, str):
+            return get_storage_by_url(uri, self.storage_objects)
+        if uri not in self.storages_by_uri:
+            self.storages_by_uri[uri] = get_storage_by_url(uri, self.storage_objects)
+        return self.storages_by_uri[uri]
+
+    @staticmethod
+    def may_contain_uri(value):
+        # storage URIs always have a scheme, e.g. s3://bucket/key
+        if isinstance(value, str):
+            return ':' in value
+        return isinstance(value, (list, dict))
+
+    def protect(self, task_data):
+        """Route all urls through the project file proxy when task data is protected with login and password"""
+        protected_data = {}
+        for key, value in task_data.items():
+            if isinstance(value, str) and string_is_url(value):
+                path = (
+                    reverse('projects-file-proxy', kwargs={'pk': self.project.pk})
+                    + '?url='
+                    + base64.urlsafe_b64encode(value.encode()).decode()
+                )
+                value = urljoin(settings.HOSTNAME, path)
+            protected_data[key] = value
+        return protected_data
+
+    def resolve(self, task, task_data=None):
+        """Resolve uploaded files and storage URIs in task data
+        :param task: Task which data is resolved, it's used for storage links and proxy urls
+        :param task_data: data to resolve, task.data by default; it's updated in place
+        :return: resolved task data
+        """
+        if task_data is None:
+            task_data = task.data
+        if self.project.task_data_login and self.project.task_data_password:
+            return self.protect(task_data)
+
+        # try resolve URLs via storage associated with that task
+        for field, value in task_data.items():
+            # file saved in django file storage
+            prepared_filename = Task.prepare_filename(value)
+            if settings.CLOUD_FILE_STORAGE_ENABLED and Task.is_upload_file(prepared_filename):
+                url = self.get_file_upload_url(prepared_filename)
+                # it's very rare case, e.g. user tried to reimport exported file from another project
+                # or user wrote his django storage path manually
+                task_data[field] = url if url is not None else value + '?not_uploaded_project_file'
+                continue
+
+            if not self.may_contain_uri(value):
+                continue
+
+            # project storage
+            # TODO: to resolve nested lists and dicts we should improve get_storage_by_url(),
+            # Now always using get_storage_by_url to ensure the storage with the correct bucket is used
+            # As a last fallback we can use task.storage which is the storage the Task was imported from
+            storage = self.get_storage(value) or task.storage
+            if storage:
+                try:
+                    resolved_uri = storage.resolve_uri(value, task)
+                except Exception as exc:
+                    logger.debug(exc, exc_info=True)
+                    resolved_uri = None
+                if resolved_uri:
+                    task_data[field] = resolved_uri
+        return task_data
+
+
+class AnnotationManager(BulkInsertManagerMixin, models.Manager):
     def for_user(self, user):
         return self.filter(project__organization=user.active_organization)
 
@@ -571,6 +642,92 @@ class AnnotationManager(models.Manager):
         post_bulk_create.send(sender=self.model, objs=objs, batch_size=batch_size)
         return res
 
+    def copy_insert(self, objs, batch_size=None):
+        pre_bulk_create.send(sender=self.model, objs=objs, batch_size=batch_size)
+        res = super(AnnotationManager, self).copy_insert(objs, batch_size)
+        post_bulk_create.send(sender=self.model, objs=objs, batch_size=batch_size)
+        return res
+
+
+class PredictionManager(BulkInsertManagerMixin, models.Manager):
+    pass
+
+
+class PredictionResultNormalizer:
+    """Normalize prediction results of projects with the same label config, see Prediction.prepare_prediction_result()
+
+    Control tags of the label config are compiled once into lookups by result type,
+    so a batch of results is normalized without going through the label config for every result:
+
+        normalizer = PredictionResultNormalizer.for_project(project)
+        results = normalizer.normalize_batch([prediction['result'] for prediction in predictions])
+    """
+
+    def __init__(self, parsed_config):
+        # control tags in label config order: (from_name, to_name, type)
+        self.controls = [
+            (tag, ','.join(tag_info['to_name']), tag_info['type'].lower()) for tag, tag_info in parsed_config.items()
+        ]
+        # first control of each type, with its position for dict results with keys of several types
+        self.controls_by_type = {}
+        for position, control in enumerate(self.controls):
+            self.controls_by_type.setdefault(control[2], (position, control))
+        # first single-valued control accepting a value of each python type, filled on demand
+        self.single_valued_controls = {}
+
+    @classmethod
+    def for_project(cls, project):
+        return cls.for_label_config(project.label_config)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=128)
+    def for_label_config(label_config):
+        try:
+            parsed_config = parse_config(label_config) if label_config else {}
+        except Exception as e:
+            logger.error(f'Error parsing label config for prediction results: {e}', exc_info=True)
+            parsed_config = {}
+        return PredictionResultNormalizer(parsed_config)
+
+    def normalize_batch(self, results):
+        return [self.normalize(result) for result in results]
+
+    def normalize(self, result):
+        if isinstance(result, list):
+            # full representation of result
+            for item in result:
+                if not isinstance(item, dict):
+                    raise ValidationError('Each item in prediction result should be dict')
+            # TODO: check consistency with project.label_config
+            return result
+
+        elif isinstance(result, dict):
+            # "value" from result, under the first control of a type from its keys
+            # TODO: validate value fields according to project.label_config
+            controls = [self.controls_by_type[key] for key in result if key in self.controls_by_type]
+            if controls:
+                _, (tag, to_name, tag_type) = min(controls)
+                return [{'from_name': tag, 'to_name': to_name, 'type': tag_type, 'value': result}]
+
+        elif isinstance(result, (str, numbers.Integral)):
+            # If result is of integral type, it could be a representation of data from single-valued control tags (e.g. Choices, Rating, etc.)
+            value_type = type(result)
+            if value_type not in self.single_valued_controls:
+                self.single_valued_controls[value_type] = next(
+                    (
+                        (tag, to_name, tag_type)
+                        for tag, to_name, tag_type in self.controls
+                        if tag_type in SINGLE_VALUED_TAGS and isinstance(result, SINGLE_VALUED_TAGS[tag_type])
+                    ),
+                    None,
+                )
+            control = self.single_valued_controls[value_type]
+            if control:
+                tag, to_name, tag_type = control
+                return [{'from_name': tag, 'to_name': to_name, 'type': tag_type, 'value': {tag_type: [result]}}]
+        else:
+            raise ValidationError(f'Incorrect format {type(result)} for prediction result {result}')
+
 
 GET_UNIQUE_IDS = """
 with tt as (
@@ -795,6 +952,8 @@ class Annotation(AnnotationMixin, models.Model):
         logger.debug('Remove annotation counters in project summary followed by deleting an annotation')
         self.decrease_project_summary_counters()
 
+        TaskAggregate.refresh_on_commit([task.id])
+
 
 class TaskLock(models.Model):
     task = models.ForeignKey(
@@ -814,6 +973,131 @@ class TaskLock(models.Model):
     created_at = models.DateTimeField(_('created at'), auto_now_add=True, help_text='Creation time', null=True)
 
 
+class TaskAggregate(models.Model):
+    """Per-task annotation and prediction aggregates materialized for Data Manager filters and orderings.
+    Rows are maintained from annotation/prediction save and delete paths and from update_tasks_counters,
+    tasks without annotations and predictions have no row.
+    """
+
+    task = models.OneToOneField(
+        'tasks.Task',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='aggregate',
+        help_text='Task these aggregates belong to',
+    )
+    annotators = JSONField(
+        _('annotators'),
+        default=list,
+        help_text='Sorted list of distinct user IDs who completed annotations for the task',
+    )
+    last_annotation_at = models.DateTimeField(
+        _('last annotation at'),
+        null=True,
+        help_text='Creation time of the newest annotation of the task',
+    )
+    predictions_score = models.FloatField(
+        _('predictions score'),
+        null=True,
+        help_text='Average score of all task predictions',
+    )
+
+    AGGREGATE_FIELDS = ['annotators', 'last_annotation_at', 'predictions_score']
+
+    class Meta:
+        db_table = 'task_aggregate'
+        indexes = [
+            models.Index(fields=['last_annotation_at'], name='task_aggregate_last_ann_idx'),
+            models.Index(fields=['predictions_score'], name='task_aggregate_pred_score_idx'),
+        ]
+
+    def is_empty(self):
+        return not self.annotators and self.last_annotation_at is None and self.predictions_score is None
+
+    @classmethod
+    def calculate(cls, task_ids):
+        """Calculate aggregates for the tasks from their annotations and predictions
+        :param task_ids: list of task IDs
+        :return: list of unsaved TaskAggregate objects, one per existing task
+        """
+        annotators = {}
+        rows = (
+            Annotation.objects.filter(task_id__in=task_ids, completed_by__isnull=False)
+            .values_list('task_id', 'completed_by_id')
+            .distinct()
+        )
+        for task_id, user_id in rows:
+            annotators.setdefault(task_id, []).append(user_id)
+
+        newest_annotation = Annotation.objects.filter(task=models.OuterRef('pk')).order_by('-id')[:1]
+        predictions_score = (
+            Prediction.objects.filter(task=models.OuterRef('pk'))
+            .order_by()
+            .values('task')
+            .annotate(avg=models.Avg('score'))
+            .values('avg')
+        )
+        rows = (
+            Task.objects.filter(id__in=task_ids)
+            .annotate(
+                last_annotation_at=models.Subquery(newest_annotation.values('created_at')),
+                avg_predictions_score=models.Subquery(predictions_score, output_field=models.FloatField()),
+            )
+            .values_list('id', 'last_annotation_at', 'avg_predictions_score')
+        )
+        return [
+            cls(
+                task_id=task_id,
+                annotators=sorted(annotators.get(task_id, [])),
+                last_annotation_at=last_annotation_at,
+                predictions_score=score,
+            )
+            for task_id, last_annotation_at, score in rows
+        ]
+
+    @classmethod
+    def refresh(cls, task_ids):
+        """Recalculate aggregates for the tasks in batches of size settings.BATCH_SIZE
+        :param task_ids: iterable of task IDs
+        """
+        task_ids = list(task_ids)
+        for i in range(0, len(task_ids), settings.BATCH_SIZE):
+            objs = cls.calculate(task_ids[i : i + settings.BATCH_SIZE])
+            empty = [obj.task_id for obj in objs if obj.is_empty()]
+            objs = [obj for obj in objs if not obj.is_empty()]
+            if empty:
+                cls.objects.filter(task_id__in=empty).delete()
+            if not objs:
+                continue
+            cls.objects.bulk_create(
+                objs,
+                update_conflicts=True,
+                unique_fields=['task'],
+                update_fields=cls.AGGREGATE_FIELDS,
+            )
+
+    @classmethod
+    def refresh_on_commit(cls, task_ids):
+        """Recalculate aggregates for the tasks after the current transaction is committed.
+        Tasks changed in one transaction are collected per connection and recalculated in one batch
+        by the first callback that runs, so annotation and prediction saves don't pay for the aggregate
+        queries one by one. Tasks of a rolled back transaction are recalculated with the next commit.
+        """
+        connection = transaction.get_connection()
+        if not hasattr(connection, 'pending_task_aggregates'):
+            connection.pending_task_aggregates = set()
+        connection.pending_task_aggregates.update(task_ids)
+
+        def refresh_pending():
+            pending_task_ids = sorted(connection.pending_task_aggregates)
+            connection.pending_task_aggregates.clear()
+            # tasks deleted in the committed transaction are skipped by calculate()
+            if pending_task_ids:
+                cls.refresh(pending_task_ids)
+
+        transaction.on_commit(refresh_pending, robust=True)
+
+
 class AnnotationDraft(models.Model):
     result = JSONField(_('result'), help_text='Draft result in JSON format')
     lead_time = models.FloatField(
@@ -887,6 +1171,8 @@ class AnnotationDraft(models.Model):
 class Prediction(models.Model):
     """ML backend / Prompts predictions"""
 
+    objects = PredictionManager()
+
     result = JSONField('result', null=True, default=dict, help_text='Prediction result')
     score = models.FloatField(_('score'), default=None, help_text='Prediction score', null=True)
     model_version = models.TextField(
@@ -945,45 +1231,10 @@ class Prediction(models.Model):
         result is list -> use raw result as is
         result is dict -> put result under single "value" section
         result is string -> find first occurrence of single-valued tag (Choices, TextArea, etc.) and put string under corresponding single field (e.g. "choices": ["my_label"])  # noqa
-        """
-        if isinstance(result, list):
-            # full representation of result
-            for item in result:
-                if not isinstance(item, dict):
-                    raise ValidationError('Each item in prediction result should be dict')
-            # TODO: check consistency with project.label_config
-            return result
-
-        elif isinstance(result, dict):
-            # "value" from result
-            # TODO: validate value fields according to project.label_config
-            for tag, tag_info in project.get_parsed_config().items():
-                tag_type = tag_info['type'].lower()
-                if tag_type in result:
-                    return [
-                        {
-                            'from_name': tag,
-                            'to_name': ','.join(tag_info['to_name']),
-                            'type': tag_type,
-                            'value': result,
-                        }
-                    ]
 
-        elif isinstance(result, (str, numbers.Integral)):
-            # If result is of integral type, it could be a representation of data from single-valued control tags (e.g. Choices, Rating, etc.)
-            for tag, tag_info in project.get_parsed_config().items():
-                tag_type = tag_info['type'].lower()
-                if tag_type in SINGLE_VALUED_TAGS and isinstance(result, SINGLE_VALUED_TAGS[tag_type]):
-                    return [
-                        {
-                            'from_name': tag,
-                            'to_name': ','.join(tag_info['to_name']),
-                            'type': tag_type,
-                            'value': {tag_type: [result]},
-                        }
-                    ]
-        else:
-            raise ValidationError(f'Incorrect format {type(result)} for prediction result {result}')
+        Use PredictionResultNormalizer to normalize many results.
+        """
+        return PredictionResultNormalizer.for_project(project).normalize(result)
 
     def update_task(self):
         update_fields = ['updated_at']
@@ -1327,6 +1578,37 @@ def save_predictions_to_project(sender, instance, **kwargs):
 # =========== END OF PROJECT SUMMARY UPDATES ===========
 
 
+# =========== TASK AGGREGATES UPDATES ===========
+
+
+@receiver(post_save, sender=Annotation)
+@receiver(post_save, sender=Prediction)
+@receiver(post_delete, sender=Prediction)
+def update_task_aggregate(sender, instance, **kwargs):
+    """Recalculate Data Manager aggregates of the task after an annotation or a prediction is changed"""
+    TaskAggregate.refresh_on_commit([instance.task_id])
+
+
+# =========== END OF TASK AGGREGATES UPDATES ===========
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=Annotation)
+@receiver(post_delete, sender=Annotation)
+@receiver(post_save, sender=Prediction)
+@receiver(post_delete, sender=Prediction)
+def invalidate_data_manager_counts(sender, instance, **kwargs):
+    """Task, annotation and prediction writes change the totals of Data Manager views"""
+    invalidate_tasks_counts(instance.project_id)
+
+
+@receiver(post_bulk_create, sender=Annotation)
+def invalidate_data_manager_counts_after_bulk_create(sender, objs, **kwargs):
+    for project_id in {obj.project_id for obj in objs}:
+        invalidate_tasks_counts(project_id)
+
+
 @receiver(post_save, sender=Annotation)
 def delete_draft(sender, instance, **kwargs):
     task = instance.task
@@ -1392,6 +1674,7 @@ def bulk_update_stats_project_tasks(tasks, project=None):
     # get project if it's not in params
     if project is None:
         project = tasks[0].project
+    invalidate_tasks_counts(project.id)
 
     with transaction.atomic():
         use_overlap = project._can_use_overlap()
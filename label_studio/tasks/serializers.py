@@ -8,7 +8,7 @@ from core.label_config import replace_task_data_undefined_with_config_field
 from core.utils.common import load_func, retry_database_locked
 from core.utils.db import fast_first
 from django.conf import settings
-from django.db import IntegrityError, transaction
+from django.db import IntegrityError, models, transaction
 from drf_yasg import openapi
 from projects.models import Project
 from rest_flex_fields import FlexFieldsModelSerializer
@@ -18,7 +18,15 @@ from rest_framework.fields import SkipField
 from rest_framework.serializers import ModelSerializer
 from rest_framework.settings import api_settings
 from tasks.exceptions import AnnotationDuplicateError
-from tasks.models import Annotation, AnnotationDraft, Prediction, PredictionMeta, Task
+from tasks.models import (
+    Annotation,
+    AnnotationDraft,
+    Prediction,
+    PredictionMeta,
+    PredictionResultNormalizer,
+    Task,
+    TaskDataURIResolver,
+)
 from tasks.validation import TaskValidator
 from users.models import User
 from users.serializers import UserSerializer
@@ -69,6 +77,14 @@ class PredictionSerializer(ModelSerializer):
     )
     created_ago = serializers.CharField(default='', read_only=True, help_text='Delta time from creation time')
 
+    def validate(self, attrs):
+        # normalize result here to return errors as validation errors, bulk inserts don't call save()
+        project = attrs.get('project') or getattr(attrs.get('task'), 'project', None)
+        project = project or getattr(self.instance, 'project', None)
+        if project is not None and 'result' in attrs:
+            attrs['result'] = PredictionResultNormalizer.for_project(project).normalize(attrs['result'])
+        return super().validate(attrs)
+
     class Meta:
         model = Prediction
         fields = '__all__'
@@ -187,7 +203,11 @@ class BaseTaskSerializer(FlexFieldsModelSerializer):
         if project:
             # resolve uri for storage (s3/gcs/etc)
             if self.context.get('resolve_uri', False):
-                instance.data = instance.resolve_uri(instance.data, project)
+                resolver = self.context.get('uri_resolver')
+                if resolver is not None and resolver.project == project:
+                    instance.data = resolver.resolve(instance)
+                else:
+                    instance.data = instance.resolve_uri(instance.data, project)
 
             # resolve $undefined$ key in task data
             data = instance.data
@@ -200,6 +220,22 @@ class BaseTaskSerializer(FlexFieldsModelSerializer):
         fields = '__all__'
 
 
+class ListTaskSerializer(serializers.ListSerializer):
+    """Resolve storage URIs of all listed tasks with one TaskDataURIResolver"""
+
+    def to_representation(self, data):
+        tasks = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        project = self.child.project(tasks[0]) if tasks else None
+        if not project or not self.context.get('resolve_uri', False):
+            return super().to_representation(tasks)
+
+        self.context['uri_resolver'] = TaskDataURIResolver(project, tasks)
+        try:
+            return super().to_representation(tasks)
+        finally:
+            self.context.pop('uri_resolver', None)
+
+
 class BaseTaskSerializerBulk(serializers.ListSerializer):
     """Serialize task with annotation from source json data"""
 
@@ -235,7 +271,8 @@ class BaseTaskSerializerBulk(serializers.ListSerializer):
 
         ret, errors = [], []
         self.annotation_count, self.prediction_count = 0, 0
-        for i, item in enumerate(data):
+        # tasks imported in batches are numbered from the first task of the import
+        for i, item in enumerate(data, start=self.context.get('item_offset', 0)):
             try:
                 validated = self.child.validate(item)
             except ValidationError as exc:
@@ -415,36 +452,39 @@ class BaseTaskSerializerBulk(serializers.ListSerializer):
 
         # add predictions
         last_model_version = None
-        for i, predictions in enumerate(task_predictions):
-            for prediction in predictions:
-                if not isinstance(prediction, dict):
-                    continue
-
-                # we need to call result normalizer here since "bulk_create" doesn't call save() method
-                result = Prediction.prepare_prediction_result(prediction['result'], self.project)
-                prediction_score = prediction.get('score')
-                if prediction_score is not None:
-                    try:
-                        prediction_score = float(prediction_score)
-                    except ValueError:
-                        logger.error(
-                            "Can't upload prediction score: should be in float format." 'Fallback to score=None'
-                        )
-                        prediction_score = None
-
-                last_model_version = prediction.get('model_version', 'undefined')
-                db_predictions.append(
-                    Prediction(
-                        task=self.db_tasks[i],
-                        project=self.db_tasks[i].project,
-                        result=result,
-                        score=prediction_score,
-                        model_version=last_model_version,
-                    )
+        task_indexes, predictions = [], []
+        for i, task_prediction_list in enumerate(task_predictions):
+            for prediction in task_prediction_list:
+                if isinstance(prediction, dict):
+                    task_indexes.append(i)
+                    predictions.append(prediction)
+
+        # we need to call result normalizer here since "bulk_create" doesn't call save() method
+        normalizer = PredictionResultNormalizer.for_project(self.project)
+        results = normalizer.normalize_batch([prediction['result'] for prediction in predictions])
+
+        for i, prediction, result in zip(task_indexes, predictions, results):
+            prediction_score = prediction.get('score')
+            if prediction_score is not None:
+                try:
+                    prediction_score = float(prediction_score)
+                except ValueError:
+                    logger.error("Can't upload prediction score: should be in float format." 'Fallback to score=None')
+                    prediction_score = None
+
+            last_model_version = prediction.get('model_version', 'undefined')
+            db_predictions.append(
+                Prediction(
+                    task=self.db_tasks[i],
+                    project=self.db_tasks[i].project,
+                    result=result,
+                    score=prediction_score,
+                    model_version=last_model_version,
                 )
+            )
 
         # predictions: DB bulk create
-        self.db_predictions = Prediction.objects.bulk_create(db_predictions, batch_size=settings.BATCH_SIZE)
+        self.db_predictions = Prediction.objects.bulk_insert(db_predictions, batch_size=settings.BATCH_SIZE)
         logging.info(f'Predictions serialization success, len = {len(self.db_predictions)}')
 
         # renew project model version if it's empty
@@ -528,7 +568,7 @@ class BaseTaskSerializerBulk(serializers.ListSerializer):
                 current_id += 1
             self.db_annotations = Annotation.objects.bulk_create(db_annotations, batch_size=settings.BATCH_SIZE)
         else:
-            self.db_annotations = Annotation.objects.bulk_create(db_annotations, batch_size=settings.BATCH_SIZE)
+            self.db_annotations = Annotation.objects.bulk_insert(db_annotations, batch_size=settings.BATCH_SIZE)
         logging.info(f'Annotations serialization success, len = {len(self.db_annotations)}')
 
         return self.db_annotations
@@ -576,7 +616,7 @@ class BaseTaskSerializerBulk(serializers.ListSerializer):
                 current_id += 1
             self.db_tasks = Task.objects.bulk_create(db_tasks, batch_size=settings.BATCH_SIZE)
         else:
-            self.db_tasks = Task.objects.bulk_create(db_tasks, batch_size=settings.BATCH_SIZE)
+            self.db_tasks = Task.objects.bulk_insert(db_tasks, batch_size=settings.BATCH_SIZE)
 
         logging.info(f'Tasks serialization success, len = {len(self.db_tasks)}')
 
@@ -18,6 +18,7 @@ import requests_mock
 import ujson as json
 from botocore.exceptions import ClientError
 from django.conf import settings
+from django.core.cache import cache
 from freezegun import freeze_time
 from moto import mock_s3
 from organizations.models import Organization
@@ -75,6 +76,12 @@ def disable_sentry(settings):
     settings.SENTRY_DSN = None
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Object ids are reused between tests, so cached values (e.g. data manager counts) must not leak"""
+    cache.clear()
+
+
 @pytest.fixture()
 def debug_modal_exceptions_false(settings):
     settings.DEBUG_MODAL_EXCEPTIONS = False
@@ -105,6 +105,36 @@ def test_action_delete_all_annotations(tasks_count, annotations_count, predictio
     assert status.status_code == 200
 
 
+@pytest.mark.django_db
+@pytest.mark.parametrize('action', ['delete_tasks_annotations', 'delete_tasks_predictions'])
+def test_action_with_data_filter(business_client, project_id, action):
+    # actions nest the filtered queryset as a subquery, data expressions must follow the aliased task table
+    project = Project.objects.get(pk=project_id)
+    for num in range(4):
+        task_id = make_task({'data': {'num': num}}, project).id
+        make_annotation({'result': []}, task_id)
+        make_prediction({'result': []}, task_id)
+
+    response = business_client.post(
+        f'/api/dm/actions?project={project_id}&id={action}',
+        data=json.dumps(
+            {
+                'selectedItems': {'all': True, 'excluded': []},
+                'filters': {
+                    'conjunction': 'and',
+                    'items': [
+                        {'filter': 'filter:tasks:data.num', 'operator': 'greater', 'value': 1, 'type': 'Number'}
+                    ],
+                },
+                'ordering': ['tasks:data.num'],
+            }
+        ),
+        content_type='application/json',
+    )
+    assert response.status_code == 200, response.content
+    assert response.json()['processed_items'] == 2
+
+
 @pytest.mark.django_db
 @pytest.mark.parametrize(
     'storage_model, link_model',
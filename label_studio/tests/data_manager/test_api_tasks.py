@@ -3,7 +3,11 @@
 import json
 
 import pytest
+from data_manager import counts
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from projects.models import Project
+from tasks.models import Task
 
 from ..utils import make_annotation, make_prediction, make_task, project_id  # noqa
 
@@ -128,3 +132,139 @@ def test_views_total_counters(tasks_count, annotations_count, predictions_count,
     assert response_data['total'] == tasks_count, response_data
     assert response_data['total_annotations'] == tasks_count * annotations_count, response_data
     assert response_data['total_predictions'] == tasks_count * predictions_count, response_data
+
+
+@pytest.mark.django_db
+def test_views_total_counters_cache(business_client, project_id, settings):
+    settings.DATA_MANAGER_COUNTS_CACHE_TTL = 60
+    payload = dict(project=project_id, data={'test': 1})
+    response = business_client.post('/api/dm/views/', data=json.dumps(payload), content_type='application/json')
+    view_id = response.json()['id']
+
+    project = Project.objects.get(pk=project_id)
+    task_ids = [make_task({'data': {}}, project).id for _ in range(3)]
+    make_annotation({'result': []}, task_ids[0])
+
+    def get_totals():
+        with CaptureQueriesContext(connection) as queries:
+            data = business_client.get(f'/api/tasks?view={view_id}').json()
+        counted = any('SUM(' in query['sql'] for query in queries.captured_queries)
+        totals = data['total'], data['total_annotations'], data['total_predictions'], data['total_is_estimated']
+        return totals, counted
+
+    assert get_totals() == ((3, 1, 0, False), True)
+    # scrolling the same view reuses cached totals
+    assert get_totals() == ((3, 1, 0, False), False)
+
+    # writes invalidate cached totals
+    make_prediction({'result': []}, task_ids[1])
+    assert get_totals() == ((3, 1, 1, False), True)
+    Task.objects.get(id=task_ids[2]).delete()
+    assert get_totals() == ((2, 1, 1, False), True)
+
+    # approximate counts fall back to exact ones without planner estimates
+    response = business_client.get(f'/api/tasks?view={view_id}&approximate_count=1')
+    assert response.json()['total'] == 2
+    assert response.json()['total_is_estimated'] is False
+
+
+@pytest.mark.django_db
+def test_approximate_tasks_counts(project_id, settings, monkeypatch):
+    settings.DATA_MANAGER_APPROXIMATE_COUNT_THRESHOLD = 100
+    settings.DATA_MANAGER_APPROXIMATE_COUNT_SAMPLE_SIZE = 2
+    project = Project.objects.get(pk=project_id)
+    for _ in range(4):
+        task_id = make_task({'data': {}}, project).id
+        make_annotation({'result': []}, task_id)
+    queryset = Task.objects.filter(project=project)
+
+    monkeypatch.setattr(counts, 'get_planner_estimate', lambda queryset: 1000)
+    assert counts.get_tasks_counts(queryset, project_id, approximate=True) == {
+        'total': 1000,
+        'total_annotations': 1000,
+        'total_predictions': 0,
+        'total_is_estimated': True,
+    }
+    assert counts.get_tasks_counts(queryset, project_id)['total'] == 4
+
+    # small views are counted exactly
+    monkeypatch.setattr(counts, 'get_planner_estimate', lambda queryset: 10)
+    counts.invalidate_tasks_counts(project_id)
+    assert counts.get_tasks_counts(queryset, project_id, approximate=True)['total_is_estimated'] is False
+
+
+@pytest.mark.parametrize(
+    'ordering',
+    [
+        ['tasks:id'],
+        ['tasks:-id'],
+        ['tasks:data.text'],
+        ['tasks:-data.text'],
+        ['tasks:total_annotations'],
+        ['tasks:-completed_at'],
+        ['tasks:predictions_score'],
+    ],
+)
+@pytest.mark.django_db
+def test_views_tasks_cursor_pagination(ordering, business_client, project_id):
+    payload = dict(project=project_id, data={'test': 1, 'ordering': ordering})
+    response = business_client.post(
+        '/api/dm/views/',
+        data=json.dumps(payload),
+        content_type='application/json',
+    )
+    assert response.status_code == 201, response.content
+    view_id = response.json()['id']
+
+    # duplicated and missing values check the id tie-breaker and nulls ordering
+    project = Project.objects.get(pk=project_id)
+    texts = ['b', 'a', 'b', None, 'c', 'a', None]
+    task_texts = {}
+    for i, text in enumerate(texts):
+        task_id = make_task({'data': {'text': text} if text else {'other': i}}, project).id
+        task_texts[task_id] = text
+        for _ in range(i % 3):
+            make_annotation({'result': []}, task_id)
+        if i % 2:
+            make_prediction({'result': [], 'score': i % 4}, task_id)
+
+    response = business_client.get(f'/api/tasks?view={view_id}&page_size=100')
+    assert response.status_code == 200, response.content
+    expected = [task['id'] for task in response.json()['tasks']]
+
+    ids, cursor, pages = [], None, 0
+    while True:
+        query = f'cursor={cursor}' if cursor else 'pagination=cursor'
+        response = business_client.get(f'/api/tasks?view={view_id}&page_size=2&{query}')
+        assert response.status_code == 200, response.content
+        data = response.json()
+        # totals are counted for the first page only
+        assert data['total'] == (None if cursor else len(texts))
+        assert len(data['tasks']) <= 2
+        ids += [task['id'] for task in data['tasks']]
+        pages += 1
+        cursor = data['next_cursor']
+        if cursor is None:
+            break
+
+    assert pages == 4
+    assert sorted(ids) == sorted(expected)
+    if ordering[0] in ('tasks:id', 'tasks:-id'):
+        assert ids == expected
+    if ordering[0] == 'tasks:data.text':
+        assert ids == sorted(task_texts, key=lambda pk: (task_texts[pk] is None, task_texts[pk] or '', pk))
+    if ordering[0] == 'tasks:-data.text':
+        with_text = [pk for pk in task_texts if task_texts[pk] is not None]
+        without_text = [pk for pk in task_texts if task_texts[pk] is None]
+        assert ids == sorted(with_text, key=lambda pk: (task_texts[pk], pk), reverse=True) + sorted(
+            without_text, reverse=True
+        )
+
+
+@pytest.mark.django_db
+def test_views_tasks_cursor_pagination_invalid_cursor(business_client, project_id):
+    project = Project.objects.get(pk=project_id)
+    make_task({'data': {'text': 'a'}}, project)
+
+    response = business_client.get(f'/api/tasks?project={project_id}&cursor=not-a-cursor')
+    assert response.status_code == 404, response.content
@@ -0,0 +1,123 @@
+"""This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
+"""
+import json
+
+import pytest
+from data_manager.functions import get_data_column_index_name
+from data_manager.managers import DataColumnIndexKind, data_column_expression
+from django.db import connection
+from projects.models import Project
+from tasks.models import Task
+
+from ..utils import make_task, project_id  # noqa
+
+
+def sqlite_index_names():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+        return {row[0] for row in cursor.fetchall()}
+
+
+def explain(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return ' '.join(str(row) for row in cursor.fetchall())
+
+
+def index_data_column(business_client, project_id, key, kind, method='post'):  # noqa: F811
+    return getattr(business_client, method)(
+        '/api/dm/indexed-columns/',
+        data=json.dumps({'project': project_id, 'key': key, 'kind': kind}),
+        content_type='application/json',
+    )
+
+
+def get_tasks(business_client, project_id, filters=None, ordering=None):  # noqa: F811
+    data = {'filters': filters, 'ordering': ordering or []}
+    payload = dict(project=project_id, data=data)
+    response = business_client.post('/api/dm/views/', data=json.dumps(payload), content_type='application/json')
+    assert response.status_code == 201, response.content
+    response = business_client.get(f'/api/tasks/?view={response.json()["id"]}&fields=all')
+    assert response.status_code == 200, response.content
+    return [task['id'] for task in response.json()['tasks']]
+
+
+@pytest.mark.django_db
+def test_indexed_data_columns(business_client, project_id):  # noqa: F811
+    project = Project.objects.get(pk=project_id)
+    task_ids = [
+        make_task({'data': {'text': text, 'score': score}}, project).id
+        for text, score in [('banana', 10), ('apple', 2), ('cherry', 33)]
+    ]
+    contains = {
+        'conjunction': 'and',
+        'items': [{'filter': 'filter:tasks:data.text', 'operator': 'contains', 'value': 'an', 'type': 'String'}],
+    }
+    equal = {
+        'conjunction': 'and',
+        'items': [{'filter': 'filter:tasks:data.text', 'operator': 'equal', 'value': 'apple', 'type': 'String'}],
+    }
+    before = [get_tasks(business_client, project_id, contains), get_tasks(business_client, project_id, equal)]
+
+    response = index_data_column(business_client, project_id, 'text', 'text')
+    assert response.status_code == 201, response.content
+    assert response.json() == {'text': {'text': 'completed'}}
+    response = index_data_column(business_client, project_id, 'score', 'number')
+    assert response.status_code == 201, response.content
+
+    response = business_client.get(f'/api/dm/indexed-columns/?project={project_id}')
+    assert response.json() == {'text': {'text': 'completed'}, 'score': {'number': 'completed'}}
+    text_index = get_data_column_index_name(project_id, 'text', 'text')
+    number_index = get_data_column_index_name(project_id, 'score', 'number')
+    assert {text_index, number_index} <= sqlite_index_names()
+
+    # filters on indexed columns return the same tasks
+    assert [get_tasks(business_client, project_id, contains), get_tasks(business_client, project_id, equal)] == before
+    assert before == [[task_ids[0]], [task_ids[1]]]
+
+    # queries are compiled from the indexed expressions
+    queryset = Task.objects.annotate(
+        ordering_field=data_column_expression('score', DataColumnIndexKind.NUMBER)
+    ).filter(ordering_field__gt=5)
+    assert number_index in explain(queryset)
+    queryset = Task.objects.annotate(filter_text=data_column_expression('text')).filter(filter_text='apple')
+    assert text_index in explain(queryset)
+
+    # numeric ordering uses indexed expression
+    payload = {'ordering': ['tasks:data.score'], 'columnsDisplayType': {'tasks:data.score': 'Number'}}
+    response = business_client.post(
+        '/api/dm/views/',
+        data=json.dumps({'project': project_id, 'data': payload}),
+        content_type='application/json',
+    )
+    response = business_client.get(f'/api/tasks/?view={response.json()["id"]}')
+    assert [task['id'] for task in response.json()['tasks']] == [task_ids[1], task_ids[0], task_ids[2]]
+
+    response = index_data_column(business_client, project_id, 'text', 'text', method='delete')
+    assert response.status_code == 204, response.content
+    assert text_index not in sqlite_index_names()
+    response = business_client.get(f'/api/dm/indexed-columns/?project={project_id}')
+    assert response.json() == {'score': {'number': 'completed'}}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'key, kind, error',
+    [
+        ('missing', 'text', 'is not found in project tasks'),
+        ('text', 'trigram', 'supported on PostgreSQL only'),
+        ('text', 'unknown', 'is not a valid choice'),
+    ],
+)
+def test_indexed_data_columns_validation(business_client, project_id, key, kind, error):  # noqa: F811
+    project = Project.objects.get(pk=project_id)
+    make_task({'data': {'text': 'text'}}, project)
+
+    response = index_data_column(business_client, project_id, key, kind)
+    assert response.status_code == 400
+    assert error in str(response.content)
+
+    response = index_data_column(business_client, project_id, 'text', 'text', method='delete')
+    assert response.status_code == 400
+    assert 'does not exist' in str(response.content)
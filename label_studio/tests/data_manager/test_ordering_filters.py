@@ -4,10 +4,15 @@ import json
 
 import pytest
 from data_import.models import FileUpload
+from data_manager.managers import apply_filters
+from data_manager.prepare_params import Filters
 from django.conf import settings
 from django.core.files.base import ContentFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils.timezone import now
 from projects.models import Project
+from tasks.models import Task
 
 from ..utils import make_annotation, make_annotator, make_prediction, make_task, project_id  # noqa
 
@@ -386,3 +391,39 @@ def test_views_filters(filters, ids, business_client, project_id):
     response_ids = [task['id'] for task in response_data['tasks']]
     correct_ids = [task_ids[i] for i in ids]
     assert response_ids == correct_ids, (response_ids, correct_ids, filters)
+
+
+@pytest.mark.django_db
+def test_views_filters_query_count(business_client, project_id):
+    """Filter compilation must not query the database, so each filter item adds no queries"""
+    project = Project.objects.get(pk=project_id)
+    for i in range(3):
+        task_id = make_task({'data': {'text': f'text {i}'}}, project).id
+        make_annotation({'result': [], 'completed_by': project.created_by}, task_id)
+        make_prediction({'result': [], 'score': i}, task_id)
+
+    filters = Filters(
+        conjunction='and',
+        items=[
+            {'filter': 'filter:tasks:data.text', 'operator': 'contains', 'value': 'text', 'type': 'String'},
+            {'filter': 'filter:tasks:data.text', 'operator': 'empty', 'value': False, 'type': 'String'},
+            {'filter': 'filter:tasks:total_annotations', 'operator': 'greater', 'value': 0, 'type': 'Number'},
+            {'filter': 'filter:tasks:predictions_score', 'operator': 'less', 'value': 10, 'type': 'Number'},
+            {'filter': 'filter:tasks:file_upload', 'operator': 'empty', 'value': True, 'type': 'String'},
+            {'filter': 'filter:tasks:completed_at', 'operator': 'empty', 'value': False, 'type': 'Datetime'},
+        ],
+    )
+    fields = ['predictions_score', 'file_upload', 'completed_at']
+    queryset = Task.prepared.annotate_queryset(
+        Task.objects.filter(project=project), fields_for_evaluation=fields, request=None
+    )
+    # project summary is loaded once by field name preprocessing
+    project.summary
+
+    with CaptureQueriesContext(connection) as queries:
+        filtered = apply_filters(queryset, filters, project, request=None)
+    # AutoOneToOneField wraps every project.summary access into a savepoint, they don't touch tables
+    sql = [query['sql'] for query in queries.captured_queries if 'SAVEPOINT' not in query['sql']]
+    assert sql == []
+
+    assert filtered.count() == 3
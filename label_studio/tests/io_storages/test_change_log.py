@@ -0,0 +1,197 @@
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from core import current_request
+from django.utils import timezone
+from io_storages.change_log import AnnotationChangeLog, export_annotation_changes, has_export_storages
+from io_storages.localfiles.models import LocalFilesExportStorage
+from projects.tests.factories import ProjectFactory
+from tasks.models import Annotation
+from tasks.tests.factories import AnnotationFactory, TaskFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def storage(settings, monkeypatch, tmp_path):
+    settings.STORAGE_EXPORT_CHANGE_LOG = True
+    settings.STORAGE_EXPORT_CHANGE_LOG_GRACE = 0
+    settings.STORAGE_EXPORT_RETRIES = 0
+    settings.STORAGE_EXPORT_WORKERS = 1
+    project = ProjectFactory()
+    storage = LocalFilesExportStorage.objects.create(project=project, path=str(tmp_path))
+    storage.saved = []
+    monkeypatch.setattr(
+        LocalFilesExportStorage,
+        'save_annotation',
+        lambda self, annotation: storage.saved.append(annotation.id),
+    )
+    return storage
+
+
+def test_changes_are_exported_in_background(storage, django_capture_on_commit_callbacks):
+    project = storage.project
+    task = TaskFactory(project=project)
+    with django_capture_on_commit_callbacks() as callbacks:
+        first = AnnotationFactory(task=task, project=project)
+        second = AnnotationFactory(task=task, project=project)
+        first.result = [{'changed': True}]
+        first.save()
+
+    # nothing is uploaded in the request path, changes are logged in order
+    assert storage.saved == []
+    assert list(AnnotationChangeLog.objects.values_list('annotation_id', 'action')) == [
+        (first.id, 'created'),
+        (second.id, 'created'),
+        (first.id, 'updated'),
+    ]
+
+    last_change_id = AnnotationChangeLog.objects.order_by('id').last().id
+    for callback in callbacks:
+        callback()
+    # every annotation is uploaded once for its last change
+    assert sorted(storage.saved) == sorted([first.id, second.id])
+    storage.refresh_from_db()
+    assert storage.last_change_id == last_change_id
+    # exported changes are pruned
+    assert not AnnotationChangeLog.objects.exists()
+
+
+def test_failed_export_keeps_cursor(storage, monkeypatch):
+    project = storage.project
+    annotation = AnnotationFactory(task=TaskFactory(project=project), project=project)
+
+    def broken_save_annotation(self, annotation):
+        raise ConnectionError('connection reset')
+
+    monkeypatch.setattr(LocalFilesExportStorage, 'save_annotation', broken_save_annotation)
+    with pytest.raises(ValueError, match='will be exported again'):
+        storage.export_changes()
+    storage.refresh_from_db()
+    assert storage.last_change_id == 0
+
+    saved = []
+    monkeypatch.setattr(LocalFilesExportStorage, 'save_annotation', lambda self, a: saved.append(a.id))
+    assert storage.export_changes() == 1
+    assert saved == [annotation.id]
+    assert storage.export_changes() == 0
+
+
+def test_changes_committed_out_of_order(storage, settings):
+    settings.STORAGE_EXPORT_CHANGE_LOG_GRACE = 60
+    project = storage.project
+    task = TaskFactory(project=project)
+    first = AnnotationFactory(task=task, project=project)
+    second = AnnotationFactory(task=task, project=project)
+    AnnotationChangeLog.objects.all().delete()
+
+    # the change with the higher id is committed first
+    late_change_id = AnnotationChangeLog.objects.create(
+        project=project, annotation_id=first.id, task_id=task.id, action='updated'
+    ).id
+    AnnotationChangeLog.objects.filter(id=late_change_id).delete()
+    AnnotationChangeLog.objects.create(project=project, annotation_id=second.id, task_id=task.id, action='updated')
+    export_annotation_changes(project.id)
+    assert storage.saved == [second.id]
+    # the cursor isn't moved over recent changes, so they aren't pruned either
+    storage.refresh_from_db()
+    assert storage.last_change_id == 0
+    assert AnnotationChangeLog.objects.count() == 1
+
+    # the change with the lower id is committed later and isn't skipped
+    storage.saved.clear()
+    AnnotationChangeLog.objects.create(
+        id=late_change_id, project=project, annotation_id=first.id, task_id=task.id, action='updated'
+    )
+    export_annotation_changes(project.id)
+    assert sorted(storage.saved) == sorted([first.id, second.id])
+
+    # the cursor is moved over changes older than the grace period and they are pruned
+    last_change_id = AnnotationChangeLog.objects.order_by('id').last().id
+    AnnotationChangeLog.objects.update(created_at=timezone.now() - timedelta(seconds=61))
+    export_annotation_changes(project.id)
+    storage.refresh_from_db()
+    assert storage.last_change_id == last_change_id
+    assert not AnnotationChangeLog.objects.exists()
+
+
+def test_failing_storage_does_not_block_others(storage, tmp_path, monkeypatch):
+    project = storage.project
+    broken = LocalFilesExportStorage.objects.create(project=project, path=str(tmp_path / 'broken'))
+    annotation = AnnotationFactory(task=TaskFactory(project=project), project=project)
+    export_changes = LocalFilesExportStorage.export_changes
+
+    def broken_export_changes(self):
+        if self.id == broken.id:
+            raise ConnectionError('connection reset')
+        return export_changes(self)
+
+    monkeypatch.setattr(LocalFilesExportStorage, 'export_changes', broken_export_changes)
+    export_annotation_changes(project.id)
+    assert storage.saved == [annotation.id]
+    # changes are kept for the failed storage
+    assert AnnotationChangeLog.objects.exists()
+
+
+def test_deleted_annotations(storage, settings, monkeypatch):
+    settings.FUTURE_SAVE_TASK_TO_STORAGE = True
+    storage.can_delete_objects = True
+    storage.save()
+    deleted = []
+    monkeypatch.setattr(
+        LocalFilesExportStorage,
+        'delete_annotation',
+        lambda self, annotation: deleted.append((annotation.id, annotation.task.id)),
+        raising=False,
+    )
+    project = storage.project
+    task = TaskFactory(project=project)
+    first = AnnotationFactory(task=task, project=project)
+    second = AnnotationFactory(task=task, project=project)
+    storage.export_changes()
+    storage.saved.clear()
+
+    # the task object is updated while it has annotations
+    first.delete()
+    storage.export_changes()
+    assert storage.saved == [second.id]
+    assert deleted == []
+
+    # and deleted with the last annotation
+    task_id = task.id
+    task.delete()
+    storage.export_changes()
+    assert deleted == [(second.id, task_id)]
+
+
+def test_project_deletion(storage):
+    project = storage.project
+    AnnotationFactory(task=TaskFactory(project=project), project=project)
+    assert AnnotationChangeLog.objects.filter(project=project).exists()
+
+    project.delete()
+    assert not AnnotationChangeLog.objects.exists()
+    assert not Annotation.objects.exists()
+
+
+def test_change_log_is_disabled_by_default(settings, tmp_path):
+    project = ProjectFactory()
+    LocalFilesExportStorage.objects.create(project=project, path=str(tmp_path))
+    AnnotationFactory(task=TaskFactory(project=project), project=project)
+
+    assert not settings.STORAGE_EXPORT_CHANGE_LOG
+    assert not AnnotationChangeLog.objects.exists()
+    # the annotation is exported in the request path
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_export_storages_are_checked_once_per_request(storage, monkeypatch, django_assert_num_queries):
+    project = ProjectFactory()
+    monkeypatch.setattr(current_request._thread_locals, 'request', SimpleNamespace(), raising=False)
+
+    assert has_export_storages(storage.project)
+    assert not has_export_storages(project)
+    with django_assert_num_queries(0):
+        assert has_export_storages(storage.project)
+        assert not has_export_storages(project)
@@ -0,0 +1,188 @@
+import json
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from io_storages.localfiles.models import LocalFilesExportStorage, LocalFilesExportStorageLink
+from projects.tests.factories import ProjectFactory
+from tasks.tests.factories import AnnotationFactory, TaskFactory
+
+pytestmark = pytest.mark.django_db
+
+
+class SyncExecutor:
+    """Run storage uploads in the test thread, so their queries are captured too"""
+
+    def __init__(self, max_workers=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def submit(self, func, *args):
+        future = Future()
+        future.set_result(func(*args))
+        return future
+
+
+@pytest.fixture
+def export_storage(settings, monkeypatch, tmp_path):
+    settings.FUTURE_SAVE_TASK_TO_STORAGE = True
+    settings.STORAGE_EXPORT_CHUNK_SIZE = 4
+    monkeypatch.setattr('io_storages.base_models.ThreadPoolExecutor', SyncExecutor)
+
+    def make_storage(tasks, annotations_per_task):
+        project = ProjectFactory()
+        for _ in range(tasks):
+            task = TaskFactory(project=project)
+            for _ in range(annotations_per_task):
+                AnnotationFactory(task=task, project=project)
+
+        path = tmp_path / f'{tasks}-{annotations_per_task}'
+        path.mkdir()
+        storage = LocalFilesExportStorage.objects.create(project=project, path=str(path))
+        storage.info_set_queued()
+        return storage
+
+    return make_storage
+
+
+def export_queries(storage):
+    with CaptureQueriesContext(connection) as queries:
+        storage.save_all_annotations()
+    return [q for q in queries.captured_queries if 'SAVEPOINT' not in q['sql']]
+
+
+def test_tasks_are_serialized_once(export_storage):
+    storage = export_storage(tasks=5, annotations_per_task=3)
+    export_queries(storage)
+
+    project = storage.project
+    exported = {int(path.stem): json.loads(path.read_text()) for path in Path(storage.path).iterdir()}
+    assert set(exported) == set(project.tasks.values_list('id', flat=True))
+    for task_id, data in exported.items():
+        assert sorted(a['id'] for a in data['annotations']) == sorted(
+            project.annotations.filter(task_id=task_id).values_list('id', flat=True)
+        )
+        assert all(isinstance(a['completed_by'], dict) for a in data['annotations'])
+
+    links = LocalFilesExportStorageLink.objects.filter(storage=storage)
+    assert sorted(links.values_list('annotation_id', flat=True)) == sorted(
+        project.annotations.values_list('id', flat=True)
+    )
+    storage.refresh_from_db()
+    assert storage.status == storage.Status.COMPLETED
+    assert storage.last_sync_count == 15
+
+    # the next sync touches existing links instead of creating new ones
+    storage.info_set_queued()
+    export_queries(storage)
+    assert links.count() == 15
+
+
+def test_queries_per_exported_task(export_storage):
+    sparse = export_queries(export_storage(tasks=8, annotations_per_task=2))
+    dense = export_queries(export_storage(tasks=8, annotations_per_task=5))
+    more_tasks = export_queries(export_storage(tasks=16, annotations_per_task=5))
+
+    # the number of queries doesn't depend on the number of annotations per task
+    assert len(dense) == len(sparse)
+    # every task costs 2 queries to save its storage link and a share of the queries per chunk of 4 tasks:
+    # tasks, annotations, predictions and drafts are prefetched, links of other annotations are saved in bulk
+    assert (len(more_tasks) - len(dense)) / 8 <= 5
+
+
+def test_annotations_are_exported_one_by_one(export_storage, settings):
+    storage = export_storage(tasks=3, annotations_per_task=2)
+    settings.FUTURE_SAVE_TASK_TO_STORAGE = False
+    export_queries(storage)
+
+    annotation_ids = set(storage.project.annotations.values_list('id', flat=True))
+    assert {int(path.name) for path in Path(storage.path).iterdir()} == annotation_ids
+    links = LocalFilesExportStorageLink.objects.filter(storage=storage)
+    assert set(links.values_list('annotation_id', flat=True)) == annotation_ids
+
+
+def test_only_new_annotations_are_exported(export_storage, settings, monkeypatch):
+    settings.FUTURE_SAVE_TASK_TO_STORAGE = False
+    storage = export_storage(tasks=3, annotations_per_task=2)
+    storage.save_all_annotations()
+
+    new = AnnotationFactory(task=storage.project.tasks.first(), project=storage.project)
+    LocalFilesExportStorageLink.objects.filter(annotation=new).delete()
+    saved = []
+    monkeypatch.setattr(
+        LocalFilesExportStorage, 'save_annotation', lambda self, annotation: saved.append(annotation.id)
+    )
+
+    storage.info_set_queued()
+    storage.save_only_new_annotations()
+    assert saved == [new.id]
+    storage.refresh_from_db()
+    assert storage.meta['total_annotations'] == 1
+
+
+def test_failed_uploads_are_retried(export_storage, settings, monkeypatch):
+    settings.STORAGE_EXPORT_RETRIES = 2
+    settings.STORAGE_EXPORT_RETRY_DELAY = 0
+    storage = export_storage(tasks=3, annotations_per_task=2)
+    broken_task = storage.project.tasks.order_by('id').last()
+    attempts = []
+
+    def save_annotation(self, annotation):
+        attempts.append(annotation.task_id)
+        # the first attempt of every upload fails, the broken task always fails
+        if attempts.count(annotation.task_id) == 1 or annotation.task_id == broken_task.id:
+            raise ConnectionError('connection reset')
+        LocalFilesExportStorageLink.create(annotation, self)
+
+    monkeypatch.setattr(LocalFilesExportStorage, 'save_annotation', save_annotation)
+    storage.save_all_annotations()
+
+    assert sorted(attempts) == sorted(2 * [task.id for task in storage.project.tasks.all()] + [broken_task.id])
+    storage.refresh_from_db()
+    assert storage.status == storage.Status.COMPLETED
+    assert storage.last_sync_count == 4
+    assert storage.meta['failed_annotations'] == 2
+    assert not LocalFilesExportStorageLink.objects.filter(storage=storage, annotation__task=broken_task).exists()
+    assert LocalFilesExportStorageLink.objects.filter(storage=storage).count() == 4
+
+
+def test_work_queue_is_bounded(export_storage, monkeypatch):
+    # real threads are used here, so uploads must not touch the database
+    monkeypatch.undo()
+    storage = export_storage(tasks=20, annotations_per_task=1)
+    storage.workers = 2
+    lock = threading.Lock()
+    loaded, uploaded, ahead = [], [], []
+
+    iter_groups = LocalFilesExportStorage._iter_task_annotation_groups
+
+    def counted_iter_groups(self, annotations):
+        for group in iter_groups(self, annotations):
+            with lock:
+                loaded.append(group[0].id)
+            yield group
+
+    def save_annotation(self, annotation):
+        time.sleep(0.01)
+        with lock:
+            ahead.append(len(loaded) - len(uploaded))
+            uploaded.append(annotation.id)
+
+    monkeypatch.setattr(LocalFilesExportStorage, '_iter_task_annotation_groups', counted_iter_groups)
+    monkeypatch.setattr(LocalFilesExportStorage, 'save_annotation', save_annotation)
+    monkeypatch.setattr(LocalFilesExportStorageLink, 'bulk_create_links', classmethod(lambda cls, a, s: None))
+    storage.save_all_annotations()
+
+    assert sorted(uploaded) == sorted(loaded)
+    assert len(uploaded) == 20
+    # at most 2 * workers uploads are queued, plus the one being loaded
+    assert max(ahead) <= 5
@@ -0,0 +1,175 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from google.cloud import storage as google_storage
+from io_storages.gcs.utils import GCS
+from io_storages.localfiles.models import LocalFilesImportStorage, LocalFilesImportStorageLink
+from io_storages.s3.models import S3ImportStorage
+from tasks.models import Annotation, Prediction, Task, TaskAggregate
+from webhooks.models import WebhookAction
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def storage_dir(tmp_path, configured_project):
+    for i in range(7):
+        task = {'data': {'text': f'text {i}'}}
+        if i % 2:
+            task['predictions'] = [{'result': [], 'score': 0.5, 'model_version': 'v1'}]
+        if i == 3:
+            task['annotations'] = [{'result': [], 'completed_by': configured_project.created_by_id}]
+        (tmp_path / f'{i:02}.json').write_text(json.dumps(task))
+    return tmp_path
+
+
+@pytest.mark.parametrize('batch_size', [1, 3, 100])
+def test_import_sync_in_batches(configured_project, storage_dir, settings, monkeypatch, batch_size):
+    settings.STORAGE_IMPORT_BATCH_SIZE = batch_size
+    settings.WEBHOOK_BATCH_SIZE = 2
+    webhooks = []
+    monkeypatch.setattr(
+        'io_storages.base_models.emit_webhooks_for_instance',
+        lambda organization, project, action, tasks: webhooks.append((action, len(tasks))),
+    )
+    project = configured_project
+    max_inner_id = project.tasks.order_by('-inner_id').first().inner_id
+    existing = project.summary.all_data_columns.get('text', 0)
+
+    storage = LocalFilesImportStorage.objects.create(project=project, path=str(storage_dir))
+    storage.info_set_queued()
+    storage.scan_and_create_links()
+
+    tasks = list(project.tasks.filter(inner_id__gt=max_inner_id).order_by('inner_id'))
+    assert [task.data['text'] for task in tasks] == [f'text {i}' for i in range(7)]
+    assert [task.inner_id for task in tasks] == list(range(max_inner_id + 1, max_inner_id + 8))
+    assert LocalFilesImportStorageLink.objects.filter(storage=storage).count() == 7
+    assert {link.task_id for link in LocalFilesImportStorageLink.objects.filter(storage=storage)} == {
+        task.id for task in tasks
+    }
+
+    assert Prediction.objects.filter(task__in=tasks).count() == 3
+    assert [task.total_predictions for task in tasks] == [0, 1, 0, 1, 0, 1, 0]
+    assert TaskAggregate.objects.get(task=tasks[1]).predictions_score == pytest.approx(0.5)
+    assert Annotation.objects.get(task__in=tasks).task_id == tasks[3].id
+    assert Task.objects.get(id=tasks[3].id).total_annotations == 1
+
+    project.summary.refresh_from_db()
+    assert project.summary.all_data_columns['text'] == existing + 7
+
+    assert webhooks == [(WebhookAction.TASKS_CREATED, 2)] * 3 + [(WebhookAction.TASKS_CREATED, 1)]
+    storage.refresh_from_db()
+    assert storage.status == storage.Status.COMPLETED
+    assert storage.last_sync_count == 7
+
+    # the second sync skips already linked keys
+    storage.info_set_queued()
+    storage.scan_and_create_links()
+    storage.refresh_from_db()
+    assert storage.last_sync_count == 0
+    assert storage.meta['tasks_existed'] == 7
+
+
+def test_resync_checks_links_per_chunk(configured_project, storage_dir, settings):
+    settings.STORAGE_IMPORT_BATCH_SIZE = 3
+    storage = LocalFilesImportStorage.objects.create(project=configured_project, path=str(storage_dir))
+    storage.info_set_queued()
+    storage.scan_and_create_links()
+    (storage_dir / '07.json').write_text(json.dumps({'text': 'new'}))
+
+    storage.info_set_queued()
+    with CaptureQueriesContext(connection) as queries:
+        storage.scan_and_create_links()
+    link_queries = [
+        q
+        for q in queries.captured_queries
+        if q['sql'].startswith('SELECT') and 'localfilesimportstoragelink' in q['sql']
+    ]
+    # 8 keys are checked in 3 chunks
+    assert len(link_queries) == 3
+
+    storage.refresh_from_db()
+    assert storage.last_sync_count == 1
+    assert storage.meta['tasks_existed'] == 7
+    assert configured_project.tasks.filter(data__text='new').exists()
+
+
+class TestPrefetchData:
+    @pytest.fixture
+    def storage(self, configured_project, storage_dir, settings):
+        settings.STORAGE_IMPORT_PREFETCH_WORKERS = 3
+        return LocalFilesImportStorage.objects.create(project=configured_project, path=str(storage_dir))
+
+    def test_order_and_backpressure(self, storage, monkeypatch):
+        lock = threading.Lock()
+        consumed, fetched, in_flight = [], [], []
+        get_data = LocalFilesImportStorage.get_data
+
+        def slow_get_data(self, key):
+            # later keys are fetched faster, so they are completed first
+            time.sleep(0.01 * (10 - int(Path(key).stem)))
+            with lock:
+                fetched.append(key)
+                in_flight.append(len(fetched) - len(consumed))
+            return get_data(self, key)
+
+        monkeypatch.setattr(LocalFilesImportStorage, 'get_data', slow_get_data)
+
+        keys = list(storage.iterkeys())
+        for key, link_objects in storage.prefetch_data(iter(keys)):
+            consumed.append(key)
+            assert link_objects[0].key == key
+
+        assert consumed == keys
+        assert sorted(fetched) == keys
+        assert max(in_flight) <= 6
+
+    def test_error_is_raised_in_order(self, storage, storage_dir):
+        (storage_dir / '03.json').write_text('not a json')
+        consumed = []
+        with pytest.raises(ValueError, match='03.json'):
+            for key, _ in storage.prefetch_data(storage.iterkeys()):
+                consumed.append(Path(key).name)
+        assert consumed == ['00.json', '01.json', '02.json']
+
+    def test_sequential(self, storage, settings, monkeypatch):
+        settings.STORAGE_IMPORT_PREFETCH_WORKERS = 0
+        threads = set()
+        get_data = LocalFilesImportStorage.get_data
+        monkeypatch.setattr(
+            LocalFilesImportStorage,
+            'get_data',
+            lambda self, key: threads.add(threading.get_ident()) or get_data(self, key),
+        )
+        keys = list(storage.iterkeys())
+        assert [key for key, _ in storage.prefetch_data(keys)] == keys
+        assert threads == {threading.get_ident()}
+
+
+def test_s3_prefetch(configured_project, s3, settings):
+    settings.STORAGE_IMPORT_PREFETCH_WORKERS = 3
+    keys = [f'{i:02}.json' for i in range(8)]
+    s3.create_bucket(Bucket='pytest-s3-prefetch')
+    for i, key in enumerate(keys):
+        s3.put_object(Bucket='pytest-s3-prefetch', Key=key, Body=json.dumps({'data': {'text': f'text {i}'}}))
+    storage = S3ImportStorage.objects.create(project=configured_project, bucket='pytest-s3-prefetch')
+
+    prefetched = list(storage.prefetch_data(storage.iterkeys()))
+    assert [key for key, _ in prefetched] == keys
+    assert [objects[0].task_data['data']['text'] for _, objects in prefetched] == [f'text {i}' for i in range(8)]
+
+
+def test_gcs_clients_are_cached_per_thread(monkeypatch):
+    monkeypatch.setattr(google_storage, 'Client', lambda **kwargs: object())
+    monkeypatch.setattr(GCS, '_thread_local', threading.local())
+
+    client = GCS.get_client()
+    assert GCS.get_client() is client
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(GCS.get_client).result() is not client
@@ -0,0 +1,89 @@
+import pytest
+from io_storages import progress as progress_module
+from io_storages.localfiles.models import LocalFilesImportStorage
+from io_storages.progress import StorageProgressReporter
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def storage(configured_project, tmp_path):
+    storage = LocalFilesImportStorage.objects.create(project=configured_project, path=str(tmp_path))
+    storage.info_set_queued()
+    storage.info_set_in_progress()
+    return storage
+
+
+@pytest.fixture
+def saves(storage, monkeypatch):
+    saves = []
+    info_save_progress = storage.info_save_progress
+
+    def save_progress(last_sync_count, **kwargs):
+        saves.append(last_sync_count)
+        info_save_progress(last_sync_count, **kwargs)
+
+    monkeypatch.setattr(storage, 'info_save_progress', save_progress)
+    return saves
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    redis = {}
+    monkeypatch.setattr(progress_module, 'redis_set', lambda key, value, ttl=None: redis.__setitem__(key, value))
+    monkeypatch.setattr(progress_module, 'redis_get', lambda key: redis.get(key))
+    return redis
+
+
+def test_updates_are_coalesced_by_items(storage, saves, redis):
+    progress = StorageProgressReporter(storage, interval=3600, items=10, publish=False)
+    for n in range(1, 26):
+        progress.update(n, tasks_existed=0)
+    assert saves == [10, 20]
+
+    progress.complete(tasks_existed=3)
+    storage.refresh_from_db()
+    assert storage.status == storage.Status.COMPLETED
+    assert storage.last_sync_count == 25
+    assert storage.meta['tasks_existed'] == 3
+    assert redis == {}
+
+
+def test_updates_are_coalesced_by_interval(storage, saves, monkeypatch):
+    now = [0]
+    monkeypatch.setattr(progress_module.time, 'monotonic', lambda: now[0])
+    progress = StorageProgressReporter(storage, interval=5, items=0, publish=False)
+    for n in range(1, 21):
+        now[0] = n
+        progress.update(n)
+    assert saves == [6, 12, 18]
+
+
+def test_failure_flushes_and_publishes(storage, saves, redis):
+    with pytest.raises(RuntimeError):
+        with StorageProgressReporter(storage, interval=3600, items=0, publish=True) as progress:
+            progress.update(7, tasks_existed=2)
+            assert saves == []
+            raise RuntimeError('sync failed')
+
+    assert saves == [7]
+    storage.refresh_from_db()
+    assert storage.last_sync_count == 7
+    assert StorageProgressReporter.get_published_progress(storage) == {
+        'status': 'failed',
+        'last_sync_count': 7,
+        'tasks_existed': 2,
+    }
+
+
+def test_storage_api_returns_published_progress(business_client, storage, redis, settings):
+    settings.STORAGE_PROGRESS_REDIS = True
+    url = f'/api/storages/localfiles/{storage.id}'
+
+    assert business_client.get(url).json()['progress'] is None
+    StorageProgressReporter(storage, interval=3600, items=1).update(3, tasks_existed=1)
+    assert business_client.get(url).json()['progress'] == {
+        'status': 'in_progress',
+        'last_sync_count': 3,
+        'tasks_existed': 1,
+    }
@@ -0,0 +1,65 @@
+"""This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
+
+Helpers for standalone benchmarks in this folder. Benchmarks work with the database configured
+by the Label Studio settings, so run them against a PostgreSQL instance to get meaningful numbers:
+
+    cd label_studio && DJANGO_DB=default python tests/loadtests/<benchmark>.py --help
+"""
+import os
+import random
+import statistics
+import string
+import sys
+import time
+from pathlib import Path
+
+
+def setup_django():
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings.label_studio')
+
+    import django
+
+    django.setup()
+
+
+def random_text(length=16):
+    return ''.join(random.choices(string.ascii_lowercase, k=length))
+
+
+def make_project(title='benchmark', label_config=None):
+    from projects.tests.factories import ProjectFactory
+
+    project = ProjectFactory(title=title)
+    if label_config:
+        project.label_config = label_config
+        project.save()
+    return project
+
+
+def make_tasks(project, count, batch_size=10000, data=None):
+    """Bulk create `count` synthetic tasks, skipping signals and summary updates"""
+    from tasks.models import Task
+
+    data = data or (lambda i: {'text': random_text(), 'score': random.random(), 'group': i % 100})
+    created = 0
+    while created < count:
+        size = min(batch_size, count - created)
+        Task.objects.bulk_create(
+            [Task(project=project, data=data(created + i), inner_id=created + i + 1) for i in range(size)],
+            batch_size=batch_size,
+        )
+        created += size
+        print(f'Created {created}/{count} tasks', end='\r', flush=True)
+    print()
+    return created
+
+
+def measure(func, repeat=3):
+    """Run func `repeat` times and return (median seconds, last result)"""
+    timings, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
@@ -0,0 +1,82 @@
+"""This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
+
+Compare page-number and keyset (cursor) pagination of the Data Manager task list at different page depths.
+
+    python tests/loadtests/dm_pagination_benchmark.py --tasks 3000000 --ordering tasks:-data.score
+    python tests/loadtests/dm_pagination_benchmark.py --project 42 --pages 1 100 1000 20000
+"""
+import argparse
+
+from bench_utils import make_project, make_tasks, measure, setup_django
+
+
+def get_queryset(project, ordering, request):
+    from data_manager.models import PrepareParams
+    from tasks.models import Task
+
+    prepare_params = PrepareParams(project=project.id, ordering=[ordering] if ordering else [], request=request)
+    return Task.prepared.only_filtered(prepare_params=prepare_params)
+
+
+def make_request(params):
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    return Request(APIRequestFactory().get('/api/tasks', params))
+
+
+def bench_page_number(project, ordering, page, page_size, repeat):
+    from data_manager.api import TaskPagination
+
+    request = make_request({'page': page, 'page_size': page_size})
+    queryset = get_queryset(project, ordering, request)
+    return measure(lambda: TaskPagination().paginate_queryset(queryset, request), repeat)
+
+
+def bench_cursor(project, ordering, page, page_size, repeat):
+    from data_manager.api import TaskCursorPagination
+
+    cursor = None
+    if page > 1:
+        # find the cursor of the previous page once, it's not part of the measurement
+        paginator = TaskCursorPagination()
+        queryset = paginator.order_queryset(get_queryset(project, ordering, make_request({})))
+        cursor = paginator.encode_cursor(queryset[(page - 1) * page_size - 1])
+
+    request = make_request({'cursor': cursor, 'page_size': page_size} if cursor else {'pagination': 'cursor'})
+    queryset = get_queryset(project, ordering, request)
+    return measure(lambda: TaskCursorPagination().paginate_queryset(queryset, request), repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--project', type=int, help='Use an existing project instead of creating a synthetic one')
+    parser.add_argument('--tasks', type=int, default=2000000, help='Number of synthetic tasks to create')
+    parser.add_argument('--ordering', default='tasks:id', help='Data Manager ordering, e.g. tasks:-data.score')
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 10, 100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from projects.models import Project
+
+    if args.project:
+        project = Project.objects.get(id=args.project)
+    else:
+        project = make_project(title='DM pagination benchmark')
+        make_tasks(project, args.tasks)
+
+    total = project.tasks.count()
+    print(f'Project {project.id}: {total} tasks, ordering={args.ordering}, page_size={args.page_size}')
+    print(f'{"page":>8} {"page number, s":>16} {"cursor, s":>12}')
+    for page in args.pages:
+        if (page - 1) * args.page_size >= total:
+            break
+        page_number, _ = bench_page_number(project, args.ordering, page, args.page_size, args.repeat)
+        cursor, _ = bench_cursor(project, args.ordering, page, args.page_size, args.repeat)
+        print(f'{page:>8} {page_number:>16.4f} {cursor:>12.4f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
+
+Measure peak Python memory of `/api/projects/{id}/export?exportType=...` for growing projects.
+With streamed export files the peak stays close to the size of one serialization batch (1000 tasks)
+instead of growing with the project. Memory is traced with tracemalloc, the response is consumed and discarded.
+Run with DEBUG=false, otherwise Django keeps every executed query in memory.
+
+    python tests/loadtests/export_memory_benchmark.py --tasks 1000 10000 50000 --export-types JSON CSV JSONL
+    python tests/loadtests/export_memory_benchmark.py --tasks 20000 --annotations 3 --text-length 2000
+"""
+import argparse
+import time
+import tracemalloc
+
+from bench_utils import make_project, make_tasks, random_text, setup_django
+
+LABEL_CONFIG = """
+<View>
+  <Text name="text" value="$text"/>
+  <Choices name="label" toName="text">
+    <Choice value="pos"/>
+    <Choice value="neg"/>
+  </Choices>
+</View>
+"""
+
+
+def make_annotated_project(count, annotations, text_length):
+    from tasks.models import Annotation
+
+    project = make_project(title=f'Export memory benchmark, {count} tasks', label_config=LABEL_CONFIG)
+    make_tasks(project, count, data=lambda i: {'text': random_text(text_length), 'group': i % 100})
+    result = [{'from_name': 'label', 'to_name': 'text', 'type': 'choices', 'value': {'choices': ['pos']}}]
+    for _ in range(annotations):
+        Annotation.objects.bulk_create(
+            [
+                Annotation(task_id=task_id, project=project, completed_by=project.created_by, result=result)
+                for task_id in project.tasks.values_list('id', flat=True)
+            ],
+            batch_size=10000,
+        )
+    return project
+
+
+def bench_export(project, export_type):
+    from data_export.api import ExportAPI
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    request = APIRequestFactory().get(
+        f'/api/projects/{project.id}/export', {'exportType': export_type, 'download_all_tasks': 'true'}
+    )
+    force_authenticate(request, user=project.created_by)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = ExportAPI.as_view()(request, pk=project.id)
+    assert response.status_code == 200, response.status_code
+    size = sum(len(chunk) for chunk in response.streaming_content)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, nargs='+', default=[1000, 10000, 50000], help='Project sizes')
+    parser.add_argument('--annotations', type=int, default=1, help='Annotations per task')
+    parser.add_argument('--text-length', type=int, default=200, help='Length of the task text')
+    parser.add_argument('--export-types', nargs='+', default=['JSON', 'CSV', 'JSONL', 'PARQUET'])
+    args = parser.parse_args()
+
+    setup_django()
+
+    print(f'{"tasks":>10} {"format":>10} {"export, s":>10} {"peak, MiB":>10} {"file, MiB":>10}')
+    for count in args.tasks:
+        project = make_annotated_project(count, args.annotations, args.text_length)
+        for export_type in args.export_types:
+            seconds, peak, size = bench_export(project, export_type)
+            print(f'{count:>10} {export_type:>10} {seconds:>10.2f} {peak / 2**20:>10.1f} {size / 2**20:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
+
+Measure task import throughput (tasks/s) with INSERT (bulk_create) and COPY FROM STDIN bulk inserts.
+Tasks go through the same batched validation and save path as the import API. COPY is used on PostgreSQL only,
+on other databases both modes insert with bulk_create. Run with DEBUG=false, otherwise Django keeps every
+executed query in memory.
+
+    python tests/loadtests/import_benchmark.py --tasks 100000 1000000
+    python tests/loadtests/import_benchmark.py --tasks 100000 --annotations 1 --predictions 1 --modes copy
+"""
+import argparse
+import random
+import time
+
+from bench_utils import make_project, random_text, setup_django
+
+LABEL_CONFIG = """
+<View>
+  <Text name="text" value="$text"/>
+  <Choices name="label" toName="text">
+    <Choice value="pos"/>
+    <Choice value="neg"/>
+  </Choices>
+</View>
+"""
+
+
+def iter_tasks(count, annotations, predictions, text_length):
+    for i in range(count):
+        task = {'data': {'text': random_text(text_length), 'group': i % 100}}
+        result = [
+            {
+                'from_name': 'label',
+                'to_name': 'text',
+                'type': 'choices',
+                'value': {'choices': [random.choice(['pos', 'neg'])]},
+            }
+        ]
+        if annotations:
+            task['annotations'] = [{'result': result} for _ in range(annotations)]
+        if predictions:
+            task['predictions'] = [
+                {'result': result, 'score': random.random(), 'model_version': 'benchmark'} for _ in range(predictions)
+            ]
+        yield task
+
+
+def bench_import(count, mode, args):
+    from data_import.functions import save_tasks_in_batches
+    from django.conf import settings
+    from django.db import transaction
+
+    settings.BULK_INSERT_USE_COPY = mode == 'copy'
+    project = make_project(title=f'Import benchmark, {count} tasks, {mode}', label_config=LABEL_CONFIG)
+    tasks = iter_tasks(count, args.annotations, args.predictions, args.text_length)
+
+    start = time.perf_counter()
+    with transaction.atomic():
+        counts, _ = save_tasks_in_batches(
+            project,
+            tasks,
+            context={'project': project, 'user': project.created_by},
+            organization=project.organization,
+            summary=project.summary,
+        )
+    seconds = time.perf_counter() - start
+    assert counts['task_count'] == count, counts
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, nargs='+', default=[100000, 1000000], help='Imported task counts')
+    parser.add_argument('--annotations', type=int, default=0, help='Annotations per task')
+    parser.add_argument('--predictions', type=int, default=0, help='Predictions per task')
+    parser.add_argument('--text-length', type=int, default=200, help='Length of the task text')
+    parser.add_argument('--modes', nargs='+', default=['insert', 'copy'], choices=['insert', 'copy'])
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+
+    print(f'Database: {connection.vendor}')
+    print(f'{"tasks":>10} {"mode":>8} {"import, s":>10} {"tasks/s":>10}')
+    for count in args.tasks:
+        for mode in args.modes:
+            seconds = bench_import(count, mode, args)
+            print(f'{count:>10} {mode:>8} {seconds:>10.2f} {count / seconds:>10.0f}')
+
+
+if __name__ == '__main__':
+    main()
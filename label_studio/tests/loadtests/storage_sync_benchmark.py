@@ -0,0 +1,82 @@
+"""This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
+
+Measure import storage sync throughput (tasks/s) for different STORAGE_IMPORT_BATCH_SIZE values.
+A local files storage is used as a stand-in for cloud storages, batch size 1 is the per-object path.
+
+    python tests/loadtests/storage_sync_benchmark.py --tasks 20000 --batch-sizes 1 100 500 2000
+    python tests/loadtests/storage_sync_benchmark.py --tasks 5000 --predictions
+"""
+import argparse
+import json
+import random
+import tempfile
+from pathlib import Path
+
+from bench_utils import make_project, measure, random_text, setup_django
+
+LABEL_CONFIG = """
+<View>
+  <Text name="text" value="$text"/>
+  <Choices name="label" toName="text">
+    <Choice value="pos"/>
+    <Choice value="neg"/>
+  </Choices>
+</View>
+"""
+
+
+def make_files(path, count, predictions):
+    for i in range(count):
+        task = {'data': {'text': random_text(), 'group': i % 100}}
+        if predictions:
+            choice = random.choice(['pos', 'neg'])
+            task['predictions'] = [
+                {
+                    'model_version': 'benchmark',
+                    'score': random.random(),
+                    'result': [
+                        {'from_name': 'label', 'to_name': 'text', 'type': 'choices', 'value': {'choices': [choice]}}
+                    ],
+                }
+            ]
+        (Path(path) / f'{i:08}.json').write_text(json.dumps(task))
+
+
+def bench_sync(path, batch_size, repeat):
+    from django.test import override_settings
+    from io_storages.localfiles.models import LocalFilesImportStorage
+
+    def sync():
+        # every run syncs into a fresh project, otherwise all keys would be already linked
+        project = make_project(title=f'Storage sync benchmark, batch size {batch_size}', label_config=LABEL_CONFIG)
+        storage = LocalFilesImportStorage.objects.create(project=project, path=str(path))
+        storage.info_set_queued()
+        with override_settings(STORAGE_IMPORT_BATCH_SIZE=batch_size):
+            storage.scan_and_create_links()
+        return project.tasks.count()
+
+    return measure(sync, repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=10000, help='Number of task files in the storage')
+    parser.add_argument('--predictions', action='store_true', help='Add a prediction to every task')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 100, 500, 2000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+
+    with tempfile.TemporaryDirectory() as path:
+        make_files(path, args.tasks, args.predictions)
+        print(f'{args.tasks} task files, predictions={args.predictions}')
+        print(f'{"batch size":>10} {"sync, s":>10} {"tasks/s":>10}')
+        for batch_size in args.batch_sizes:
+            seconds, created = bench_sync(path, batch_size, args.repeat)
+            assert created == args.tasks, f'Synced {created} tasks instead of {args.tasks}'
+            print(f'{batch_size:>10} {seconds:>10.3f} {created / seconds:>10.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+import pytest
+from data_manager.managers import annotate_annotators, annotate_completed_at, annotate_predictions_score
+from django.test import override_settings
+from tasks.functions import update_tasks_counters
+from tasks.models import Annotation, Prediction, Task, TaskAggregate
+from users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+class TestTaskAggregate:
+    @pytest.fixture
+    def project(self, configured_project):
+        return configured_project
+
+    @pytest.fixture
+    def task(self, project):
+        return project.tasks.order_by('id').first()
+
+    @pytest.fixture
+    def users(self):
+        return [User.objects.create(email=f'aggregate{i}@pytest.net') for i in range(2)]
+
+    def test_annotations_and_predictions_update_aggregate(
+        self, project, task, users, django_capture_on_commit_callbacks, django_assert_max_num_queries
+    ):
+        assert not TaskAggregate.objects.filter(task=task).exists()
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            first = Annotation.objects.create(project=project, task=task, completed_by=users[1], result=[])
+            Annotation.objects.create(project=project, task=task, completed_by=users[0], result=[])
+            Annotation.objects.create(project=project, task=task, completed_by=users[0], result=[], was_cancelled=True)
+            Prediction.objects.create(project=project, task=task, result=[], score=0.2)
+            prediction = Prediction.objects.create(project=project, task=task, result=[], score=0.6)
+
+        # aggregates are recalculated once after commit, in one batch
+        assert not TaskAggregate.objects.filter(task=task).exists()
+        with django_assert_max_num_queries(3):
+            for callback in callbacks:
+                callback()
+
+        aggregate = TaskAggregate.objects.get(task=task)
+        assert aggregate.annotators == sorted([users[0].id, users[1].id])
+        assert aggregate.last_annotation_at == Annotation.objects.filter(task=task).latest('id').created_at
+        assert aggregate.predictions_score == pytest.approx(0.4)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            prediction.delete()
+            first.delete()
+        aggregate.refresh_from_db()
+        assert aggregate.annotators == [users[0].id]
+        assert aggregate.predictions_score == pytest.approx(0.2)
+
+        task.annotations.all().delete()
+        task.predictions.all().delete()
+        update_tasks_counters(Task.objects.filter(id=task.id))
+        assert not TaskAggregate.objects.filter(task=task).exists()
+
+    def test_update_tasks_counters_restores_aggregates(self, project, task, users):
+        Annotation.objects.create(project=project, task=task, completed_by=users[0], result=[])
+        Prediction.objects.create(project=project, task=task, result=[], score=0.5)
+        TaskAggregate.objects.all().delete()
+
+        update_tasks_counters(project.tasks.all())
+
+        aggregate = TaskAggregate.objects.get(task=task)
+        assert aggregate.annotators == [users[0].id]
+        assert aggregate.predictions_score == pytest.approx(0.5)
+        assert TaskAggregate.objects.count() == 1
+
+    def test_task_deletion_removes_aggregate(self, project, task, users):
+        Annotation.objects.create(project=project, task=task, completed_by=users[0], result=[])
+        Prediction.objects.create(project=project, task=task, result=[], score=0.5)
+
+        task.delete()
+
+        assert not TaskAggregate.objects.exists()
+
+    @pytest.mark.parametrize('use_aggregates', [True, False])
+    def test_data_manager_annotations_match(self, project, users, use_aggregates, django_capture_on_commit_callbacks):
+        tasks = list(project.tasks.order_by('id'))
+        with django_capture_on_commit_callbacks(execute=True):
+            for user in users:
+                Annotation.objects.create(project=project, task=tasks[0], completed_by=user, result=[])
+            Prediction.objects.create(project=project, task=tasks[1], result=[], score=0.9)
+        tasks[0].refresh_from_db()
+        project.model_version = None
+        project.save()
+
+        with override_settings(DATA_MANAGER_TASK_AGGREGATES=use_aggregates):
+            queryset = Task.objects.filter(project=project)
+            for function in (annotate_annotators, annotate_completed_at, annotate_predictions_score):
+                queryset = function(queryset)
+            first, second = queryset.order_by('id')
+
+        annotators = first.annotators
+        if isinstance(annotators, str):
+            annotators = [int(v) for v in annotators.split(',')]
+        assert sorted(annotators) == sorted(user.id for user in users)
+        assert first.completed_at == (tasks[0].annotations.latest('id').created_at if tasks[0].is_labeled else None)
+        assert first.predictions_score is None
+        assert not second.annotators
+        assert second.completed_at is None
+        assert second.predictions_score == pytest.approx(0.9)
@@ -0,0 +1,81 @@
+import pytest
+from data_import.models import FileUpload
+from data_manager.serializers import DataManagerTaskSerializer
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from io_storages import functions
+from io_storages.s3.models import S3ImportStorage
+from tasks.models import Task, TaskDataURIResolver
+
+pytestmark = pytest.mark.django_db
+
+
+class TestTaskDataURIResolver:
+    @pytest.fixture
+    def project(self, configured_project):
+        return configured_project
+
+    @pytest.fixture
+    def uploads(self, project, settings):
+        settings.CLOUD_FILE_STORAGE_ENABLED = True
+        return [
+            FileUpload.objects.create(user=project.created_by, project=project, file=f'upload/{project.id}/{i}.jpg')
+            for i in range(3)
+        ]
+
+    def test_file_uploads_are_fetched_once(self, project, uploads):
+        tasks = [
+            Task.objects.create(project=project, data={'image': f'/data/{upload.file.name}', 'text': 'some: text'})
+            for upload in uploads
+        ]
+        missing = Task.objects.create(project=project, data={'image': f'/data/upload/{project.id}/missing.jpg'})
+        tasks = list(Task.objects.filter(id__in=[task.id for task in tasks + [missing]]).order_by('id'))
+        project.get_all_import_storage_objects  # noqa: B018, storages are cached per project
+
+        with CaptureQueriesContext(connection) as queries:
+            data = DataManagerTaskSerializer(tasks, many=True, context={'project': project, 'resolve_uri': True}).data
+        file_upload_queries = [q for q in queries.captured_queries if 'data_import_fileupload' in q['sql']]
+        assert len(file_upload_queries) == 1
+
+        assert [task['data']['image'] for task in data[:3]] == [upload.url for upload in uploads]
+        assert data[0]['data']['text'] == 'some: text'
+        assert data[3]['data']['image'].endswith('missing.jpg?not_uploaded_project_file')
+
+        # a single task is resolved in the same way
+        task = Task.objects.get(id=tasks[0].id)
+        assert task.resolve_uri(task.data, project)['image'] == uploads[0].url
+
+    def test_storage_lookups_are_shared(self, project, monkeypatch):
+        storage = S3ImportStorage.objects.create(project=project, bucket='pytest-s3-images', presign=True)
+        tasks = [
+            Task.objects.create(project=project, data={'image': 's3://pytest-s3-images/image1.jpg', 'n': i})
+            for i in range(3)
+        ]
+        calls = []
+        monkeypatch.setattr(functions, 'get_storage_by_url', lambda url, storages: calls.append(url) or storage)
+
+        resolver = TaskDataURIResolver(project, tasks)
+        resolved = [resolver.resolve(task, dict(task.data)) for task in tasks]
+
+        assert calls == ['s3://pytest-s3-images/image1.jpg']
+        assert all(data['image'] != 's3://pytest-s3-images/image1.jpg' for data in resolved)
+        assert [data['n'] for data in resolved] == [0, 1, 2]
+
+
+@pytest.mark.parametrize('presign_ttl, margin, generated', [(15, 30, 1), (1, 60, 2), (15, -1, 2)])
+def test_presigned_url_cache(configured_project, settings, monkeypatch, presign_ttl, margin, generated):
+    settings.STORAGE_PRESIGNED_URL_CACHE_MARGIN = margin
+    storage = S3ImportStorage.objects.create(
+        project=configured_project, bucket='pytest-s3-images', presign=True, presign_ttl=presign_ttl
+    )
+    urls = []
+    monkeypatch.setattr(
+        S3ImportStorage, 'generate_http_url', lambda self, url: urls.append(url) or f'https://signed/{len(urls)}'
+    )
+
+    first = storage.generate_http_url_cached('s3://pytest-s3-images/image1.jpg')
+    second = storage.generate_http_url_cached('s3://pytest-s3-images/image1.jpg')
+
+    assert len(urls) == generated
+    assert (first == second) == (generated == 1)
+    assert storage.generate_http_url_cached('s3://pytest-s3-images/image2.jpg') != first
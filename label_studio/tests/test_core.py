@@ -4,10 +4,13 @@ import types
 
 import pytest
 from core.utils.common import int_from_request
+from core.utils.db import copy_value
 from core.utils.exceptions import InvalidUploadUrlError, LabelStudioAPIException
 from core.utils.io import validate_upload_url
 from core.utils.params import bool_from_request
+from django.db import connection
 from rest_framework.exceptions import ValidationError
+from tasks.models import Prediction, Task
 
 
 @pytest.mark.parametrize(
@@ -185,3 +188,20 @@ def test_core_validate_upload_url(url, block_local_urls, raises_exc):
 
     with pytest.raises(raises_exc):
         validate_upload_url(url, block_local_urls=block_local_urls)
+
+
+@pytest.mark.django_db
+def test_copy_value():
+    task = Task(id=1, data={'text': 'tab\tand "quotes"\n'}, meta=None, is_labeled=True)
+    prediction = Prediction(task=task, model_version='line\nbreak\\path', score=None)
+
+    # backslashes of JSON escapes are escaped for COPY
+    assert copy_value(Task._meta.get_field('data'), task, connection) == r'{"text": "tab\\tand \\"quotes\\"\\n"}'
+    assert copy_value(Task._meta.get_field('meta'), task, connection) == r'\N'
+    assert copy_value(Task._meta.get_field('is_labeled'), task, connection) == 't'
+    assert copy_value(Prediction._meta.get_field('task'), prediction, connection) == '1'
+    assert copy_value(Prediction._meta.get_field('model_version'), prediction, connection) == r'line\nbreak\\path'
+    assert copy_value(Prediction._meta.get_field('score'), prediction, connection) == r'\N'
+    # auto_now_add fields are set like on save()
+    assert copy_value(Task._meta.get_field('created_at'), task, connection)
+    assert task.created_at is not None
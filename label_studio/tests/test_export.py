@@ -1,12 +1,28 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
+import hashlib
+import io
 import json
+import os
+import zipfile
 
+import pyarrow.parquet as pq
 import pytest
+import responses
+from core.utils.io import iter_json_array
+from data_export import cache, mixins
+from data_export.mixins import ExportFileWriter
+from data_export.models import DataExport, Export
+from data_export.resources import get_converter_path
 from django.apps import apps
+from io_storages.s3.models import S3ImportStorage
+from label_studio_sdk._extensions.label_studio_tools.core.utils.io import get_local_path
+from storages.backends.s3boto3 import S3Boto3Storage
 from tasks.models import Annotation, Prediction, Task
 from tasks.serializers import AnnotationSerializer
 
+from .utils import make_project
+
 
 @pytest.mark.skip(reason='HTX-868')
 @pytest.mark.parametrize(
@@ -318,3 +334,478 @@ def test_export_with_predictions(
             assert task['predictions'][0]['score'] == predictions['score']
         else:
             assert task['predictions'] == []
+
+
+@pytest.fixture
+def streamed_export(settings, configured_project, monkeypatch):
+    settings.EXPORT_WRITE_BUFFER_SIZE = 64
+    settings.EXPORT_PROGRESS_INTERVAL = 0
+    for task in configured_project.tasks.all():
+        Annotation.objects.create(task=task, project=configured_project, result=[{'value': 'x' * 100}])
+    export = Export.objects.create(project=configured_project)
+
+    progress = []
+    save_bytes_written = export.save_bytes_written
+
+    def save_progress(bytes_written):
+        progress.append(bytes_written)
+        save_bytes_written(bytes_written)
+
+    monkeypatch.setattr(export, 'save_bytes_written', save_progress)
+    export.progress = progress
+    return export
+
+
+def check_streamed_export(export):
+    export.refresh_from_db()
+    assert export.status == Export.Status.COMPLETED
+    with export.file.open('rb') as f:
+        content = f.read()
+    assert export.md5 == hashlib.md5(content).hexdigest()  # nosec
+    assert export.counters['bytes_written'] == len(content)
+    assert len(json.loads(content)) == export.project.tasks.count()
+    # progress is saved while chunks are written
+    assert len(export.progress) > 1
+    assert export.progress == sorted(export.progress)
+    assert export.progress[-1] <= len(content)
+
+
+@pytest.mark.django_db
+def test_export_is_streamed_to_storage(streamed_export, monkeypatch):
+    def no_temp_files(*args, **kwargs):
+        raise AssertionError('export must not be written to a temporary file')
+
+    monkeypatch.setattr('django.core.files.temp.NamedTemporaryFile', no_temp_files)
+    streamed_export.export_to_file()
+    check_streamed_export(streamed_export)
+    assert streamed_export.file.name.startswith(f'export/{streamed_export.project.id}/')
+
+
+@pytest.mark.django_db
+def test_export_is_streamed_to_s3(streamed_export, monkeypatch):
+    # moto doesn't decode parts uploaded with the default checksums of recent botocore
+    monkeypatch.setenv('AWS_REQUEST_CHECKSUM_CALCULATION', 'when_required')
+    storage = S3Boto3Storage(bucket_name='pytest-export-s3-bucket', region_name='us-east-1')
+    monkeypatch.setattr(Export._meta.get_field('file'), 'storage', storage)
+    streamed_export.refresh_from_db()
+    streamed_export.export_to_file()
+    check_streamed_export(streamed_export)
+    assert storage.exists(streamed_export.file.name)
+
+
+@pytest.mark.django_db
+def test_failed_export_deletes_partial_file(streamed_export, monkeypatch):
+    def broken_serialized_tasks(*args, **kwargs):
+        yield [{'id': 1, 'data': 'x' * 1000}]
+        raise ConnectionError('connection reset')
+
+    monkeypatch.setattr(Export, 'iter_serialized_tasks', broken_serialized_tasks)
+    names = []
+    enter = ExportFileWriter.__enter__
+    monkeypatch.setattr(ExportFileWriter, '__enter__', lambda self: names.append(self.name) or enter(self))
+    streamed_export.export_to_file()
+
+    streamed_export.refresh_from_db()
+    assert streamed_export.status == Export.Status.FAILED
+    assert not streamed_export.file
+    assert len(names) == 1
+    assert not streamed_export.file.storage.exists(names[0])
+
+
+@pytest.fixture
+def sharded_export(settings, configured_project):
+    settings.EXPORT_SHARD_SIZE = 2
+    Task.objects.bulk_create([Task(data={'text': f'text {i}'}, project=configured_project) for i in range(3)])
+    for task in configured_project.tasks.all():
+        Annotation.objects.create(task=task, project=configured_project, result=[{'value': task.id}])
+    return Export.objects.create(project=configured_project)
+
+
+def check_sharded_export(export):
+    export.refresh_from_db()
+    assert export.status == Export.Status.COMPLETED
+    with export.file.open('rb') as f:
+        content = f.read()
+    assert json.loads(content) == json.loads(json.dumps(list(export.get_export_data())))
+    assert export.md5 == hashlib.md5(content).hexdigest()  # nosec
+    # part files are deleted with the checkpoint
+    assert 'parts' not in export.counters
+    _, parts = export.file.storage.listdir(f'export/{export.project.id}/parts')
+    assert not [part for part in parts if part.startswith(f'export-{export.id}-')]
+
+
+@pytest.mark.django_db
+def test_sharded_export(sharded_export):
+    sharded_export.export_to_file()
+    check_sharded_export(sharded_export)
+    assert sharded_export.counters['task_number'] == 5
+
+
+@pytest.mark.django_db
+def test_export_resumes_from_last_shard(sharded_export, monkeypatch):
+    export_shard = mixins.export_shard
+    exported = []
+
+    def broken_export_shard(export_id, part_number, task_ids, *args):
+        if part_number == 1:
+            raise ConnectionError('connection reset')
+        exported.append(task_ids)
+        return export_shard(export_id, part_number, task_ids, *args)
+
+    monkeypatch.setattr(mixins, 'export_shard', broken_export_shard)
+    sharded_export.export_to_file()
+
+    sharded_export.refresh_from_db()
+    task_ids = list(sharded_export.project.tasks.order_by('id').values_list('id', flat=True))
+    assert sharded_export.status == Export.Status.FAILED
+    assert len(sharded_export.counters['parts']) == 1
+    assert sharded_export.counters['last_task_id'] == task_ids[1]
+
+    # the restarted job exports only the remaining shards
+    monkeypatch.setattr(mixins, 'export_shard', lambda *args: exported.append(args[2]) or export_shard(*args))
+    sharded_export.export_to_file()
+    assert exported == [task_ids[0:2], task_ids[2:4], task_ids[4:5]]
+    check_sharded_export(sharded_export)
+
+
+class SyncProcessPool:
+    """Run export shards in the test process, it shares the test database transaction"""
+
+    max_workers = None
+
+    def __init__(self, max_workers=None, mp_context=None):
+        SyncProcessPool.max_workers = max_workers
+
+    def map(self, func, *iterables):
+        return map(func, *iterables)
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+@pytest.mark.django_db
+def test_shards_are_exported_by_process_pool(sharded_export, settings, monkeypatch):
+    settings.EXPORT_SHARD_WORKERS = 4
+    monkeypatch.setattr(mixins, 'ProcessPoolExecutor', SyncProcessPool)
+    sharded_export.export_to_file()
+    # no more workers than shards
+    assert SyncProcessPool.max_workers == 3
+    check_sharded_export(sharded_export)
+
+
+def test_iter_json_array():
+    items = [{'text': 'ü' * 50, 'nested': [1, {'a': None}]}, 1234567, 'x, ]', [], True]
+    content = json.dumps(items, ensure_ascii=False, indent=2).encode('utf-8')
+    # multibyte characters and numbers are split between chunks
+    assert list(iter_json_array(io.BytesIO(content), chunk_size=3)) == items
+    assert list(iter_json_array(io.BytesIO(b' [ ] '))) == []
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.BytesIO(b'[{"id": 1}, {"id"')))
+
+
+@pytest.fixture
+def annotated_project(configured_project, business_client):
+    for n, task in enumerate(configured_project.tasks.order_by('id')):
+        Annotation.objects.create(
+            task=task,
+            project=configured_project,
+            completed_by=business_client.admin,
+            lead_time=1.5,
+            result=[
+                {
+                    'id': f'r{n}',
+                    'type': 'choices',
+                    'from_name': 'text_class',
+                    'to_name': 'text',
+                    'value': {'choices': ['class_A']},
+                    'score': 0.5,
+                }
+            ],
+        )
+    return configured_project
+
+
+def check_native_export(export_type, content, project):
+    tasks = list(project.tasks.order_by('id'))
+    if export_type == 'JSONL':
+        exported = [json.loads(line) for line in content.decode('utf-8').splitlines()]
+        assert [task['id'] for task in exported] == [task.id for task in tasks]
+        assert [task['data'] for task in exported] == [task.data for task in tasks]
+        assert exported[0]['annotations'][0]['result'][0]['value'] == {'choices': ['class_A']}
+        return
+
+    table = pq.read_table(io.BytesIO(content))
+    assert table.column('id').to_pylist() == [task.id for task in tasks]
+    assert [json.loads(data) for data in table.column('data').to_pylist()] == [task.data for task in tasks]
+    annotation = table.column('annotations').to_pylist()[0][0]
+    assert annotation['completed_by'] == project.created_by.id
+    assert annotation['lead_time'] == 1.5
+    assert annotation['created_at'] is not None
+    # results are nested columns, their values and unknown fields are JSON
+    result = annotation['result'][0]
+    assert (result['id'], result['type'], result['from_name'], result['to_name']) == (
+        'r0',
+        'choices',
+        'text_class',
+        'text',
+    )
+    assert json.loads(result['value']) == {'choices': ['class_A']}
+    assert json.loads(result['extra']) == {'score': 0.5}
+
+
+@pytest.mark.parametrize('export_type', ['JSONL', 'PARQUET'])
+@pytest.mark.django_db
+def test_native_export_formats(business_client, annotated_project, export_type, monkeypatch):
+    assert export_type in [f['name'] for f in DataExport.get_export_formats(annotated_project)]
+
+    def no_converter(*args, **kwargs):
+        raise AssertionError('native formats are streamed from the database')
+
+    monkeypatch.setattr(DataExport, 'generate_export_file', no_converter)
+    r = business_client.get(
+        f'/api/projects/{annotated_project.id}/export', data={'exportType': export_type, 'download_all_tasks': True}
+    )
+    assert r.status_code == 200
+    assert r['filename'].endswith('.jsonl' if export_type == 'JSONL' else '.parquet')
+    check_native_export(export_type, b''.join(r.streaming_content), annotated_project)
+
+
+@pytest.mark.parametrize('export_type', ['JSONL', 'PARQUET'])
+@pytest.mark.django_db
+def test_snapshot_conversion_to_native_formats(settings, annotated_project, export_type):
+    settings.EXPORT_WRITE_BUFFER_SIZE = 16
+    snapshot = Export.objects.create(project=annotated_project)
+    snapshot.export_to_file()
+    snapshot.refresh_from_db()
+
+    converted = snapshot.convert_file(export_type)
+    check_native_export(export_type, converted.read(), annotated_project)
+
+
+@pytest.mark.parametrize('export_type', ['JSON', 'CSV'])
+@pytest.mark.django_db
+def test_export_files_are_streamed(business_client, annotated_project, export_type, settings, tmp_path, monkeypatch):
+    settings.EXPORT_DIR = str(tmp_path)
+    settings.EXPORT_WRITE_BUFFER_SIZE = 16
+    streamed = []
+    stream_export_files = DataExport.stream_export_files
+
+    def check_iterator(project, now, get_args, tasks):
+        # the serialized tasks aren't collected into a list before writing
+        streamed.append(not isinstance(tasks, list))
+        return stream_export_files(project, now, get_args, tasks)
+
+    monkeypatch.setattr(DataExport, 'stream_export_files', staticmethod(check_iterator))
+    r = business_client.get(
+        f'/api/projects/{annotated_project.id}/export', data={'exportType': export_type, 'download_all_tasks': True}
+    )
+    assert r.status_code == 200
+    assert streamed == [True]
+
+    # the converter input is saved once with its md5 in the name and in the info file
+    info_file = next(tmp_path.glob('*-info.json'))
+    info = json.loads(info_file.read_text())
+    content = (tmp_path / info['download']['result_filename']).read_bytes()
+    assert info['download']['md5'] == hashlib.md5(content).hexdigest()  # nosec
+    assert info['download']['result_filename'].endswith(f'-{info["download"]["md5"][0:8]}.json')
+    assert [task['id'] for task in json.loads(content)] == list(
+        annotated_project.tasks.order_by('id').values_list('id', flat=True)
+    )
+    assert not list(tmp_path.glob('*.partial'))
+    if export_type == 'JSON':
+        assert json.loads(b''.join(r.streaming_content)) == json.loads(content)
+
+
+@pytest.fixture
+def export_cache(settings, tmp_path):
+    settings.EXPORT_CACHE_ENABLED = True
+    settings.EXPORT_CACHE_DIR = str(tmp_path / 'cache')
+    return tmp_path / 'cache'
+
+
+@pytest.mark.django_db
+def test_export_cache(business_client, annotated_project, export_cache, monkeypatch):
+    generated = []
+    generate_export_file = DataExport.generate_export_file
+
+    def counted_generate_export_file(*args, **kwargs):
+        generated.append(args[2])
+        return generate_export_file(*args, **kwargs)
+
+    monkeypatch.setattr(DataExport, 'generate_export_file', staticmethod(counted_generate_export_file))
+
+    def export(export_type='CSV', **params):
+        r = business_client.get(
+            f'/api/projects/{annotated_project.id}/export', data={'exportType': export_type, **params}
+        )
+        assert r.status_code == 200
+        return r['filename'], b''.join(r.streaming_content)
+
+    first = export()
+    # repeated requests are served from the cache
+    assert export() == first
+    assert generated == ['CSV']
+
+    # other formats and options are other cache entries
+    export('JSON')
+    export(**{'ids[]': [annotated_project.tasks.first().id]})
+    assert generated == ['CSV', 'JSON', 'CSV']
+
+    # any change of the exported data invalidates cached files
+    annotation = Annotation.objects.filter(project=annotated_project).first()
+    annotation.result[0]['value'] = {'choices': ['class_B']}
+    annotation.save()
+    assert export() != first
+    annotation.delete()
+    export()
+    assert generated == ['CSV', 'JSON', 'CSV', 'CSV', 'CSV']
+
+
+def test_export_cache_eviction(export_cache, settings, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'time', lambda: now[0])
+    settings.EXPORT_CACHE_MAX_SIZE = 25
+    settings.EXPORT_CACHE_MAX_AGE = 100
+
+    def put(key, used_at):
+        cache.cache_export(key, io.BytesIO(b'x' * 10), 'application/csv', f'{key}.csv')
+        for path in cache._paths(key):
+            os.utime(path, (used_at, used_at))
+
+    put('a', 910)
+    put('b', 920)
+    put('c', 930)
+    # the least recently used entry is evicted over the size limit
+    assert cache.get_cached_export('a') is None
+    assert cache.get_cached_export('b') is not None
+
+    # entries are evicted after the max age since their last use
+    for path in cache._paths('b'):
+        os.utime(path, (995, 995))
+    now[0] = 1050.0
+    cache.evict_exports()
+    assert cache.get_cached_export('c') is None
+    path, content_type, filename = cache.get_cached_export('b')
+    assert (open(path, 'rb').read(), content_type, filename) == (b'x' * 10, 'application/csv', 'b.csv')
+
+
+@pytest.fixture
+def image_project(business_client, settings, tmp_path):
+    settings.EXPORT_CACHE_ENABLED = False
+    settings.EXPORT_RESOURCES_CACHE_DIR = str(tmp_path / 'resources')
+    project = make_project(
+        {
+            'title': 'Images',
+            'label_config': """
+                <View>
+                  <Image name="image" value="$image"/>
+                  <RectangleLabels name="label" toName="image">
+                    <Label value="car"/>
+                  </RectangleLabels>
+                </View>""",
+        },
+        business_client.admin,
+        use_ml_backend=False,
+    )
+    S3ImportStorage.objects.create(project=project, bucket='pytest-s3-images')
+    for url in ('https://example.com/images/a.jpg', 's3://pytest-s3-images/image1.jpg'):
+        task = Task.objects.create(project=project, data={'image': url})
+        Annotation.objects.create(
+            task=task,
+            project=project,
+            completed_by=business_client.admin,
+            result=[
+                {
+                    'id': 'r1',
+                    'type': 'rectanglelabels',
+                    'from_name': 'label',
+                    'to_name': 'image',
+                    'original_width': 100,
+                    'original_height': 100,
+                    'value': {'x': 10, 'y': 10, 'width': 50, 'height': 50, 'rotation': 0, 'rectanglelabels': ['car']},
+                }
+            ],
+        )
+    return project
+
+
+def check_exported_images(content):
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        images = sorted(
+            archive.read(name) for name in archive.namelist() if name.startswith('images/') and not name.endswith('/')
+        )
+    assert images == [b'123', b'image a']
+
+
+@pytest.mark.parametrize(
+    'url',
+    [
+        'https://example.com/images/a.jpg?expire=1',
+        's3://pytest-s3-images/dir/image1.jpg',
+        'gs://bucket/image2.png',
+        'azure-blob://container/image3.png',
+    ],
+)
+def test_converter_path_matches_sdk(url, tmp_path):
+    # prefetched files are only used by the converter if they are at the path it downloads them to
+    path = get_local_path(
+        url,
+        cache_dir=str(tmp_path),
+        hostname='http://testserver',
+        access_token='token',
+        download_resources=False,
+        task_id=7,
+    )
+    assert get_converter_path(url, 7, str(tmp_path), 'http://testserver') == path
+
+
+@responses.activate
+@pytest.mark.django_db
+def test_export_resources_are_prefetched(business_client, image_project, monkeypatch):
+    # the converter would get unknown urls, like the presign API of the test server, from responses
+    responses.add(responses.GET, 'https://example.com/images/a.jpg', body=b'image a')
+    streams = []
+    get_bytes_stream = S3ImportStorage.get_bytes_stream
+
+    def counted_get_bytes_stream(self, uri, range_header=None):
+        streams.append(uri)
+        return get_bytes_stream(self, uri, range_header)
+
+    monkeypatch.setattr(S3ImportStorage, 'get_bytes_stream', counted_get_bytes_stream)
+
+    for _ in range(2):
+        r = business_client.get(
+            f'/api/projects/{image_project.id}/export',
+            data={'exportType': 'COCO_WITH_IMAGES', 'download_all_tasks': True},
+        )
+        assert r.status_code == 200
+        check_exported_images(b''.join(r.streaming_content))
+
+    # the second export reads resources from the cache
+    assert [call.request.url for call in responses.calls if 'example.com' in call.request.url] == [
+        'https://example.com/images/a.jpg'
+    ]
+    assert streams == ['s3://pytest-s3-images/image1.jpg']
+
+
+@responses.activate
+@pytest.mark.django_db
+def test_snapshot_conversion_reports_resources_progress(image_project, settings, tmp_path):
+    responses.add(responses.GET, 'https://example.com/images/a.jpg', body=b'image a')
+    snapshot = Export.objects.create(project=image_project)
+    snapshot.export_to_file()
+    snapshot.refresh_from_db()
+
+    progress = []
+    converted = snapshot.convert_file('COCO_WITH_IMAGES', hostname='http://testserver', on_progress=progress.append)
+    check_exported_images(converted.read())
+    assert progress[-1] == {'total': 2, 'downloaded': 2, 'cached': 0, 'failed': 0}
+
+    converted = snapshot.convert_file('COCO_WITH_IMAGES', hostname='http://testserver', on_progress=progress.append)
+    assert progress[-1] == {'total': 2, 'downloaded': 0, 'cached': 2, 'failed': 0}
+
+    # failed downloads are left to the converter
+    settings.EXPORT_RESOURCES_CACHE_DIR = str(tmp_path / 'other-resources')
+    responses.replace(responses.GET, 'https://example.com/images/a.jpg', status=404)
+    snapshot.convert_file('COCO_WITH_IMAGES', hostname='http://testserver', on_progress=progress.append)
+    assert progress[-1] == {'total': 2, 'downloaded': 1, 'cached': 0, 'failed': 1}
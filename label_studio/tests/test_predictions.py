@@ -7,7 +7,9 @@ import requests_mock
 from core.redis import redis_healthcheck
 from ml.models import MLBackend
 from projects.models import Project
-from tasks.models import Annotation, AnnotationDraft, Prediction, Task
+from rest_framework.exceptions import ValidationError
+from tasks.models import Annotation, AnnotationDraft, Prediction, PredictionResultNormalizer, Task
+from tasks.serializers import PredictionSerializer
 from users.models import User
 
 from .utils import make_project
@@ -867,3 +869,61 @@ def test_predictions_meta(business_client, configured_project):
     # assert it raises if no Prediction or FailedPrediction is provided
     with pytest.raises(Exception):
         PredictionMeta.objects.create()
+
+
+@pytest.mark.parametrize(
+    'result, expected',
+    [
+        ([{'from_name': 'text_class', 'value': {}}], [{'from_name': 'text_class', 'value': {}}]),
+        (
+            'class_A',
+            [{'from_name': 'text_class', 'to_name': 'text', 'type': 'choices', 'value': {'choices': ['class_A']}}],
+        ),
+        (5, [{'from_name': 'rating', 'to_name': 'text', 'type': 'rating', 'value': {'rating': [5]}}]),
+        (
+            {'rating': 3, 'choices': ['class_B']},
+            [
+                {
+                    'from_name': 'text_class',
+                    'to_name': 'text',
+                    'type': 'choices',
+                    'value': {'rating': 3, 'choices': ['class_B']},
+                }
+            ],
+        ),
+        ({'labels': ['class_A']}, None),
+    ],
+)
+def test_prediction_result_normalizer(result, expected):
+    label_config = """
+        <View>
+          <Text name="text" value="$text"></Text>
+          <Choices name="text_class" toName="text" choice="single">
+            <Choice value="class_A"></Choice>
+            <Choice value="class_B"></Choice>
+          </Choices>
+          <Rating name="rating" toName="text"/>
+        </View>"""
+    normalizer = PredictionResultNormalizer.for_label_config(label_config)
+    assert PredictionResultNormalizer.for_label_config(label_config) is normalizer
+    assert normalizer.normalize_batch([result, result]) == [expected, expected]
+
+
+def test_prediction_result_normalizer_errors():
+    normalizer = PredictionResultNormalizer.for_label_config('<View><Text name="text" value="$text"/></View>')
+    with pytest.raises(ValidationError, match='should be dict'):
+        normalizer.normalize_batch([[{'value': {}}], ['invalid']])
+    with pytest.raises(ValidationError, match='Incorrect format'):
+        normalizer.normalize(1.5)
+
+
+@pytest.mark.django_db
+def test_prediction_serializer_normalizes_result(configured_project):
+    task = configured_project.tasks.first()
+    serializer = PredictionSerializer(data=[{'task': task.id, 'result': 'class_A'}], many=True)
+    assert serializer.is_valid(), serializer.errors
+    assert serializer.validated_data[0]['result'][0]['value'] == {'choices': ['class_A']}
+
+    serializer = PredictionSerializer(data={'task': task.id, 'result': ['invalid']})
+    assert not serializer.is_valid()
+    assert 'should be dict' in str(serializer.errors)
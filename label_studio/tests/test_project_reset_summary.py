@@ -1,6 +1,8 @@
 import json
 
 import pytest
+from projects.functions.utils import check_summary_consistency
+from projects.models import ProjectSummary, ProjectSummaryDelta
 from tasks.models import Task
 from tests.conftest import project_choices
 from tests.utils import make_project
@@ -146,3 +148,128 @@ def test_logged_out_user_cannot_reset_summary(business_client):
     assert r.status_code == 401
     assert 'detail' in (r_json := r.json())
     assert r_json['detail'] == 'Authentication credentials were not provided.'
+
+
+def test_delete_single_annotation_decreases_summary_counters(business_client):
+    project = make_project(project_choices(), business_client.user, use_ml_backend=False)
+    r = business_client.post(
+        f'/api/projects/{project.id}/import',
+        data=json.dumps([{'data': {'image': 'kittens.jpg'}}, {'data': {'image': 'puppies.jpg'}}]),
+        content_type='application/json',
+    )
+    assert r.status_code == 201
+    task1, task2 = Task.objects.filter(project=project).order_by('id')
+
+    annotation_ids, draft_ids = [], []
+    for task, label in [(task1, 'Opossum'), (task2, 'Mouse')]:
+        result = [{'from_name': 'some', 'to_name': 'x', 'type': 'none', 'value': {'none': [label]}}]
+        r = business_client.post(
+            f'/api/tasks/{task.id}/annotations', data=json.dumps({'result': result}), content_type='application/json'
+        )
+        assert r.status_code == 201
+        annotation_ids.append(r.json()['id'])
+        r = business_client.post(
+            f'/api/tasks/{task.id}/drafts', data=json.dumps({'result': result}), content_type='application/json'
+        )
+        assert r.status_code == 201
+        draft_ids.append(r.json()['id'])
+
+    # the other annotation and draft are left in the project, so only the deleted ones are subtracted
+    r = business_client.delete(f'/api/annotations/{annotation_ids[0]}/')
+    assert r.status_code == 204
+    r = business_client.delete(f'/api/drafts/{draft_ids[0]}/')
+    assert r.status_code == 204
+
+    s = ProjectSummary.objects.get(project=project)
+    assert s.created_annotations == {'some|x|none': 1}
+    assert s.created_labels == {'some': {'Mouse': 1}}
+    assert s.created_labels_drafts == {'some': {'Mouse': 1}}
+
+    # deleting annotations of the remaining task resets the counters at once
+    r = business_client.post(
+        f'/api/dm/actions?id=delete_tasks_annotations&project={project.id}',
+        data=json.dumps({'selectedItems': {'all': False, 'included': [task2.id]}}),
+        content_type='application/json',
+    )
+    assert r.status_code == 200
+    s.refresh_from_db()
+    for field in ['created_labels', 'created_labels_drafts', 'created_annotations']:
+        assert getattr(s, field) == {}
+
+
+def test_summary_deltas_are_applied_on_read(business_client, settings):
+    settings.PROJECT_SUMMARY_DELTAS = True
+    project = make_project(project_choices(), business_client.user, use_ml_backend=False)
+    r = business_client.post(
+        f'/api/projects/{project.id}/import',
+        data=json.dumps([{'data': {'image': 'kittens.jpg'}}, {'data': {'image': 'puppies.jpg'}}]),
+        content_type='application/json',
+    )
+    assert r.status_code == 201
+    task1, task2 = Task.objects.filter(project=project).order_by('id')
+
+    annotation_ids = []
+    for task, labels in [(task1, ['Opossum']), (task2, ['Opossum', 'Mouse']), (task1, ['Opossum'])]:
+        r = business_client.post(
+            f'/api/tasks/{task.id}/annotations',
+            data=json.dumps(
+                {'result': [{'from_name': 'some', 'to_name': 'x', 'type': 'none', 'value': {'none': labels}}]}
+            ),
+            content_type='application/json',
+        )
+        assert r.status_code == 201
+        annotation_ids.append(r.json()['id'])
+    r = business_client.post(
+        f'/api/tasks/{task1.id}/drafts',
+        data=json.dumps(
+            {'result': [{'from_name': 'some', 'to_name': 'x', 'type': 'none', 'value': {'none': ['Mouse']}}]}
+        ),
+        content_type='application/json',
+    )
+    assert r.status_code == 201
+
+    # writes don't touch the summary row
+    summary = ProjectSummary.objects.get(project=project)
+    assert summary.created_labels == {}
+    assert ProjectSummaryDelta.objects.filter(project=project).exists()
+
+    r = business_client.get(f'/api/projects/{project.id}/summary/')
+    assert r.status_code == 200
+    assert r.json()['created_annotations'] == {'some|x|none': 3}
+    assert r.json()['created_labels'] == {'some': {'Opossum': 3, 'Mouse': 1}}
+    assert r.json()['created_labels_drafts'] == {'some': {'Mouse': 1}}
+    assert not ProjectSummaryDelta.objects.filter(project=project).exists()
+
+    r = business_client.delete(f'/api/annotations/{annotation_ids[1]}/')
+    assert r.status_code == 204
+    assert check_summary_consistency(project) == []
+    summary.refresh_from_db()
+    assert summary.created_labels == {'some': {'Opossum': 2}}
+
+
+def test_check_summary_consistency(business_client, settings):
+    settings.PROJECT_SUMMARY_DELTAS = True
+    project = make_project(project_choices(), business_client.user, use_ml_backend=False)
+    r = business_client.post(
+        f'/api/projects/{project.id}/import',
+        data=json.dumps({'data': {'image': 'kittens.jpg'}}),
+        content_type='application/json',
+    )
+    assert r.status_code == 201
+    task = Task.objects.filter(project=project).first()
+    r = business_client.post(
+        f'/api/tasks/{task.id}/annotations',
+        data=json.dumps(
+            {'result': [{'from_name': 'some', 'to_name': 'x', 'type': 'none', 'value': {'none': ['Opossum']}}]}
+        ),
+        content_type='application/json',
+    )
+    assert r.status_code == 201
+
+    ProjectSummaryDelta.objects.create(project=project, field='created_labels', key='some', label='Mouse', delta=1)
+    assert check_summary_consistency(project) == ['created_labels']
+    assert check_summary_consistency(project, fix=True) == ['created_labels']
+
+    summary = ProjectSummary.objects.get(project=project)
+    assert summary.created_labels == {'some': {'Opossum': 1}}
+    assert check_summary_consistency(project) == []
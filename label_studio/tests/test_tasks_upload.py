@@ -7,8 +7,10 @@ import zipfile
 import pytest
 import requests_mock
 import ujson as json
-from projects.models import Project
+from data_import.functions import async_import_background
+from projects.models import Project, ProjectImport
 from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ValidationError
 from tasks.models import Annotation, Prediction, Task
 
 
@@ -26,6 +28,8 @@ def post_data_as_format(setup, format_type, body, archive, multiply_files):
         files = {f'upload_file{i}.tsv': io.StringIO(body) for i in range(0, multiply_files)}
     elif format_type == 'txt_file':
         files = {f'upload_file{i}.txt': io.StringIO(body) for i in range(0, multiply_files)}
+    elif format_type == 'jsonl_file':
+        files = {f'upload_file{i}.jsonl': io.StringIO(body) for i in range(0, multiply_files)}
     else:
         raise Exception('Incorrect task data format to post')
 
@@ -231,6 +235,86 @@ def test_txt_task_upload(setup_project_dialog, format_type, tasks, status_code,
     assert Task.objects.filter(project=setup_project_dialog.project.id).count() == task_count * multiplier
 
 
+@pytest.mark.parametrize('format_type', ['json_file', 'jsonl_file', 'csv_file'])
+@pytest.mark.django_db
+def test_tasks_are_imported_in_batches(setup_project_dialog, format_type, settings, mocker):
+    """Files are parsed incrementally and tasks are saved in batches of IMPORT_BATCH_SIZE"""
+    settings.IMPORT_BATCH_SIZE = 3
+    settings.IMPORT_CSV_CHUNK_SIZE = 2
+    emit_webhooks = mocker.patch('data_import.functions.emit_webhooks_for_instance')
+    # the last value makes the whole column text, not only its chunk
+    scores = list(range(9)) + ['high']
+    tasks = [{'dialog': f'dialog {i}', 'score': score} for i, score in enumerate(scores)]
+    if format_type == 'json_file':
+        body = json.dumps(tasks)
+    elif format_type == 'jsonl_file':
+        body = '\n'.join(json.dumps(task) for task in tasks) + '\n'
+    else:
+        body = 'dialog,score\n' + '\n'.join(f'{task["dialog"]},{task["score"]}' for task in tasks)
+
+    r = post_data_as_format(setup_project_dialog, format_type, body, 'none', 1)
+    assert r.status_code == 201, r.content
+    assert r.json()['task_count'] == 10
+    assert emit_webhooks.call_count == 4
+
+    tasks = Task.objects.filter(project=setup_project_dialog.project.id).order_by('id')
+    data = list(tasks.values_list('data', flat=True))
+    expected = [str(score) for score in scores] if format_type == 'csv_file' else scores
+    assert [task['score'] for task in data] == expected
+    assert data[0]['dialog'] == 'dialog 0'
+
+
+@pytest.mark.django_db
+def test_invalid_task_in_later_batch(setup_project_dialog, settings):
+    settings.IMPORT_BATCH_SIZE = 3
+    tasks = [{'data': {'dialog': 'some'}}] * 7 + [{'data': {'dialog': 'some'}, 'meta': 'invalid'}]
+
+    r = post_data_as_format(setup_project_dialog, 'json_file', json.dumps(tasks), 'none', 1)
+    assert r.status_code == 400
+    # errors are numbered from the first task of the file and saved batches are rolled back
+    assert 'at item 7' in str(r.content)
+    assert not Task.objects.filter(project=setup_project_dialog.project.id).exists()
+
+
+@pytest.mark.django_db
+def test_async_import_commits_batches(setup_project_dialog, settings, mocker):
+    settings.IMPORT_BATCH_SIZE = 3
+    project = setup_project_dialog.project
+    tasks = [{'data': {'dialog': f'dialog {i}'}} for i in range(7)]
+    project_import = ProjectImport.objects.create(
+        project=project, commit_to_project=True, return_task_ids=True, tasks=tasks
+    )
+    update = mocker.spy(ProjectImport.objects, 'filter')
+
+    async_import_background(project_import.id, setup_project_dialog.user.id)
+
+    project_import.refresh_from_db()
+    assert project_import.status == ProjectImport.Status.COMPLETED
+    assert project_import.task_count == 7
+    assert project_import.task_ids == list(project.tasks.order_by('id').values_list('id', flat=True))
+    # progress is saved after every committed batch
+    assert [call.kwargs for call in update.call_args_list] == [{'id': project_import.id}] * 3
+    project.summary.refresh_from_db()
+    assert project.summary.all_data_columns == {'dialog': 7}
+
+
+@pytest.mark.django_db
+def test_async_import_deletes_committed_batches_on_failure(setup_project_dialog, settings):
+    settings.IMPORT_BATCH_SIZE = 3
+    project = setup_project_dialog.project
+    tasks = [{'data': {'dialog': 'some'}}] * 7 + [{'data': {'dialog': 'some'}, 'meta': 'invalid'}]
+    project_import = ProjectImport.objects.create(project=project, commit_to_project=True, tasks=tasks)
+
+    with pytest.raises(ValidationError, match='at item 7'):
+        async_import_background(project_import.id, setup_project_dialog.user.id)
+
+    project_import.refresh_from_db()
+    assert project_import.task_count == 0
+    assert not project.tasks.exists()
+    project.summary.refresh_from_db()
+    assert project.summary.all_data_columns == {}
+
+
 @pytest.mark.parametrize(
     'tasks, status_code, task_count, max_duration',
     [([{'data': {'dialog': 'Test'}, 'annotations': [{'result': [{'id': '123'}]}]}] * 1000, 201, 1000, 30)],